@@ -0,0 +1 @@
+"""Бенчмарки taskbot (запуск: python -m benchmarks.<модуль> --help)."""
@@ -0,0 +1,263 @@
+"""Бенчмарк taskbot/db.py на синтетической базе.
+
+Строит (или переиспользует) SQLite-файл с заданным числом чатов, задач, записей
+аудита и повторяющихся напоминаний, затем замеряет каждую публичную функцию db.py
+и печатает p50/p99 и ops/sec.
+
+    python -m benchmarks.bench_db                          # 10k чатов, 1M задач, 5M аудита, 50k recurring
+    python -m benchmarks.bench_db --scale 0.01             # быстрый прогон на 1% объёма
+    python -m benchmarks.bench_db --save-baseline benchmarks/baselines/db.json
+    python -m benchmarks.bench_db --compare benchmarks/baselines/db.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator
+
+from taskbot import db
+from taskbot.config import TZ
+
+from .common import BenchResult, add_common_args, measure, report
+
+BATCH = 50_000
+ACTIONS = ("ADD", "DONE", "DELETE", "REM_SET", "REM_CLEAR", "SNOOZE_30M")
+GROUP_BASE = -1_000_000_000_000
+
+
+def chat_ids(chats: int) -> list[int]:
+    return [GROUP_BASE - i for i in range(chats)]
+
+
+def _batched(rows: Iterator[tuple], size: int = BATCH) -> Iterator[list[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_database(path: Path, *, chats: int, tasks: int, audit: int, recurring: int, seed: int) -> None:
+    """Создаёт схему через db.db_init() и заливает синтетические данные пачками."""
+    rng = random.Random(seed)
+    ids = chat_ids(chats)
+    now = datetime.now(TZ)
+
+    db.DB_PATH = str(path)
+    db.db_init()
+
+    conn = sqlite3.connect(str(path))
+    conn.execute("PRAGMA synchronous=OFF")
+
+    def task_rows():
+        for _ in range(tasks):
+            chat_id = rng.choice(ids)
+            state = rng.random()
+            created = (now - timedelta(minutes=rng.randrange(525_600))).isoformat()
+            done = 1 if state < 0.7 else 0
+            deleted = 1 if 0.7 <= state < 0.8 else 0
+            remind_at = None
+            reminded = 0
+            if not done and not deleted and rng.random() < 0.25:
+                remind_at = (now + timedelta(minutes=rng.randrange(1, 43_200))).isoformat()
+            user = rng.randrange(1, 6)
+            yield (chat_id, f"synthetic task {rng.randrange(10**6)}", done, created, remind_at, reminded, deleted,
+                   chat_id * 10 + user, f"user{user}")
+
+    for batch in _batched(task_rows()):
+        conn.executemany(
+            """
+            INSERT INTO tasks(chat_id, text, done, created_at, remind_at, reminded, deleted, owner_id, owner_name)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            batch,
+        )
+        conn.commit()
+
+    def audit_rows():
+        for _ in range(audit):
+            chat_id = rng.choice(ids)
+            yield (chat_id, 1, "user1", rng.choice(ACTIONS), rng.randrange(1, tasks + 1), None,
+                   (now - timedelta(minutes=rng.randrange(525_600))).isoformat())
+
+    for batch in _batched(audit_rows()):
+        conn.executemany(
+            """
+            INSERT INTO audit_log(chat_id, actor_id, actor_name, action, task_id, meta, created_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            batch,
+        )
+        conn.commit()
+
+    def recurring_rows():
+        for _ in range(recurring):
+            chat_id = rng.choice(ids)
+            # ~1% уже «пора»
+            offset = rng.randrange(-1440, 0) if rng.random() < 0.01 else rng.randrange(1, 525_600)
+            yield (chat_id, "synthetic recurring", "MONTHLY", rng.randrange(1, 29), None, 10, 0,
+                   (now + timedelta(minutes=offset)).isoformat(), now.isoformat(), chat_id * 10 + 1, "user1")
+
+    for batch in _batched(recurring_rows()):
+        conn.executemany(
+            """
+            INSERT INTO recurring_reminders(chat_id, text, repeat_kind, day_of_month, month, hour, minute,
+                                            next_run_at, created_at, owner_id, owner_name)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            batch,
+        )
+        conn.commit()
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO chat_state(chat_id, panel_message_id, timezone) VALUES(?, ?, ?)",
+        [(chat_id, rng.randrange(1, 10**6), "Asia/Bangkok") for chat_id in ids],
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def ensure_database(path: Path, sizes: dict[str, int], seed: int, rebuild: bool) -> None:
+    """Переиспользует файл, если он собран с теми же размерами и seed (см. <db>.json)."""
+    meta_path = path.with_suffix(path.suffix + ".json")
+    wanted = {**sizes, "seed": seed}
+    if not rebuild and path.exists() and meta_path.exists():
+        if json.loads(meta_path.read_text()) == wanted:
+            return
+    for p in (path, Path(f"{path}-wal"), Path(f"{path}-shm"), meta_path):
+        p.unlink(missing_ok=True)
+    started = time.perf_counter()
+    print(f"building {path} {sizes} ...", file=sys.stderr)
+    build_database(path, seed=seed, **sizes)
+    meta_path.write_text(json.dumps(wanted))
+    print(f"built in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+def run_benchmarks(iterations: int, chats: int, seed: int) -> list[BenchResult]:
+    rng = random.Random(seed + 1)
+    ids = chat_ids(chats)
+    now = datetime.now(TZ)
+
+    with db.db_session() as conn:
+        max_task_id = conn.execute("SELECT MAX(id) FROM tasks").fetchone()[0] or 0
+        max_rec_id = conn.execute("SELECT MAX(id) FROM recurring_reminders").fetchone()[0] or 0
+        sample = conn.execute(
+            "SELECT chat_id, id FROM tasks WHERE id IN (%s)" % ",".join("?" * 500),
+            [rng.randrange(1, max_task_id + 1) for _ in range(500)] if max_task_id else [0] * 500,
+        ).fetchall()
+        rec_sample = conn.execute(
+            "SELECT chat_id, id FROM recurring_reminders WHERE id IN (%s)" % ",".join("?" * 500),
+            [rng.randrange(1, max_rec_id + 1) for _ in range(500)] if max_rec_id else [0] * 500,
+        ).fetchall()
+    task_pairs = [(r["chat_id"], r["id"]) for r in sample] or [(ids[0], 1)]
+    rec_pairs = [(r["chat_id"], r["id"]) for r in rec_sample] or [(ids[0], 1)]
+
+    def chat() -> tuple:
+        return (rng.choice(ids),)
+
+    def task() -> tuple:
+        return rng.choice(task_pairs)
+
+    def new_task() -> tuple[int, int]:
+        chat_id = rng.choice(ids)
+        return chat_id, db.insert_task(chat_id, 1, "bench", "bench task")
+
+    def new_tasks(n: int = 10) -> tuple[int, list[int]]:
+        chat_id = rng.choice(ids)
+        return chat_id, db.insert_tasks(chat_id, 1, "bench", ["bench task"] * n)
+
+    def new_recurring() -> tuple[int, int]:
+        chat_id = rng.choice(ids)
+        rec_id = db.recurring_insert(chat_id, 1, "bench", "bench", "MONTHLY", 1, now.isoformat())
+        return chat_id, rec_id
+
+    remind_iso = (now + timedelta(days=1)).isoformat()
+    heavy = max(5, iterations // 20)
+    cases: list[tuple[str, Callable, Callable[[], tuple] | None, int]] = [
+        # чтение
+        ("fetch_tasks", lambda c: db.fetch_tasks(c, limit=20), chat, iterations),
+        ("fetch_open_tasks", lambda c: db.fetch_open_tasks(c, limit=10), chat, iterations),
+        ("count_open_tasks", db.count_open_tasks, chat, iterations),
+        ("fetch_task", db.fetch_task, task, iterations),
+        ("fetch_task_text", db.fetch_task_text, task, iterations),
+        ("fetch_pending_reminders", db.fetch_pending_reminders, None, heavy),
+        ("audit_fetch", lambda c: db.audit_fetch(c, limit=50), chat, iterations),
+        ("recurring_fetch_due", db.recurring_fetch_due, lambda: (now.isoformat(),), heavy),
+        ("recurring_fetch_by_chat", db.recurring_fetch_by_chat, chat, iterations),
+        ("recurring_fetch_one", db.recurring_fetch_one, lambda: rng.choice(rec_pairs), iterations),
+        ("get_panel_message_id", db.get_panel_message_id, chat, iterations),
+        ("get_chat_tz", db.get_chat_tz, chat, iterations),
+        ("pending_get", lambda c: db.pending_get(c, 1), chat, iterations),
+        ("pending_fetch_all", db.pending_fetch_all, None, heavy),
+        # запись
+        ("insert_task", lambda c: db.insert_task(c, 1, "bench", "bench task"), chat, iterations),
+        ("insert_tasks[10]", lambda c: db.insert_tasks(c, 1, "bench", ["bench task"] * 10), chat, iterations),
+        ("set_task_remind", lambda c, t: db.set_task_remind(c, t, remind_iso), new_task, iterations),
+        ("set_task_reminder_message_id", lambda c, t: db.set_task_reminder_message_id(c, t, 1), new_task, iterations),
+        ("mark_reminded", db.mark_reminded, new_task, iterations),
+        ("mark_done", lambda c, t: db.mark_done(c, t, 1, "bench"), new_task, iterations),
+        ("mark_done_many[10]", lambda c, ts: db.mark_done_many(c, ts, 1, "bench"), new_tasks, iterations),
+        ("soft_delete", db.soft_delete, new_task, iterations),
+        ("soft_delete_many[10]", db.soft_delete_many, new_tasks, iterations),
+        ("audit_insert", lambda c: db.audit_insert(c, 1, "bench", "DONE", 1, None), chat, iterations),
+        (
+            "audit_insert_many[10]",
+            lambda c: db.audit_insert_many([(c, 1, "bench", "DONE", i, None) for i in range(10)]),
+            chat,
+            iterations,
+        ),
+        ("set_panel_message_id", lambda c: db.set_panel_message_id(c, 1), chat, iterations),
+        ("set_chat_tz", lambda c: db.set_chat_tz(c, "Asia/Bangkok"), chat, iterations),
+        ("pending_set", lambda c: db.pending_set(c, 1, "ADD_WAIT_TEXT"), chat, iterations),
+        ("pending_clear", lambda c: db.pending_clear(c, 1), chat, iterations),
+        ("pending_apply", lambda c: db.pending_apply([(c, 2, "ADD_WAIT_TEXT", None, None, now.isoformat())], []),
+         chat, iterations),
+        ("recurring_insert", lambda c: db.recurring_insert(c, 1, "bench", "bench", "MONTHLY", 1, remind_iso),
+         chat, iterations),
+        ("recurring_update_next_run", lambda c, r: db.recurring_update_next_run(r, remind_iso), new_recurring,
+         iterations),
+        ("recurring_delete", db.recurring_delete, new_recurring, iterations),
+    ]
+
+    results = []
+    for name, fn, prepare, n in cases:
+        results.append(measure(name, fn, iterations=n, prepare=prepare))
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=Path(tempfile.gettempdir()) / "taskbot-bench.db")
+    parser.add_argument("--rebuild", action="store_true", help="пересобрать базу, даже если она уже есть")
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--audit", type=int, default=5_000_000)
+    parser.add_argument("--recurring", type=int, default=50_000)
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель для всех объёмов")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    sizes = {
+        name: max(1, int(getattr(args, name) * args.scale))
+        for name in ("chats", "tasks", "audit", "recurring")
+    }
+    ensure_database(args.db, sizes, args.seed, args.rebuild)
+    db.DB_PATH = str(args.db)
+
+    results = run_benchmarks(args.iterations, sizes["chats"], args.seed)
+    return report(args, results, {"bench": "db", **sizes, "iterations": args.iterations})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Бенчмарк планировщика напоминаний: сколько напоминаний держит один процесс.
+
+Настоящий JobQueue (APScheduler) без сети: в очередь кладётся N напоминаний
+(10k–200k), затем на выборке замеряются schedule_reminder для новой задачи,
+перепланирование, cancel_reminder, start_reminder_repeat и cancel_reminder_repeat.
+Память на напоминание — tracemalloc при заполнении очереди.
+
+Часы синтетические: JobQueue и APScheduler видят сдвинутое «сейчас», бенчмарк
+двигает его шагами --step и будит планировщик сам. Для каждого сработавшего
+напоминания пишутся задержка срабатывания (реальное время от сдвига часов до
+передачи джобы исполнителю) и опоздание по синтетическим часам.
+
+    python -m benchmarks.bench_scheduler                           # 10k и 50k напоминаний
+    python -m benchmarks.bench_scheduler --reminders 10000 50000 200000 --sample 20
+    python -m benchmarks.bench_scheduler --save-baseline benchmarks/baselines/scheduler.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Iterator
+
+import apscheduler.schedulers.base as aps_base
+from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from telegram.ext import Application, JobQueue
+
+from taskbot import db, reminders
+from taskbot.config import TZ
+
+from .common import BenchResult, add_common_args, report
+from .fakebot import RecordingRequest
+
+FAKE_TOKEN = "123456:SCHEDULER-BENCH"
+# напоминания раскладываются равномерно по [LEAD, LEAD + horizon] секунд от старта
+LEAD_SECONDS = 60
+
+
+class SyntheticClock:
+    """«Сейчас» = реальное время + offset; advance() сдвигает offset."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def now(self, tz=None) -> datetime:
+        return datetime.fromtimestamp(time.time() + self.offset, tz)
+
+    def advance(self, seconds: float) -> None:
+        self.offset += seconds
+
+
+class SyntheticJobQueue(JobQueue):
+    """JobQueue, для которого «сейчас» задают синтетические часы."""
+
+    def __init__(self, clock: SyntheticClock):
+        super().__init__()
+        self.clock = clock
+
+    def _tz_now(self) -> datetime:
+        return self.clock.now(self.scheduler.timezone)
+
+
+@contextlib.contextmanager
+def patched_scheduler_time(clock: SyntheticClock) -> Iterator[None]:
+    """APScheduler берёт время из datetime.now в schedulers.base — подменяем на время часов."""
+    real_datetime = aps_base.datetime
+
+    class ClockDatetime(real_datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now(tz)
+
+    aps_base.datetime = ClockDatetime
+    try:
+        yield
+    finally:
+        aps_base.datetime = real_datetime
+
+
+@dataclass
+class FiringStats:
+    delays: list[float] = field(default_factory=list)
+    lateness: list[float] = field(default_factory=list)
+    submitted: int = 0
+    finished: int = 0
+    missed: int = 0
+
+
+def _sample_ops(
+    name: str, fn: Callable[[int, int], None], keys: list[tuple[int, int]]
+) -> BenchResult:
+    samples = []
+    for chat_id, task_id in keys:
+        started = time.perf_counter()
+        fn(chat_id, task_id)
+        samples.append(time.perf_counter() - started)
+    return BenchResult.from_samples(name, samples)
+
+
+async def _fire_all(app: Application, clock: SyntheticClock, horizon: float, step: float) -> FiringStats:
+    stats = FiringStats()
+    scheduler = app.job_queue.scheduler
+    advanced_at = [time.perf_counter()]
+
+    def on_event(event) -> None:
+        if event.code == EVENT_JOB_SUBMITTED:
+            stats.submitted += 1
+            stats.delays.append(time.perf_counter() - advanced_at[0])
+            due = event.scheduled_run_times[0]
+            stats.lateness.append((clock.now(due.tzinfo) - due).total_seconds())
+        elif event.code == EVENT_JOB_MISSED:
+            stats.missed += 1
+        else:
+            stats.finished += 1
+
+    mask = EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
+    scheduler.add_listener(on_event, mask)
+    try:
+        elapsed = 0.0
+        while elapsed < LEAD_SECONDS + horizon + step:
+            clock.advance(step)
+            elapsed += step
+            advanced_at[0] = time.perf_counter()
+            # AsyncIOScheduler.wakeup только ставит обработку в цикл — отдаём ему управление
+            scheduler.wakeup()
+            await asyncio.sleep(0)
+            # ждём, пока отработают колбэки, поставленные этим шагом
+            while stats.finished < stats.submitted:
+                await asyncio.sleep(0)
+    finally:
+        scheduler.remove_listener(on_event)
+    return stats
+
+
+async def run_size(n: int, *, chats: int, horizon: float, step: float, sample: int, seed: int) -> tuple[list[BenchResult], dict]:
+    rng = random.Random(seed)
+    clock = SyntheticClock()
+    app = Application.builder().token(FAKE_TOKEN).request(RecordingRequest()).job_queue(SyntheticJobQueue(clock)).build()
+    await app.initialize()
+    await app.job_queue.start()
+    try:
+        with patched_scheduler_time(clock):
+            start = datetime.now(TZ)
+            keys = [(-(1000 + i % chats), i + 1) for i in range(n)]
+
+            # заполнение очереди: run_once с тем же именем, id и данными, что у schedule_reminder,
+            # но без get_chat_tz на каждую задачу
+            tracemalloc.start()
+            before, _ = tracemalloc.get_traced_memory()
+            for chat_id, task_id in keys:
+                name = f"remind:{chat_id}:{task_id}"
+                app.job_queue.run_once(
+                    reminders.reminder_job,
+                    when=LEAD_SECONDS + rng.random() * horizon,
+                    name=name,
+                    data={"chat_id": chat_id, "task_id": task_id},
+                    job_kwargs=reminders.named_job_kwargs(name),
+                )
+            after, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            def remind_at() -> datetime:
+                return start + timedelta(seconds=LEAD_SECONDS + rng.random() * horizon)
+
+            picked = rng.sample(keys, min(sample, n))
+            fresh = [(chat_id, n + 1 + i) for i, (chat_id, _) in enumerate(picked)]
+            results = [
+                _sample_ops(f"schedule_new@{n}", lambda c, t: reminders.schedule_reminder(app, c, t, remind_at()), fresh),
+                _sample_ops(f"reschedule@{n}", lambda c, t: reminders.schedule_reminder(app, c, t, remind_at()), picked),
+                _sample_ops(f"cancel@{n}", lambda c, t: reminders.cancel_reminder(app, c, t), picked),
+                _sample_ops(f"start_repeat@{n}", lambda c, t: reminders.start_reminder_repeat(app, c, t), picked),
+                _sample_ops(f"cancel_repeat@{n}", lambda c, t: reminders.cancel_reminder_repeat(app, c, t), picked),
+            ]
+            scheduled = len(app.job_queue.jobs())
+
+            fired_started = time.perf_counter()
+            firing = await _fire_all(app, clock, horizon, step)
+            fire_seconds = time.perf_counter() - fired_started
+    finally:
+        await app.job_queue.stop(wait=False)
+        await app.shutdown()
+
+    results.append(BenchResult.from_samples(f"fire_delay@{n}", firing.delays))
+    meta = {
+        "scheduled": scheduled,
+        "bytes_per_reminder": round((after - before) / n),
+        "fired": firing.submitted,
+        "missed": firing.missed,
+        "fire_per_sec": round(firing.submitted / fire_seconds, 1) if fire_seconds else 0.0,
+        "max_lateness_s": round(max(firing.lateness, default=0.0), 3),
+    }
+    return results, meta
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, nargs="+", default=[10_000, 50_000],
+                        help="размеры очереди (по умолчанию 10000 50000)")
+    parser.add_argument("--chats", type=int, default=1000, help="число чатов, по которым разложены задачи")
+    parser.add_argument("--horizon", type=float, default=600.0, help="на сколько секунд вперёд раскладывать напоминания")
+    parser.add_argument("--step", type=float, default=0.5, help="шаг синтетических часов, секунды")
+    parser.add_argument("--sample", type=int, default=100, help="замеров на операцию при каждом размере")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results: list[BenchResult] = []
+    sizes: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "scheduler.db")
+        db.db_init()
+        for n in args.reminders:
+            size_results, size_meta = asyncio.run(run_size(
+                n, chats=args.chats, horizon=args.horizon, step=args.step, sample=args.sample, seed=args.seed,
+            ))
+            results += size_results
+            sizes[str(n)] = size_meta
+
+    code = report(args, results, {"bench": "scheduler", "step": args.step, "horizon": args.horizon, "sizes": sizes})
+    print()
+    for n, meta in sizes.items():
+        print(
+            f"{n:>7} reminders: {meta['bytes_per_reminder']} B/reminder, fired {meta['fired']} "
+            f"({meta['fire_per_sec']}/s), missed {meta['missed']}, max lateness {meta['max_lateness_s']} s"
+        )
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Бенчмарк холодного старта: от запуска интерпретатора до первого обработанного апдейта.
+
+Каждый замер — отдельный процесс `python -m benchmarks.bench_startup --child`: он
+импортирует main, проходит prepare() (db_init, pending, build_application,
+restore_reminders) и запускает polling против RecordingRequest, у которого
+в очереди лежит один /start. Как только апдейт обработан, процесс печатает фазы
+startup-таймлайна и завершается. Родитель меряет время до этой строки целиком.
+
+    python -m benchmarks.bench_startup                        # 10 запусков
+    python -m benchmarks.bench_startup --save-baseline benchmarks/baselines/startup.json
+    python -m benchmarks.bench_startup --compare benchmarks/baselines/startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from .common import BenchResult, add_common_args, report
+
+ROOT = Path(__file__).resolve().parents[1]
+CHAT_ID = 424242
+FAKE_TOKEN = "123456:STARTUP-BENCH"
+
+
+def run_child() -> None:
+    # main импортируется первым: его фаза imports должна застать PTB незагруженным
+    import main as bot_main
+    from taskbot.startup import startup
+
+    from .fakebot import RecordingRequest, chat_payload, user_payload
+
+    request = RecordingRequest()
+    request.incoming.append({
+        "update_id": 1,
+        "message": {
+            "message_id": 1, "date": int(time.time()), "chat": chat_payload(CHAT_ID),
+            "from": user_payload(CHAT_ID), "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    })
+    app = bot_main.prepare(FAKE_TOKEN, request=request)
+
+    async def serve_until_first_update() -> None:
+        # то же, что run_polling, но с остановкой после первого апдейта
+        await app.initialize()
+        await app.post_init(app)
+        await app.updater.start_polling(allowed_updates=bot_main.ALLOWED_UPDATES)
+        await app.start()
+        while "first_update" not in startup.phases:
+            await asyncio.sleep(0.001)
+        print(json.dumps({"phases": startup.phases, "total": startup.total}), flush=True)
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await app.post_shutdown(app)
+
+    asyncio.run(serve_until_first_update())
+
+
+def run_once(db_path: Path) -> tuple[float, dict]:
+    """(секунды от запуска процесса до первого апдейта, отчёт дочернего процесса)."""
+    env = {**os.environ, "DB_PATH": str(db_path), "METRICS_PORT": "0", "WEBHOOK_URL": ""}
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline()
+    elapsed = time.perf_counter() - started
+    _, stderr = proc.communicate(timeout=30)
+    if proc.returncode != 0 or not line:
+        raise RuntimeError(f"startup child failed (exit {proc.returncode}):\n{stderr}")
+    return elapsed, json.loads(line)
+
+
+def run_benchmarks(iterations: int, db_path: Path, warmup: int = 1) -> list[BenchResult]:
+    for _ in range(warmup):
+        run_once(db_path)
+    wall: list[float] = []
+    phases: dict[str, list[float]] = defaultdict(list)
+    for _ in range(iterations):
+        elapsed, child = run_once(db_path)
+        wall.append(elapsed)
+        for name, seconds in child["phases"].items():
+            phases[name].append(seconds)
+    results = [BenchResult.from_samples("time_to_first_update", wall)]
+    results += [BenchResult.from_samples(f"phase:{name}", samples) for name, samples in phases.items()]
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", type=Path, help="файл БД (по умолчанию — новый во временном каталоге)")
+    add_common_args(parser)
+    parser.set_defaults(iterations=10)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child()
+        return 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run_benchmarks(args.iterations, args.db or Path(tmp) / "startup.db")
+    return report(args, results, {"bench": "startup", "iterations": args.iterations})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Общее для бенчмарков: замер, перцентили, таблица, baseline JSON и сравнение с ним."""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Перцентиль q (0..100) с линейной интерполяцией; samples не обязаны быть отсортированы."""
+    if not samples:
+        return 0.0
+    data = sorted(samples)
+    k = (len(data) - 1) * q / 100
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    if lo == hi:
+        return data[lo]
+    return data[lo] + (data[hi] - data[lo]) * (k - lo)
+
+
+@dataclass
+class BenchResult:
+    name: str
+    n: int
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    ops_per_sec: float
+
+    @classmethod
+    def from_samples(cls, name: str, samples: list[float]) -> "BenchResult":
+        """samples — длительности в секундах."""
+        total = sum(samples)
+        return cls(
+            name=name,
+            n=len(samples),
+            p50_ms=round(percentile(samples, 50) * 1000, 4),
+            p99_ms=round(percentile(samples, 99) * 1000, 4),
+            mean_ms=round(total / len(samples) * 1000, 4) if samples else 0.0,
+            ops_per_sec=round(len(samples) / total, 1) if total else 0.0,
+        )
+
+
+def measure(
+    name: str,
+    fn: Callable[..., Any],
+    *,
+    iterations: int,
+    prepare: Optional[Callable[[], tuple]] = None,
+    warmup: int = 3,
+) -> BenchResult:
+    """Вызывает fn(*prepare()) iterations раз; время подготовки аргументов не учитывается."""
+    for _ in range(warmup):
+        fn(*(prepare() if prepare else ()))
+    samples = []
+    for _ in range(iterations):
+        args = prepare() if prepare else ()
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    return BenchResult.from_samples(name, samples)
+
+
+def print_table(results: list[BenchResult], out=sys.stdout) -> None:
+    width = max([len(r.name) for r in results] + [4])
+    print(f"{'name':<{width}}  {'n':>6}  {'p50 ms':>10}  {'p99 ms':>10}  {'ops/s':>10}", file=out)
+    for r in results:
+        print(f"{r.name:<{width}}  {r.n:>6}  {r.p50_ms:>10.3f}  {r.p99_ms:>10.3f}  {r.ops_per_sec:>10.1f}", file=out)
+
+
+def save_baseline(path: str | Path, results: list[BenchResult], meta: dict[str, Any]) -> None:
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "meta": meta,
+        "results": [asdict(r) for r in results],
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load_baseline(path: str | Path) -> dict[str, dict[str, Any]]:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {r["name"]: r for r in payload.get("results", [])}
+
+
+def compare(
+    results: list[BenchResult],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+    metric: str = "p50_ms",
+) -> list[tuple[str, float, float]]:
+    """Регрессии: (имя, было, стало) там, где metric выросла больше чем в threshold раз."""
+    regressions = []
+    for r in results:
+        base = baseline.get(r.name)
+        if not base or not base.get(metric):
+            continue
+        now = getattr(r, metric)
+        if now > base[metric] * threshold:
+            regressions.append((r.name, base[metric], now))
+    return regressions
+
+
+def add_common_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--iterations", type=int, default=200, help="замеров на функцию")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", metavar="PATH", help="сохранить результаты как baseline JSON")
+    parser.add_argument("--compare", metavar="PATH", help="сравнить с baseline JSON")
+    parser.add_argument(
+        "--threshold", type=float, default=1.25,
+        help="во сколько раз p50 может вырасти относительно baseline (по умолчанию 1.25)",
+    )
+
+
+def report(args: argparse.Namespace, results: list[BenchResult], meta: dict[str, Any]) -> int:
+    """Печатает таблицу, сохраняет/сравнивает baseline; код выхода 1 — есть регрессии."""
+    print_table(results)
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, meta)
+        print(f"\nbaseline saved: {args.save_baseline}")
+    if args.compare:
+        regressions = compare(results, load_baseline(args.compare), args.threshold)
+        if regressions:
+            print(f"\nregressions (p50 > baseline x {args.threshold}):")
+            for name, before, after in regressions:
+                print(f"  {name}: {before:.3f} ms -> {after:.3f} ms")
+            return 1
+        print(f"\nno regressions against {args.compare}")
+    return 0
@@ -0,0 +1,110 @@
+"""Поддельный HTTP-слой Bot API: отвечает правдоподобными объектами, записывает вызовы, имитирует задержку.
+
+Подключается штатной точкой расширения PTB — Application.builder().request(...),
+поэтому бот, хэндлеры и их обращения к API работают без изменений.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Optional
+
+from telegram.request import BaseRequest, RequestData
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "taskbot", "username": "taskbot_bench_bot"}
+ADMIN_USER_ID = 1_000_000
+
+
+def chat_payload(chat_id: int) -> dict[str, Any]:
+    if chat_id < 0:
+        return {"id": chat_id, "type": "supergroup", "title": f"group {chat_id}"}
+    return {"id": chat_id, "type": "private", "first_name": f"user {chat_id}"}
+
+
+def user_payload(user_id: int) -> dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+class RecordingRequest(BaseRequest):
+    """BaseRequest, который не ходит в сеть.
+
+    calls — счётчик вызовов по методам Bot API; latency/jitter — имитация сетевой
+    задержки в секундах (равномерно latency ± jitter). incoming — апдейты (dict в
+    формате Bot API), которые отдаст следующий getUpdates.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter[str] = Counter()
+        self.incoming: list[dict[str, Any]] = []
+        self._rng = random.Random(seed)
+        self._message_id = 10_000
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=None,
+        write_timeout=None,
+        connect_timeout=None,
+        pool_timeout=None,
+    ) -> tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls[api_method] += 1
+        delay = self.latency + self._rng.uniform(-self.jitter, self.jitter) if self.latency else 0.0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        params = request_data.parameters if request_data is not None else {}
+        if api_method == "getUpdates" and not self.incoming:
+            # long polling без апдейтов: не крутим цикл вхолостую
+            await asyncio.sleep(0.01)
+        body = {"ok": True, "result": self._result(api_method, params)}
+        return 200, json.dumps(body).encode("utf-8")
+
+    def _message(self, params: dict[str, Any], message_id: Optional[int] = None) -> dict[str, Any]:
+        if message_id is None:
+            self._message_id += 1
+            message_id = self._message_id
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": chat_payload(int(params.get("chat_id", 0))),
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    def _result(self, api_method: str, params: dict[str, Any]) -> Any:
+        if api_method == "getMe":
+            return {**BOT_USER, "can_join_groups": True, "can_read_all_group_messages": False,
+                    "supports_inline_queries": False}
+        if api_method == "sendMessage":
+            return self._message(params)
+        if api_method == "editMessageText":
+            return self._message(params, int(params.get("message_id", 0)))
+        if api_method == "getChatAdministrators":
+            return [{"status": "creator", "user": user_payload(ADMIN_USER_ID), "is_anonymous": False}]
+        if api_method == "getUpdates":
+            updates, self.incoming = self.incoming, []
+            return updates
+        if api_method == "getChatMember":
+            return {"status": "member", "user": user_payload(int(params.get("user_id", 0)))}
+        return True
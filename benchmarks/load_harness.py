@@ -0,0 +1,339 @@
+"""Нагрузочный прогон хэндлеров end-to-end: синтетические Update → настоящий Application → поддельный Bot API.
+
+Апдейты идут через тот же стек, что и в проде: ChatOrderedUpdateProcessor,
+фильтры, CallbackRouter, services, SQLite. Вместо Telegram — RecordingRequest,
+который записывает вызовы и имитирует сетевую задержку.
+
+    python -m benchmarks.load_harness                       # 500 групп x 5 пользователей
+    python -m benchmarks.load_harness --chats 50 --latency 0.05 --rate 200
+    python -m benchmarks.load_harness --save-baseline benchmarks/baselines/load.json
+
+Отчёт: пропускная способность, p50/p99 по типам апдейтов (время в хэндлере и
+от постановки в очередь до завершения), вызовы Bot API и DB-сессии на апдейт.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from telegram import Update
+
+from main import build_application
+from taskbot import db
+from taskbot.chat_runtime import get_chat_runtime_registry
+from taskbot.config import FLASH_SECONDS_DEFAULT
+from taskbot.pending import pending_store
+from taskbot.permissions import admin_cache
+
+from .common import BenchResult, add_common_args, report
+from .fakebot import BOT_USER, RecordingRequest, chat_payload, user_payload
+
+GROUP_BASE = -1_001_000_000_000
+PANEL_MESSAGE_ID = 1
+
+# тип действия -> вес; действие может порождать несколько апдейтов подряд
+ACTION_WEIGHTS = {
+    "list": 25,
+    "hist": 5,
+    "add": 20,
+    "done": 10,
+    "reminder_ack": 5,
+    "reminder_s30": 5,
+    "chatter": 30,
+}
+
+
+@dataclass
+class SyntheticUpdate:
+    kind: str
+    chat_id: int
+    payload: dict[str, Any]
+
+
+@dataclass
+class Scenario:
+    """Сценарий «N групп по M пользователей, K действий на пользователя»."""
+
+    chats: int = 500
+    users: int = 5
+    actions: int = 4
+    tasks_per_chat: int = 15
+    seed: int = 42
+
+    chat_ids: list[int] = field(init=False)
+
+    def __post_init__(self):
+        self.chat_ids = [GROUP_BASE - i for i in range(self.chats)]
+
+    def seed_database(self) -> dict[int, list[int]]:
+        """Начальные задачи и панель в каждом чате; возвращает открытые task_id по чатам."""
+        rng = random.Random(self.seed)
+        open_ids: dict[int, list[int]] = {}
+        for chat_id in self.chat_ids:
+            owner = self.user_id(chat_id, 0)
+            ids = db.insert_tasks(chat_id, owner, f"user{owner}", [f"seed task {i}" for i in range(self.tasks_per_chat)])
+            db.set_panel_message_id(chat_id, PANEL_MESSAGE_ID)
+            rng.shuffle(ids)
+            open_ids[chat_id] = ids
+        return open_ids
+
+    def user_id(self, chat_id: int, index: int) -> int:
+        return abs(chat_id) % 1_000_000 * 10 + index + 1
+
+    def updates(self, open_ids: dict[int, list[int]]) -> list[SyntheticUpdate]:
+        """Поток апдейтов: внутри чата — осмысленный порядок, между чатами — случайное перемешивание."""
+        rng = random.Random(self.seed)
+        kinds = list(ACTION_WEIGHTS)
+        weights = list(ACTION_WEIGHTS.values())
+        per_chat: list[list[tuple[str, int, str]]] = []
+
+        for chat_id in self.chat_ids:
+            ids = list(open_ids.get(chat_id, []))
+            seq = [("cmd_start", self.user_id(chat_id, 0), "/start")]
+            for _ in range(self.actions):
+                for u in range(self.users):
+                    user = self.user_id(chat_id, u)
+                    action = rng.choices(kinds, weights)[0]
+                    if action in ("done", "reminder_ack", "reminder_s30") and not ids:
+                        action = "add"
+                    if action == "list":
+                        seq.append(("cb_list", user, "A:LIST"))
+                    elif action == "hist":
+                        seq.append(("cb_hist", user, "A:HIST"))
+                    elif action == "add":
+                        seq.append(("cb_add", user, "A:ADD"))
+                        seq.append(("text_add", user, f"новая задача {rng.randrange(10**6)}"))
+                    elif action == "done":
+                        task_id = ids.pop()
+                        seq.append(("cb_done_picker", user, "A:DONE"))
+                        seq.append(("cb_select", user, f"SEL:DONE:{task_id}"))
+                        seq.append(("cb_apply", user, "APPLY:DONE"))
+                    elif action == "reminder_ack":
+                        seq.append(("cb_reminder_ack", user, f"RM:ACK:{ids.pop()}"))
+                    elif action == "reminder_s30":
+                        seq.append(("cb_reminder_s30", user, f"RM:S30:{rng.choice(ids)}"))
+                    else:
+                        seq.append(("text_chatter", user, "просто сообщение в чате"))
+            per_chat.append([(kind, user, data) for kind, user, data in seq])
+
+        # случайное слияние очередей чатов с сохранением порядка внутри каждой
+        cursors = [0] * len(per_chat)
+        alive = list(range(len(per_chat)))
+        out: list[SyntheticUpdate] = []
+        update_id = 1
+        message_id = 100_000
+        while alive:
+            i = rng.randrange(len(alive))
+            idx = alive[i]
+            kind, user, data = per_chat[idx][cursors[idx]]
+            cursors[idx] += 1
+            if cursors[idx] >= len(per_chat[idx]):
+                alive[i] = alive[-1]
+                alive.pop()
+            chat_id = self.chat_ids[idx]
+            message_id += 1
+            out.append(SyntheticUpdate(kind, chat_id, _update_payload(update_id, message_id, chat_id, user, kind, data)))
+            update_id += 1
+        return out
+
+
+def _update_payload(update_id: int, message_id: int, chat_id: int, user_id: int, kind: str, data: str) -> dict:
+    chat = chat_payload(chat_id)
+    user = user_payload(user_id)
+    now = int(time.time())
+    if kind.startswith("cb_"):
+        reply_to = PANEL_MESSAGE_ID if not kind.startswith("cb_reminder") else message_id
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": user,
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": {"message_id": reply_to, "date": now, "chat": chat, "from": BOT_USER, "text": "panel"},
+            },
+        }
+    message = {"message_id": message_id, "date": now, "chat": chat, "from": user, "text": data}
+    if data.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(data.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+class SessionCounter:
+    """Считает открытия SQLite-сессий (подменяет db.db_connect на время прогона)."""
+
+    def __init__(self):
+        self.count = 0
+        self._original = db.db_connect
+
+    def __enter__(self):
+        def counting_connect():
+            self.count += 1
+            return self._original()
+
+        db.db_connect = counting_connect
+        return self
+
+    def __exit__(self, *exc):
+        db.db_connect = self._original
+
+
+@dataclass
+class LoadReport:
+    updates: int
+    elapsed: float
+    handler: dict[str, list[float]]
+    end_to_end: dict[str, list[float]]
+    api_calls: Counter
+    db_sessions: int
+    errors: int
+
+    @property
+    def throughput(self) -> float:
+        return self.updates / self.elapsed if self.elapsed else 0.0
+
+    def results(self) -> list[BenchResult]:
+        out = [BenchResult.from_samples(f"handler:{k}", v) for k, v in sorted(self.handler.items())]
+        out += [BenchResult.from_samples(f"e2e:{k}", v) for k, v in sorted(self.end_to_end.items())]
+        return out
+
+    def print(self, out=sys.stdout) -> None:
+        total_calls = sum(self.api_calls.values())
+        print(f"updates:            {self.updates}", file=out)
+        print(f"elapsed:            {self.elapsed:.2f}s", file=out)
+        print(f"throughput:         {self.throughput:.1f} updates/s", file=out)
+        print(f"errors:             {self.errors}", file=out)
+        print(f"bot api calls:      {total_calls} ({total_calls / max(self.updates, 1):.2f} per update)", file=out)
+        for name, n in self.api_calls.most_common():
+            print(f"  {name:<22} {n}", file=out)
+        print(f"db sessions:        {self.db_sessions} ({self.db_sessions / max(self.updates, 1):.2f} per update)", file=out)
+        print(file=out)
+
+
+async def run_load(
+    scenario: Scenario,
+    *,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    rate: float = 0.0,
+    drain: float = FLASH_SECONDS_DEFAULT + 0.5,
+) -> LoadReport:
+    """Прогоняет сценарий через настоящий Application. Вызывающий отвечает за db.DB_PATH."""
+    db.db_init()
+    pending_store.load()
+    admin_cache.clear()
+    open_ids = scenario.seed_database()
+    synthetic = scenario.updates(open_ids)
+
+    request = RecordingRequest(latency=latency, jitter=jitter, seed=scenario.seed)
+    app = build_application("123456:BENCHMARK", request=request)
+    errors = 0
+
+    async def count_errors(update, context):
+        nonlocal errors
+        errors += 1
+
+    app.add_error_handler(count_errors)
+    handler_lat: dict[str, list[float]] = defaultdict(list)
+    e2e_lat: dict[str, list[float]] = defaultdict(list)
+
+    await app.initialize()
+    await app.start()
+    request.calls.clear()
+    try:
+        updates = [(s.kind, Update.de_json(s.payload, app.bot)) for s in synthetic]
+
+        async def handle(kind: str, update: Update, submitted: float):
+            started = time.perf_counter()
+            await app.process_update(update)
+            done = time.perf_counter()
+            handler_lat[kind].append(done - started)
+            e2e_lat[kind].append(done - submitted)
+
+        with SessionCounter() as sessions:
+            started = time.perf_counter()
+            tasks = []
+            for i, (kind, update) in enumerate(updates):
+                if rate > 0:
+                    delay = started + i / rate - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                submitted = time.perf_counter()
+                tasks.append(asyncio.create_task(
+                    app.update_processor.process_update(update, handle(kind, update, submitted))
+                ))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+            # отложенные restore панели после flash — тоже часть нагрузки на Bot API
+            if drain > 0:
+                await asyncio.sleep(drain)
+            db_sessions = sessions.count
+    finally:
+        # таймеры flash, не успевшие сработать за drain, не должны пережить остановку
+        get_chat_runtime_registry(app).close()
+        await app.stop()
+        await app.shutdown()
+
+    return LoadReport(
+        updates=len(updates),
+        elapsed=elapsed,
+        handler=dict(handler_lat),
+        end_to_end=dict(e2e_lat),
+        api_calls=Counter(request.calls),
+        db_sessions=db_sessions,
+        errors=errors,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, default=500, help="число групп")
+    parser.add_argument("--users", type=int, default=5, help="пользователей в группе")
+    parser.add_argument("--actions", type=int, default=4, help="действий на пользователя")
+    parser.add_argument("--tasks-per-chat", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка Bot API, секунды")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки, секунды")
+    parser.add_argument("--rate", type=float, default=0.0, help="апдейтов в секунду (0 — все сразу)")
+    parser.add_argument("--drain", type=float, default=FLASH_SECONDS_DEFAULT + 0.5,
+                        help="сколько ждать отложенных вызовов после последнего апдейта")
+    parser.add_argument("--db", type=Path, help="файл БД (по умолчанию — новый во временном каталоге)")
+    add_common_args(parser)
+    args = parser.parse_args(argv)
+
+    logging.getLogger().setLevel(logging.WARNING)
+    scenario = Scenario(
+        chats=args.chats, users=args.users, actions=args.actions,
+        tasks_per_chat=args.tasks_per_chat, seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(args.db or Path(tmp) / "load.db")
+        load = asyncio.run(run_load(
+            scenario, latency=args.latency, jitter=args.jitter, rate=args.rate, drain=args.drain,
+        ))
+
+    load.print()
+    return report(args, load.results(), {
+        "bench": "load",
+        "chats": args.chats,
+        "users": args.users,
+        "actions": args.actions,
+        "latency": args.latency,
+        "rate": args.rate,
+        "throughput": round(load.throughput, 1),
+        "api_calls_per_update": round(sum(load.api_calls.values()) / max(load.updates, 1), 3),
+        "db_sessions_per_update": round(load.db_sessions / max(load.updates, 1), 3),
+    })
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,49 +1,145 @@
+from __future__ import annotations
+
+import time
+
+# отсчёт холодного старта — до всех тяжёлых импортов (PTB, handlers)
+_STARTED = time.perf_counter()
+
 import os
 import logging
 
-from telegram import Update
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+from dotenv import load_dotenv
+
+# taskbot.config читает окружение при импорте — .env нужно подхватить раньше
+load_dotenv()
+
+from telegram.request import BaseRequest, HTTPXRequest
+from telegram.ext import (
+    Application, CommandHandler, CallbackQueryHandler, ChatMemberHandler, MessageHandler, filters,
+)
 
 from taskbot import db
-from taskbot.handlers import start, on_panel_button, on_text, cmd_timezone, cmd_help
+from taskbot.handlers import start, on_panel_button, on_text, on_chat_member, cmd_alert, cmd_timezone, cmd_help
+from taskbot.owner import cmd_dbtop, cmd_debug, cmd_looplag, cmd_profile
 from taskbot.reminders import restore_reminders
 from taskbot.recurring import start_recurring_job
-
-from dotenv import load_dotenv
-load_dotenv()
+# курсы, алерты и история грузятся сразу: их джобы ставятся в build_application.
+# Дорогой части тут нет — httpx уже импортирован PTB, а клиент биржи создаётся при первом запросе
+from taskbot.alerts import start_alerts_job
+from taskbot.history import history_recorder, start_history_job
+from taskbot.updates import ChatOrderedUpdateProcessor
+from taskbot.pending import pending_store, start_pending_flush_job, has_pending_input
+from taskbot.rates import close_http_client, start_rates_refresh_job
+from taskbot.looplag import loop_monitor
+from taskbot.startup import GetUpdatesProbe, startup
+from taskbot.profiling import install_signal_handler, profiler
+from taskbot.metrics import InstrumentedRequest, start_metrics_server, stop_metrics_server, timed_handler
+from taskbot.webhook import ALLOWED_UPDATES, webhook_enabled, webhook_options
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("taskbot.main")
 
+startup.reset(_STARTED)
+startup.mark("imports")
+
+
+async def _post_init(app: Application) -> None:
+    # initialize: сетевой клиент, getMe
+    startup.mark("initialize")
+    await start_metrics_server(app)
+    install_signal_handler()
+    loop_monitor.start()
+    history_recorder.start()
+
+
+async def _post_shutdown(app: Application) -> None:
+    await stop_metrics_server(app)
+    await loop_monitor.stop()
+    history_recorder.stop()
+    await close_http_client()
+    # незавершённую запись профиля всё равно сохраняем на диск
+    profiler.stop()
+    # дописываем в БД pending-состояния, накопленные с последнего flush
+    pending_store.flush()
+
 
 async def _error_handler(update: object, context) -> None:
     logger.error("Unhandled exception in handler", exc_info=context.error)
 
 
-def main():
-    token = os.getenv("BOT_TOKEN")
-    if not token:
-        raise SystemExit("ERROR: set BOT_TOKEN env var BOT_TOKEN")
+def register_handlers(app: Application) -> None:
+    app.add_handler(CommandHandler("start", timed_handler(start)))
+    app.add_handler(CommandHandler("help", timed_handler(cmd_help)))
+    app.add_handler(CommandHandler("timezone", timed_handler(cmd_timezone)))
+    app.add_handler(CommandHandler("alert", timed_handler(cmd_alert)))
+    app.add_handler(CommandHandler("dbtop", timed_handler(cmd_dbtop)))
+    app.add_handler(CommandHandler("profile", timed_handler(cmd_profile)))
+    app.add_handler(CommandHandler("looplag", timed_handler(cmd_looplag)))
+    app.add_handler(CommandHandler("debug", timed_handler(cmd_debug)))
+    app.add_handler(CallbackQueryHandler(timed_handler(on_panel_button)))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & has_pending_input, timed_handler(on_text)))
+    app.add_handler(ChatMemberHandler(timed_handler(on_chat_member), ChatMemberHandler.ANY_CHAT_MEMBER))
+    app.add_error_handler(_error_handler)
 
-    db.db_init()
 
-    app = Application.builder().token(token).build()
+def build_application(token: str, *, request: BaseRequest | None = None) -> Application:
+    """Application со всеми хэндлерами и джобами; request подменяет HTTP-слой (нагрузочные тесты)."""
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+    )
+    # вызовы Bot API (кроме long polling getUpdates) считаются в метриках
+    if request is None:
+        builder = (
+            builder.request(InstrumentedRequest(HTTPXRequest(connection_pool_size=256)))
+            .get_updates_request(GetUpdatesProbe(HTTPXRequest(connection_pool_size=1)))
+        )
+    else:
+        builder = builder.request(InstrumentedRequest(request)).get_updates_request(GetUpdatesProbe(request))
+    app = builder.build()
+    startup.mark("build")
 
     if app.job_queue is None:
         logger.warning("JobQueue is not available. Install: python-telegram-bot[job-queue]")
         logger.warning("Repeating reminders will NOT work without JobQueue.")
 
     restore_reminders(app)
+    startup.mark("restore_reminders")
     start_recurring_job(app)
+    start_pending_flush_job(app)
+    start_rates_refresh_job(app)
+    start_alerts_job(app)
+    start_history_job(app)
+    register_handlers(app)
+    startup.mark("jobs_and_handlers")
+    return app
 
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("help", cmd_help))
-    app.add_handler(CommandHandler("timezone", cmd_timezone))
-    app.add_handler(CallbackQueryHandler(on_panel_button))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
-    app.add_error_handler(_error_handler)
 
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+def prepare(token: str, *, request: BaseRequest | None = None) -> Application:
+    """Всё, что нужно до запуска цикла: схема БД, pending-состояния, Application."""
+    db.db_init()
+    startup.mark("db_init")
+    pending_store.load()
+    startup.mark("pending_load")
+    return build_application(token, request=request)
+
+
+def main():
+    token = os.getenv("BOT_TOKEN")
+    if not token:
+        raise SystemExit("ERROR: set BOT_TOKEN env var BOT_TOKEN")
+
+    app = prepare(token)
+
+    if webhook_enabled():
+        options = webhook_options()
+        logger.info("Starting webhook server on %s:%s/%s", options["listen"], options["port"], options["url_path"])
+        app.run_webhook(**options)
+    else:
+        app.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,306 @@
+"""Ценовые алерты: «USDT/THB ниже 33.5» на чат, проверка на каждом обновлении тикера.
+
+Алерты хранятся в таблице price_alerts и при старте поднимаются в AlertIndex: для
+каждой пары (символ, направление) — пороги в отсортированном списке. На обновлении
+тикера сработавшие алерты находятся одним bisect по каждой такой паре и срезаются
+со списка, так что тик стоит O(символов · log n + сработавших), а не O(всех алертов).
+
+Сработавший алерт становится задачей с напоминанием «сейчас» и дальше идёт обычным
+путём напоминаний: сообщение ⏰ с кнопками и повторы, пока его не подтвердят. Задачи
+сработавших разом алертов пишутся пачкой: одна транзакция создаёт задачи и удаляет
+алерты, ещё одна пишет аудит.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from telegram.ext import Application, ContextTypes
+
+from . import db, services
+from .config import ALERTS_CHECK_SECONDS, TZ
+from .metrics import registry
+from .rates import last_price, rate_cache
+
+logger = logging.getLogger(__name__)
+
+BELOW = "below"
+ABOVE = "above"
+
+_DIRECTIONS = {
+    "<": BELOW, "<=": BELOW, "ниже": BELOW, "below": BELOW,
+    ">": ABOVE, ">=": ABOVE, "выше": ABOVE, "above": ABOVE,
+}
+_ALERT_RE = re.compile(
+    r"^\s*([a-z0-9]+)(?:[/_]([a-z0-9]+))?\s*(<=|>=|<|>|ниже|выше|below|above)\s*(\d[\d ]*(?:[.,]\d+)?)\s*$",
+    re.IGNORECASE,
+)
+_DEFAULT_QUOTE = "THB"
+# сработавших алертов на одну джобу доставки
+_DELIVERY_BATCH = 500
+
+ALERTS_TRIGGERED = registry.counter(
+    "taskbot_price_alerts_triggered_total", "Price alerts that fired, by symbol.", ("symbol",),
+)
+
+
+@dataclass(frozen=True)
+class Alert:
+    id: int
+    chat_id: int
+    symbol: str
+    direction: str
+    threshold: float
+    owner_id: Optional[int] = None
+    owner_name: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row) -> "Alert":
+        return cls(
+            id=int(row["id"]),
+            chat_id=int(row["chat_id"]),
+            symbol=row["symbol"],
+            direction=row["direction"],
+            threshold=float(row["threshold"]),
+            owner_id=row["owner_id"],
+            owner_name=row["owner_name"],
+        )
+
+    @property
+    def label(self) -> str:
+        word = "ниже" if self.direction == BELOW else "выше"
+        return f"{self.symbol.replace('_', '/')} {word} {format_price(self.threshold)}"
+
+    def triggered_by(self, price: float) -> bool:
+        return price <= self.threshold if self.direction == BELOW else price >= self.threshold
+
+
+def format_price(value: float) -> str:
+    """33.5 → «33.5», 2500000 → «2,500,000»."""
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+
+def parse_alert(text: str) -> Optional[tuple[str, str, float]]:
+    """«USDT < 33.5», «usdt/thb ниже 33,5», «BTC_THB above 2 500 000» → (символ, направление, порог)."""
+    m = _ALERT_RE.match(text or "")
+    if not m:
+        return None
+    base, quote, op, number = m.groups()
+    try:
+        threshold = float(number.replace(" ", "").replace(",", "."))
+    except ValueError:
+        return None
+    if threshold <= 0:
+        return None
+    symbol = f"{base}_{quote or _DEFAULT_QUOTE}".upper()
+    return symbol, _DIRECTIONS[op.lower()], threshold
+
+
+class AlertIndex:
+    """Алерты в памяти: по (символ, направление) — параллельные списки порогов и id, отсортированные по порогу."""
+
+    def __init__(self):
+        self._alerts: dict[int, Alert] = {}
+        self._books: dict[tuple[str, str], tuple[list[float], list[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._alerts
+
+    def symbols(self) -> set[str]:
+        return {symbol for symbol, _ in self._books}
+
+    def add(self, alert: Alert) -> None:
+        self.remove(alert.id)
+        keys, ids = self._books.setdefault((alert.symbol, alert.direction), ([], []))
+        i = bisect_right(keys, alert.threshold)
+        keys.insert(i, alert.threshold)
+        ids.insert(i, alert.id)
+        self._alerts[alert.id] = alert
+
+    def remove(self, alert_id: int) -> Optional[Alert]:
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        book = (alert.symbol, alert.direction)
+        keys, ids = self._books[book]
+        lo = bisect_left(keys, alert.threshold)
+        i = ids.index(alert.id, lo, bisect_right(keys, alert.threshold))
+        del keys[i], ids[i]
+        if not keys:
+            del self._books[book]
+        return alert
+
+    def pop_triggered(self, symbol: str, price: float) -> list[Alert]:
+        """Снимает и возвращает алерты symbol, для которых price пересёк порог."""
+        fired: list[int] = []
+        below = self._books.get((symbol, BELOW))
+        if below is not None:
+            # «ниже X» срабатывает при price <= X: хвост списка с порогами >= price
+            keys, ids = below
+            i = bisect_left(keys, price)
+            fired += ids[i:]
+            del keys[i:], ids[i:]
+            if not keys:
+                del self._books[(symbol, BELOW)]
+        above = self._books.get((symbol, ABOVE))
+        if above is not None:
+            # «выше X» срабатывает при price >= X: голова списка с порогами <= price
+            keys, ids = above
+            i = bisect_right(keys, price)
+            fired += ids[:i]
+            del keys[:i], ids[:i]
+            if not keys:
+                del self._books[(symbol, ABOVE)]
+        return [self._alerts.pop(alert_id) for alert_id in fired]
+
+
+class AlertEngine:
+    """Индекс алертов процесса, их хранение в БД и проверка на каждом обновлении тикера."""
+
+    def __init__(self):
+        self.index = AlertIndex()
+        # сработавшие алерты: с индекса уже сняты, в БД ещё есть, ждут джобу доставки
+        self.firing: dict[int, Alert] = {}
+        self._app: Optional[Application] = None
+
+    def attach(self, app: Application) -> None:
+        """Поднимает алерты из БД; сработавшие будут доставляться через JobQueue этого app."""
+        self._app = app
+        self.index = AlertIndex()
+        self.firing = {}
+        for row in db.alert_fetch_all():
+            self.index.add(Alert.from_row(row))
+
+    def add(self, chat_id: int, owner_id: int, owner_name: str, symbol: str, direction: str, threshold: float) -> Alert:
+        alert_id = db.alert_insert(chat_id, owner_id, owner_name, symbol, direction, threshold)
+        alert = Alert(alert_id, chat_id, symbol, direction, threshold, owner_id, owner_name)
+        self.index.add(alert)
+        return alert
+
+    def remove(self, chat_id: int, alert_id: int) -> bool:
+        if not db.alert_delete(chat_id, alert_id):
+            return False
+        # если алерт уже сработал, задачу по нему не создаст джоба доставки: она сверяется с БД
+        self.index.remove(alert_id)
+        self.firing.pop(alert_id, None)
+        return True
+
+    def evaluate(self, ticker: dict[str, dict]) -> list[tuple[Alert, float]]:
+        """Снимает с индекса все сработавшие по этому тикеру алерты."""
+        fired: list[tuple[Alert, float]] = []
+        for symbol in self.index.symbols():
+            price = last_price(ticker.get(symbol))
+            if price is None:
+                continue
+            fired += [(alert, price) for alert in self.index.pop_triggered(symbol, price)]
+        return fired
+
+    def settle(self, alert_ids: list[int]) -> None:
+        """Доставка алертов завершена (задача создана или алерт удалён, пока ждал)."""
+        for alert_id in alert_ids:
+            self.firing.pop(alert_id, None)
+
+    def requeue(self, alerts: list[Alert]) -> int:
+        """Возвращает в индекс алерты, доставка которых не удалась, кроме удалённых за это время."""
+        waiting = [alert for alert in alerts if self.firing.pop(alert.id, None) is not None]
+        try:
+            alive = db.alert_alive_ids([alert.id for alert in waiting])
+        except Exception:
+            # БД недоступна — верим памяти: /alert del снимает алерт и с firing
+            alive = {alert.id for alert in waiting}
+        back = [alert for alert in waiting if alert.id in alive]
+        for alert in back:
+            self.index.add(alert)
+        return len(back)
+
+    def on_ticker(self, ticker: dict[str, dict]) -> None:
+        if self._app is None or self._app.job_queue is None or not self.index:
+            return
+        fired = self.evaluate(ticker)
+        for alert, _ in fired:
+            self.firing[alert.id] = alert
+        # запись задач и напоминаний — в джобах, не в обновлении кэша курсов; при массовом
+        # срабатывании пачками, чтобы одна джоба не держала event loop
+        for i in range(0, len(fired), _DELIVERY_BATCH):
+            self._app.job_queue.run_once(
+                _deliver_alerts, when=0, name="price_alerts_fire", data=fired[i:i + _DELIVERY_BATCH],
+            )
+
+
+alert_engine = AlertEngine()
+rate_cache.subscribe(alert_engine.on_ticker)
+
+registry.collected(
+    "taskbot_price_alerts", "Active price alerts in memory.", (),
+    lambda: [((), len(alert_engine.index))],
+)
+
+
+def deliver_alerts(app: Application, fired: list[tuple[Alert, float]]) -> dict[int, int]:
+    """Сработавшие алерты → задачи с напоминанием «сейчас»; дальше их ведёт обычный путь напоминаний.
+
+    Задачи создаются и алерты удаляются одной транзакцией: удалённый за время ожидания
+    алерт задачу не создаёт, доставленный не создаст её повторно. Возвращает {alert_id: task_id}.
+    """
+    now = datetime.now(TZ)
+    owners = {alert.id: (alert.owner_id or 0, alert.owner_name or "alert") for alert, _ in fired}
+    task_ids = db.alert_fire_many([
+        (alert.id, alert.chat_id, *owners[alert.id], f"💱 {alert.label}: сейчас {format_price(price)} ฿", now.isoformat())
+        for alert, price in fired
+    ])
+    try:
+        services.register_reminded_tasks(app=app, tasks=[
+            (alert.chat_id, *owners[alert.id], task_ids[alert.id], now) for alert, _ in fired if alert.id in task_ids
+        ])
+    except Exception:
+        # задачи уже в БД с remind_at: алерты доставлены, напоминания поднимет restore_reminders
+        logger.warning("price alerts: reminders not scheduled for %s tasks", len(task_ids), exc_info=True)
+    return task_ids
+
+
+async def _deliver_alerts(context: ContextTypes.DEFAULT_TYPE):
+    fired: list[tuple[Alert, float]] = context.job.data
+    alerts = [alert for alert, _ in fired]
+    try:
+        task_ids = deliver_alerts(context.application, fired)
+    except Exception:
+        # транзакция откатилась: ни задач, ни удалённых алертов — пусть сработают на следующем тикере
+        logger.warning("price alerts delivery failed count=%s", len(fired), exc_info=True)
+        alert_engine.requeue(alerts)
+        return
+    alert_engine.settle([alert.id for alert in alerts])
+    for alert in alerts:
+        if alert.id in task_ids:
+            ALERTS_TRIGGERED.inc(alert.symbol)
+
+
+async def _alerts_tick(context: ContextTypes.DEFAULT_TYPE):
+    if not alert_engine.index:
+        return
+    age = rate_cache.age
+    if age is not None and age < ALERTS_CHECK_SECONDS:
+        # тикер недавно обновили (RATES или rates_refresh) — алерты по нему уже проверены
+        return
+    if rate_cache.refreshing:
+        # запрос уже идёт (при недоступной бирже — дольше интервала): алерты проверятся по его итогу
+        return
+    await rate_cache.refresh()
+
+
+def start_alerts_job(app: Application):
+    if app.job_queue is None:
+        return
+    alert_engine.attach(app)
+    app.job_queue.run_repeating(
+        _alerts_tick,
+        interval=ALERTS_CHECK_SECONDS,
+        first=ALERTS_CHECK_SECONDS,
+        name="price_alerts",
+    )
@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import Optional, Any
+from typing import Iterable, Optional, Any
 
 from . import db
 
@@ -13,4 +13,26 @@ def log_action(chat_id: int, actor_id: int, actor_name: str, action: str, task_i
         meta_str = json.dumps(meta, ensure_ascii=False) if meta is not None else None
         db.audit_insert(chat_id, actor_id, actor_name, action, task_id, meta_str)
     except Exception:
-        logger.exception("audit log_action failed chat_id=%s action=%s task_id=%s", chat_id, action, task_id)
\ No newline at end of file
+        logger.exception("audit log_action failed chat_id=%s action=%s task_id=%s", chat_id, action, task_id)
+
+
+def log_actions(chat_id: int, actor_id: int, actor_name: str, action: str, task_ids: Iterable[int], meta: Optional[dict[str, Any]] = None):
+    """Одно и то же действие над несколькими задачами — одной пачкой записей."""
+    task_ids = list(task_ids)
+    try:
+        meta_str = json.dumps(meta, ensure_ascii=False) if meta is not None else None
+        db.audit_insert_many([(chat_id, actor_id, actor_name, action, tid, meta_str) for tid in task_ids])
+    except Exception:
+        logger.exception("audit log_actions failed chat_id=%s action=%s task_ids=%s", chat_id, action, task_ids)
+
+
+def log_entries(entries: Iterable[tuple[int, int, str, str, Optional[int], Optional[dict[str, Any]]]]):
+    """Записи разных чатов и действий — одной пачкой: (chat_id, actor_id, actor_name, action, task_id, meta)."""
+    entries = list(entries)
+    try:
+        db.audit_insert_many([
+            (chat_id, actor_id, actor_name, action, task_id, json.dumps(meta, ensure_ascii=False) if meta is not None else None)
+            for chat_id, actor_id, actor_name, action, task_id, meta in entries
+        ])
+    except Exception:
+        logger.exception("audit log_entries failed entries=%s", len(entries))
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Optional
 
 
 class CB:
@@ -19,11 +19,18 @@ class CB:
     RECUR_DEL_PICK = "A:RECUR_DEL"
     RATES = "A:RATES"
 
+    # list pages
+    PAGE = "PAGE"  # f"PAGE:{page}"
+
     # pickers
     DONE_PICK = "DONE"  # f"DONE:{task_id}"
     DEL_PICK = "DEL"  # f"DEL:{task_id}"
     REM_PICK = "REM"  # f"REM:{task_id}"
 
+    # multi-select pickers (kind: DONE / DEL)
+    SEL = "SEL"  # f"SEL:{kind}:{task_id}"
+    APPLY = "APPLY"  # f"APPLY:{kind}"
+
     # reminder set
     RSET = "RSET"  # f"RSET:{task_id}:{kind}"
 
@@ -45,6 +52,14 @@ def cb_rem(task_id: int) -> str:
     return f"{CB.REM_PICK}:{task_id}"
 
 
+def cb_sel(kind: str, task_id: int) -> str:
+    return f"{CB.SEL}:{kind}:{task_id}"
+
+
+def cb_apply(kind: str) -> str:
+    return f"{CB.APPLY}:{kind}"
+
+
 def cb_rset(task_id: int, kind: str) -> str:
     return f"{CB.RSET}:{task_id}:{kind}"
 
@@ -61,6 +76,10 @@ def cb_recur_del(rec_id: int) -> str:
     return f"RECUR_DEL:{rec_id}"
 
 
+def cb_page(page: int) -> str:
+    return f"{CB.PAGE}:{page}"
+
+
 def cb_recur_sched(kind: str, day: int, month: Optional[int] = None) -> str:
     if kind == "Y" and month is not None:
         return f"RSCHED:Y:{day}:{month}"
@@ -77,7 +96,10 @@ class ParsedCallback:
       - 'PICK_DONE'      — выбор задачи для DONE
       - 'PICK_DEL'       — выбор задачи для DEL
       - 'PICK_REM'       — выбор задачи для REM
+      - 'PICK_TOGGLE'    — отметка задачи в мультивыборе (action = DONE/DEL)
+      - 'PICK_APPLY'     — применить мультивыбор (action = DONE/DEL)
       - 'RSET'           — изменение настроек напоминания
+      - 'LIST_PAGE'      — страница списка задач (task_id = номер страницы)
       - 'UNKNOWN'        — нераспознанный формат
     """
 
@@ -87,6 +109,119 @@ class ParsedCallback:
     task_id: Optional[int] = None
 
 
+def _parse_int(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _parse_reminder_msg(data: str) -> ParsedCallback:
+    # reminder message actions: RM:ACK:task_id / RM:S30:task_id
+    parts = data.split(":")
+    if len(parts) == 3:
+        _, action, task_id_str = parts
+        return ParsedCallback(type="REMINDER_MSG", raw=data, action=action, task_id=_parse_int(task_id_str))
+    return ParsedCallback(type="UNKNOWN", raw=data)
+
+
+def _id_parser(type_: str):
+    # "DONE:123", "DEL:123", "REM:123", "RECUR_DEL:rec_id", "PAGE:n" — всё после первого ":" это id
+    def parse(data: str) -> ParsedCallback:
+        _, id_str = data.split(":", 1)
+        return ParsedCallback(type=type_, raw=data, task_id=_parse_int(id_str))
+
+    return parse
+
+
+def _parse_pick_toggle(data: str) -> ParsedCallback:
+    # multi-select toggle: SEL:KIND:task_id
+    parts = data.split(":")
+    if len(parts) == 3 and parts[1] in PICK_KINDS:
+        return ParsedCallback(type="PICK_TOGGLE", raw=data, action=parts[1], task_id=_parse_int(parts[2]))
+    return ParsedCallback(type="UNKNOWN", raw=data)
+
+
+def _parse_pick_apply(data: str) -> ParsedCallback:
+    # multi-select apply: APPLY:KIND
+    parts = data.split(":")
+    if len(parts) == 2 and parts[1] in PICK_KINDS:
+        return ParsedCallback(type="PICK_APPLY", raw=data, action=parts[1])
+    return ParsedCallback(type="UNKNOWN", raw=data)
+
+
+def _parse_recur_sched(data: str) -> ParsedCallback:
+    parts = data.split(":")
+    if len(parts) >= 3:
+        action = ":".join(parts[1:])  # "M:5" or "Y:15:12"
+        return ParsedCallback(type="RECUR_SCHED", raw=data, action=action)
+    return ParsedCallback(type="UNKNOWN", raw=data)
+
+
+def _parse_rset(data: str) -> ParsedCallback:
+    # reminder set: RSET:task_id:KIND
+    parts = data.split(":")
+    if len(parts) >= 3:
+        _, task_id_str, kind = parts[0], parts[1], parts[2]
+        return ParsedCallback(type="RSET", raw=data, action=kind, task_id=_parse_int(task_id_str))
+    return ParsedCallback(type="UNKNOWN", raw=data)
+
+
+# пикеры с мультивыбором
+PICK_KINDS = frozenset({"DONE", "DEL"})
+
+# panel actions (LIST/ADD/DONE/DEL/REM/HIST/RECUR/RECUR_ADD/...) — точное совпадение
+PANEL_ACTIONS = frozenset({
+    CB.LIST,
+    CB.ADD,
+    CB.DONE,
+    CB.DEL,
+    CB.REM,
+    CB.HIST,
+    CB.RECUR,
+    CB.RECUR_ADD,
+    CB.RECUR_ADD_CUSTOM,
+    CB.RECUR_DEL_PICK,
+    CB.RATES,
+})
+
+# остальные форматы — по префиксу до первого ":"
+# (RECUR_DEL: task_id в ParsedCallback = rec_id; PAGE: task_id = номер страницы)
+PREFIX_PARSERS = {
+    CB.RM: _parse_reminder_msg,
+    CB.DONE_PICK: _id_parser("PICK_DONE"),
+    CB.DEL_PICK: _id_parser("PICK_DEL"),
+    CB.REM_PICK: _id_parser("PICK_REM"),
+    "RECUR_DEL": _id_parser("RECUR_DEL"),
+    "RSCHED": _parse_recur_sched,
+    CB.RSET: _parse_rset,
+    CB.PAGE: _id_parser("LIST_PAGE"),
+    CB.SEL: _parse_pick_toggle,
+    CB.APPLY: _parse_pick_apply,
+}
+
+
+def callback_prefix(data: str) -> Optional[str]:
+    """Префикс callback_data до первого ":" (None, если разделителя нет)."""
+    head, sep, _ = data.partition(":")
+    return head if sep else None
+
+
+def _parse_panel(data: str) -> ParsedCallback:
+    return ParsedCallback(type="PANEL", raw=data, action=data)
+
+
+def parser_for(key: str) -> Callable[[str], ParsedCallback]:
+    """Разбор callback_data, найденного по ключу key (точное значение или префикс).
+
+    Для ключей из PANEL_ACTIONS и PREFIX_PARSERS это сразу нужный разборщик,
+    для прочих — общий parse_callback.
+    """
+    if key in PANEL_ACTIONS:
+        return _parse_panel
+    return PREFIX_PARSERS.get(key, parse_callback)
+
+
 def parse_callback(data: str) -> ParsedCallback:
     """
     Централизованный парсер callback_data.
@@ -95,101 +230,18 @@ def parse_callback(data: str) -> ParsedCallback:
     - "RM:ACK:123", "RM:S30:123"
     - "A:LIST" и др.
     - "DONE:123", "DEL:123", "REM:123"
+    - "SEL:DONE:123", "APPLY:DEL"
     - "RSET:123:KIND"
+
+    Разбор — один поиск в PANEL_ACTIONS и один в PREFIX_PARSERS.
     """
     if not data:
         return ParsedCallback(type="UNKNOWN", raw=data or "")
 
-    # reminder message actions: RM:ACK:task_id / RM:S30:task_id
-    if data.startswith(f"{CB.RM}:") or data.startswith("RM:"):
-        parts = data.split(":")
-        if len(parts) == 3:
-            _, action, task_id_str = parts
-            try:
-                task_id = int(task_id_str)
-            except ValueError:
-                task_id = None
-            return ParsedCallback(
-                type="REMINDER_MSG",
-                raw=data,
-                action=action,
-                task_id=task_id,
-            )
-        return ParsedCallback(type="UNKNOWN", raw=data)
-
-    # panel actions (LIST/ADD/DONE/DEL/REM/HIST/RECUR/RECUR_ADD)
-    if data in {
-        CB.LIST,
-        CB.ADD,
-        CB.DONE,
-        CB.DEL,
-        CB.REM,
-        CB.HIST,
-        CB.RECUR,
-        CB.RECUR_ADD,
-        CB.RECUR_ADD_CUSTOM,
-        CB.RECUR_DEL_PICK,
-        CB.RATES,
-    }:
-        return ParsedCallback(type="PANEL", raw=data, action=data)
-
-    # pickers DONE/DEL/REM (CB-based и старый формат "DONE:123")
-    if data.startswith(f"{CB.DONE_PICK}:") or data.startswith("DONE:"):
-        _, task_id_str = data.split(":", 1)
-        try:
-            task_id = int(task_id_str)
-        except ValueError:
-            task_id = None
-        return ParsedCallback(type="PICK_DONE", raw=data, task_id=task_id)
-
-    if data.startswith(f"{CB.DEL_PICK}:") or data.startswith("DEL:"):
-        _, task_id_str = data.split(":", 1)
-        try:
-            task_id = int(task_id_str)
-        except ValueError:
-            task_id = None
-        return ParsedCallback(type="PICK_DEL", raw=data, task_id=task_id)
-
-    # REM picker (исключая RM:... — они уже разобраны выше)
-    if (data.startswith(f"{CB.REM_PICK}:") or data.startswith("REM:")) and not data.startswith("RM:"):
-        _, task_id_str = data.split(":", 1)
-        try:
-            task_id = int(task_id_str)
-        except ValueError:
-            task_id = None
-        return ParsedCallback(type="PICK_REM", raw=data, task_id=task_id)
-
-    # RECUR_DEL:rec_id (task_id в ParsedCallback = rec_id)
-    if data.startswith("RECUR_DEL:"):
-        _, rec_id_str = data.split(":", 1)
-        try:
-            rec_id = int(rec_id_str)
-        except ValueError:
-            rec_id = None
-        return ParsedCallback(type="RECUR_DEL", raw=data, task_id=rec_id)
-
-    if data.startswith("RSCHED:"):
-        parts = data.split(":")
-        if len(parts) >= 3:
-            action = ":".join(parts[1:])  # "M:5" or "Y:15:12"
-            return ParsedCallback(type="RECUR_SCHED", raw=data, action=action)
-        return ParsedCallback(type="UNKNOWN", raw=data)
+    if data in PANEL_ACTIONS:
+        return _parse_panel(data)
 
-    # reminder set: RSET:task_id:KIND
-    if data.startswith(f"{CB.RSET}:") or data.startswith("RSET:"):
-        parts = data.split(":")
-        if len(parts) >= 3:
-            _, task_id_str, kind = parts[0], parts[1], parts[2]
-            try:
-                task_id = int(task_id_str)
-            except ValueError:
-                task_id = None
-            return ParsedCallback(
-                type="RSET",
-                raw=data,
-                action=kind,
-                task_id=task_id,
-            )
+    parser = PREFIX_PARSERS.get(callback_prefix(data))
+    if parser is None:
         return ParsedCallback(type="UNKNOWN", raw=data)
-
-    return ParsedCallback(type="UNKNOWN", raw=data)
\ No newline at end of file
+    return parser(data)
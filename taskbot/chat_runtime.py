@@ -0,0 +1,180 @@
+"""Реестр runtime-состояния чатов: lock панели, таймер flash, мультивыбор. LRU + вытеснение простаивающих."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional
+
+from telegram.ext import Application
+
+from .config import CHAT_RUNTIME_MAX, CHAT_RUNTIME_IDLE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PickSelection:
+    """Открытый пикер с мультивыбором: что выбираем, из каких задач и что уже отмечено."""
+
+    kind: str
+    rows: list = field(default_factory=list)
+    selected: set[int] = field(default_factory=set)
+
+    def toggle(self, task_id: int) -> bool:
+        """Переключает отметку; задачи не из пикера игнорируются (False)."""
+        if not any(row.id == task_id for row in self.rows):
+            return False
+        if task_id in self.selected:
+            self.selected.discard(task_id)
+        else:
+            self.selected.add(task_id)
+        return True
+
+    def selected_rows(self) -> list:
+        return [row for row in self.rows if row.id in self.selected]
+
+
+@dataclass
+class ChatRuntime:
+    """Всё, что бот держит в памяти про один чат между апдейтами."""
+
+    chat_id: int
+    panel_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    flash_handle: Optional[asyncio.TimerHandle] = None
+    # открытые пикеры по user_id: в группе у каждого свой выбор
+    picks: dict[int, PickSelection] = field(default_factory=dict)
+    last_used: float = field(default_factory=time.monotonic)
+    # сколько корутин держат или ждут panel_lock через hold_panel
+    panel_users: int = 0
+
+    @property
+    def busy(self) -> bool:
+        """Запись нельзя вытеснять: lock захвачен или его ждут, либо ждёт restore после flash."""
+        return self.panel_users > 0 or self.panel_lock.locked() or self.flash_handle is not None
+
+    @asynccontextmanager
+    async def hold_panel(self) -> AsyncIterator[None]:
+        """async with panel_lock, но запись занята уже с постановки в очередь.
+
+        Сразу после release() lock не захвачен, пока разбуженный ожидающий не возьмёт
+        его; счётчик закрывает это окно, иначе запись вытеснили бы и следующий
+        get создал бы для чата второй lock.
+        """
+        self.panel_users += 1
+        try:
+            async with self.panel_lock:
+                yield
+        finally:
+            self.panel_users -= 1
+
+    def schedule_flash(self, delay: float, callback: Callable[[], None]) -> None:
+        """Ставит restore панели через delay секунд, отменяя предыдущий (O(1))."""
+        self.cancel_flash()
+
+        def fire():
+            self.flash_handle = None
+            try:
+                callback()
+            except Exception:
+                logger.warning("flash restore failed chat_id=%s", self.chat_id, exc_info=True)
+
+        self.flash_handle = asyncio.get_running_loop().call_later(delay, fire)
+
+    def cancel_flash(self) -> bool:
+        handle, self.flash_handle = self.flash_handle, None
+        if handle is None:
+            return False
+        handle.cancel()
+        return True
+
+
+class ChatRuntimeRegistry:
+    """Ограниченный LRU-реестр ChatRuntime по chat_id.
+
+    При каждом обращении с головы LRU снимаются записи, простаивающие дольше
+    idle_seconds, и лишние сверх max_chats. Занятые записи (busy) не удаляются —
+    они переезжают в хвост, чтобы не потерять захваченный lock или таймер.
+    """
+
+    def __init__(self, max_chats: int = CHAT_RUNTIME_MAX, idle_seconds: float = CHAT_RUNTIME_IDLE_SECONDS):
+        self._chats: OrderedDict[int, ChatRuntime] = OrderedDict()
+        self._max_chats = max_chats
+        self._idle_seconds = idle_seconds
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._chats
+
+    def get(self, chat_id: int) -> ChatRuntime:
+        now = time.monotonic()
+        rt = self._chats.get(chat_id)
+        if rt is None:
+            rt = ChatRuntime(chat_id=chat_id)
+            self._chats[chat_id] = rt
+        else:
+            self._chats.move_to_end(chat_id)
+        rt.last_used = now
+        self._evict(now, keep=chat_id)
+        return rt
+
+    def peek(self, chat_id: int) -> Optional[ChatRuntime]:
+        return self._chats.get(chat_id)
+
+    def discard(self, chat_id: int) -> bool:
+        rt = self._chats.get(chat_id)
+        if rt is None or rt.busy:
+            return False
+        del self._chats[chat_id]
+        return True
+
+    def evict_idle(self) -> int:
+        return self._evict(time.monotonic())
+
+    def _evict(self, now: float, keep: Optional[int] = None) -> int:
+        evicted = 0
+        # не больше одного прохода по реестру, даже если все записи заняты
+        for _ in range(len(self._chats)):
+            chat_id, rt = next(iter(self._chats.items()))
+            over_limit = len(self._chats) > self._max_chats
+            idle = now - rt.last_used > self._idle_seconds
+            if not over_limit and not idle:
+                break
+            if rt.busy or chat_id == keep:
+                self._chats.move_to_end(chat_id)
+                continue
+            del self._chats[chat_id]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "chats": len(self._chats),
+            "locked": sum(1 for rt in self._chats.values() if rt.panel_lock.locked()),
+            "flash_pending": sum(1 for rt in self._chats.values() if rt.flash_handle is not None),
+            "evicted": self.evicted,
+        }
+
+    def close(self) -> None:
+        for rt in self._chats.values():
+            rt.cancel_flash()
+        self._chats.clear()
+
+
+def get_chat_runtime_registry(app: Application) -> ChatRuntimeRegistry:
+    registry = app.bot_data.get("chat_runtime")
+    if registry is None:
+        registry = ChatRuntimeRegistry()
+        app.bot_data["chat_runtime"] = registry
+    return registry
+
+
+def get_chat_runtime(app: Application, chat_id: int) -> ChatRuntime:
+    return get_chat_runtime_registry(app).get(chat_id)
@@ -31,6 +31,14 @@ REMINDER_REPEAT_SECONDS = REPEAT_INTERVAL_SEC
 # Флеш-строка (короткое подтверждение в панели)
 FLASH_SECONDS_DEFAULT = 2.0
 
+# Сколько последних отрендеренных списков задач держать в памяти
+RENDER_CACHE_MAX = 1024
+
+# Runtime-состояние чатов (lock панели, таймер flash): максимум чатов в памяти
+# и через сколько секунд простоя состояние чата можно выкинуть
+CHAT_RUNTIME_MAX = 2048
+CHAT_RUNTIME_IDLE_SECONDS = 3600
+
 # Лимиты выборок задач для picker-экранов
 PICK_DONE_LIMIT = 40
 PICK_DEL_LIMIT = 40
@@ -38,13 +46,92 @@ PICK_REM_LIMIT = 20
 
 # Максимальная длина текста задачи
 TASK_TEXT_MAX_LEN = 500
+# Сколько символов текста задачи показывать в строке списка (панель должна влезать в 4096)
+TASK_LINE_MAX_LEN = 300
+
+# Сколько задач можно добавить одним сообщением-списком
+BULK_ADD_MAX = 50
 
 # Максимальное количество открытых задач на чат (0 = без ограничения)
 MAX_TASKS_PER_CHAT = int(os.getenv("MAX_TASKS_PER_CHAT", "100"))
 
+# Состояние диалога (ожидание ввода): через сколько секунд без ответа оно истекает
+# и как часто изменения сбрасываются из памяти в БД
+PENDING_TTL_SECONDS = 1800
+PENDING_FLUSH_SECONDS = 5
+
+# Кэш списков администраторов групп: сколько секунд доверять списку без перезапроса
+ADMIN_CACHE_TTL_SECONDS = 600
+ADMIN_CACHE_MAX_CHATS = 2048
+
 # Значения по умолчанию для повторяющихся напоминаний
 RECURRING_DEFAULT_HOUR = 10
 RECURRING_DEFAULT_MINUTE = 0
 
 # Через сколько секунд автоматически удалять вспомогательные сообщения
 SCHEDULE_DELETE_SECONDS = 10
+
+# Параллельная обработка апдейтов: сколько хэндлеров выполняется одновременно
+# (апдейты одного чата всё равно идут строго по очереди) и сколько апдейтов
+# может ждать обработки
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_MAX_PENDING = int(os.getenv("UPDATE_MAX_PENDING", "256"))
+
+# Webhook вместо long polling: включается, если задан WEBHOOK_URL (публичный https-адрес,
+# который регистрируется в Telegram). Сервер слушает WEBHOOK_LISTEN:WEBHOOK_PORT/WEBHOOK_PATH,
+# Telegram присылает WEBHOOK_SECRET в заголовке X-Telegram-Bot-Api-Secret-Token.
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Метрики в формате Prometheus: если задан METRICS_PORT, на METRICS_HOST:METRICS_PORT
+# отдаётся /metrics (по умолчанию выключено и слушает только localhost)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Вызовы db.py дольше стольких миллисекунд пишутся в лог вместе с EXPLAIN QUERY PLAN.
+# По умолчанию выключено (0): для лога каждое соединение трассирует свои SQL, а это
+# лишняя работа на каждом вызове db.py — включать на время разбора медленных запросов
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "0"))
+
+# Telegram user_id владельцев бота через запятую: им доступны служебные команды (/dbtop и т.п.)
+OWNER_IDS = frozenset(int(x) for x in os.getenv("BOT_OWNER_IDS", "").replace(" ", "").split(",") if x)
+
+# Профилирование по требованию (/profile у владельца или SIGUSR1, если PROFILE_ON_SIGNAL=1):
+# куда писать .pstats/.folded, длительность записи по умолчанию и её верхний предел,
+# шаг сэмплирования стека в режиме sample
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(BASE_DIR / "profiles")))
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_MAX_SECONDS = 600
+PROFILE_ON_SIGNAL = os.getenv("PROFILE_ON_SIGNAL", "0") == "1"
+PROFILE_SAMPLE_INTERVAL = 0.005
+
+# Монитор задержки event loop: heartbeat раз в LOOP_LAG_INTERVAL секунд; если цикл занят
+# дольше LOOP_LAG_THRESHOLD_MS, в лог пишется хэндлер и стек, который его держит (0 — выключено)
+LOOP_LAG_INTERVAL = 0.1
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+
+# Кэш курсов: сколько секунд курс считается свежим; сколько ждать обновления протухшего
+# значения, прежде чем показать старое (с его возрастом), если биржа медленная или лежит
+RATES_CACHE_TTL_SECONDS = float(os.getenv("RATES_CACHE_TTL_SECONDS", "30"))
+RATES_STALE_WAIT_SECONDS = 1.5
+
+# Фоновое обновление тикера: раз в RATES_REFRESH_SECONDS (0 — выключено), пока курсы
+# спрашивали не позже RATES_REFRESH_IDLE_SECONDS назад; дополнительные пары на экране RATES
+RATES_REFRESH_SECONDS = float(os.getenv("RATES_REFRESH_SECONDS", "20"))
+RATES_REFRESH_IDLE_SECONDS = 600
+RATES_EXTRA_SYMBOLS = tuple(
+    s for s in os.getenv("RATES_EXTRA_SYMBOLS", "BTC_THB,ETH_THB").replace(" ", "").upper().split(",") if s
+)
+
+# Ценовые алерты: как часто проверять тикер, если есть активные алерты; лимит алертов на чат
+ALERTS_CHECK_SECONDS = 20
+ALERTS_MAX_PER_CHAT = 20
+
+# История курсов: тики храним сутки, 5-минутные бакеты — неделю, часовые — RATES_HISTORY_DAYS;
+# раз в RATES_HISTORY_SAMPLE_SECONDS тикер снимается, даже если курс никто не смотрит (0 — не снимать)
+RATES_HISTORY_DAYS = int(os.getenv("RATES_HISTORY_DAYS", "90"))
+RATES_HISTORY_SAMPLE_SECONDS = float(os.getenv("RATES_HISTORY_SAMPLE_SECONDS", "300"))
@@ -1,13 +1,21 @@
 from __future__ import annotations
 
+import contextvars
+import functools
+import logging
 import sqlite3
+import time
 from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterator, Optional
+from typing import Callable, Iterator, Optional, TypeVar
 
-from .config import DB_PATH, TZ, resolve_tz
+from .config import DB_PATH, TZ, resolve_tz, DB_SLOW_QUERY_MS
+from .metrics import DB_SECONDS
 from zoneinfo import ZoneInfo
 
+logger = logging.getLogger(__name__)
+
 
 # ---------- connection + session ----------
 def db_connect() -> sqlite3.Connection:
@@ -18,6 +26,8 @@ def db_connect() -> sqlite3.Connection:
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute("PRAGMA busy_timeout=5000;")
+    if DB_SLOW_QUERY_MS > 0:
+        conn.set_trace_callback(_trace_statement)
     return conn
 
 
@@ -30,6 +40,7 @@ def db_session() -> Iterator[sqlite3.Connection]:
     - always closes
     """
     conn = db_connect()
+    started = time.perf_counter()
     try:
         yield conn
         conn.commit()
@@ -38,6 +49,131 @@ def db_session() -> Iterator[sqlite3.Connection]:
         raise
     finally:
         conn.close()
+        session_stats.record(time.perf_counter() - started, None)
+
+
+# ---------- instrumentation ----------
+F = TypeVar("F", bound=Callable)
+
+# сколько разных SQL-выражений одного вызова показывать в slow-query log
+_SLOW_LOG_MAX_STATEMENTS = 3
+_NOT_EXPLAINABLE = ("BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "ANALYZE", "EXPLAIN")
+
+
+@dataclass
+class QueryStats:
+    """Накопленная статистика одной функции db.py."""
+
+    name: str
+    calls: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    rows: int = 0
+
+    def record(self, seconds: float, rows: Optional[int]) -> None:
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if rows:
+            self.rows += rows
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.total = self.max = 0.0
+        self.rows = 0
+
+
+query_stats: dict[str, QueryStats] = {}
+session_stats = QueryStats("db_session")
+
+# SQL, выполненные внутри текущего вызова timed-функции (только при включённом slow-query log)
+_statements: contextvars.ContextVar[Optional[list[str]]] = contextvars.ContextVar("db_statements", default=None)
+
+
+def _trace_statement(sql: str) -> None:
+    statements = _statements.get()
+    if statements is not None and len(statements) < 50:
+        statements.append(sql)
+
+
+def _rows_returned(result) -> Optional[int]:
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, sqlite3.Row):
+        return 1
+    return None
+
+
+def explain_query_plan(sql: str) -> list[str]:
+    """EXPLAIN QUERY PLAN для уже подставленного SQL (отдельное соединение без трассировки)."""
+    conn = sqlite3.connect(DB_PATH, timeout=5)
+    try:
+        return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()]
+    finally:
+        conn.close()
+
+
+def _log_slow_query(name: str, seconds: float, statements: list[str]) -> None:
+    lines = [f"slow db call {name}: {seconds * 1000:.1f} ms"]
+    seen: list[str] = []
+    for sql in statements:
+        if sql.lstrip().upper().startswith(_NOT_EXPLAINABLE) or sql in seen:
+            continue
+        seen.append(sql)
+        if len(seen) > _SLOW_LOG_MAX_STATEMENTS:
+            break
+        lines.append(f"  SQL: {' '.join(sql.split())[:500]}")
+        try:
+            lines.extend(f"    PLAN: {detail}" for detail in explain_query_plan(sql))
+        except sqlite3.Error as exc:
+            lines.append(f"    PLAN: unavailable ({exc})")
+    logger.warning("\n".join(lines))
+
+
+def timed(fn: F) -> F:
+    """Учитывает вызов функции: метрика DB_SECONDS, query_stats и slow-query log.
+
+    Вызовы дольше DB_SLOW_QUERY_MS пишутся в лог вместе с их SQL и EXPLAIN QUERY PLAN.
+    """
+    name = fn.__name__
+    stats = query_stats.setdefault(name, QueryStats(name))
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _statements.set([]) if DB_SLOW_QUERY_MS > 0 else None
+        started = time.perf_counter()
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_SECONDS.observe(elapsed, name)
+            stats.record(elapsed, _rows_returned(result))
+            if token is not None:
+                statements = _statements.get() or []
+                _statements.reset(token)
+                if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+                    _log_slow_query(name, elapsed, statements)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def top_queries(n: int = 10, key: str = "total") -> list[QueryStats]:
+    """Самые «горячие» функции db.py: по суммарному времени (total), max, calls или avg."""
+    used = [s for s in query_stats.values() if s.calls]
+    return sorted(used, key=lambda s: getattr(s, key), reverse=True)[:n]
+
+
+def reset_query_stats() -> None:
+    for stats in query_stats.values():
+        stats.reset()
+    session_stats.reset()
 
 
 # ---------- migrations helpers ----------
@@ -68,6 +204,7 @@ def _add_column_if_missing(conn: sqlite3.Connection, table: str, col: str, col_d
         conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_def}")  # noqa: S608
 
 
+@timed
 def db_init():
     with db_session() as conn:
         cur = conn.cursor()
@@ -162,11 +299,46 @@ def db_init():
         cur.execute("CREATE INDEX IF NOT EXISTS idx_recurring_next ON recurring_reminders(next_run_at)")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_recurring_chat ON recurring_reminders(chat_id)")
 
+        # price alerts
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS price_alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                created_at TEXT NOT NULL,
+                owner_id INTEGER,
+                owner_name TEXT
+            )
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_price_alerts_chat ON price_alerts(chat_id)")
+
+        # rate history: бакеты курса по разрешению (секунды), агрегаты считаются при записи
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_history (
+                resolution INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                min REAL NOT NULL,
+                max REAL NOT NULL,
+                sum REAL NOT NULL,
+                count INTEGER NOT NULL,
+                last REAL NOT NULL,
+                PRIMARY KEY (resolution, symbol, bucket)
+            ) WITHOUT ROWID
+            """
+        )
+
         _add_column_if_missing(conn, "pending", "meta", "TEXT")
         _add_column_if_missing(conn, "chat_state", "timezone", "TEXT")
 
 
 # ---------- chat_state ----------
+@timed
 def set_panel_message_id(chat_id: int, message_id: Optional[int]):
     with db_session() as conn:
         conn.execute(
@@ -176,6 +348,7 @@ def set_panel_message_id(chat_id: int, message_id: Optional[int]):
         )
 
 
+@timed
 def get_panel_message_id(chat_id: int) -> Optional[int]:
     with db_session() as conn:
         cur = conn.cursor()
@@ -184,6 +357,7 @@ def get_panel_message_id(chat_id: int) -> Optional[int]:
         return row["panel_message_id"] if row else None
 
 
+@timed
 def set_chat_tz(chat_id: int, tz_name: str) -> None:
     with db_session() as conn:
         conn.execute(
@@ -193,6 +367,7 @@ def set_chat_tz(chat_id: int, tz_name: str) -> None:
         )
 
 
+@timed
 def get_chat_tz(chat_id: int) -> ZoneInfo:
     with db_session() as conn:
         cur = conn.cursor()
@@ -203,6 +378,7 @@ def get_chat_tz(chat_id: int) -> ZoneInfo:
 
 
 # ---------- pending ----------
+@timed
 def pending_set(chat_id: int, user_id: int, action: str, task_id: Optional[int] = None, meta: Optional[str] = None):
     with db_session() as conn:
         conn.execute(
@@ -219,6 +395,7 @@ def pending_set(chat_id: int, user_id: int, action: str, task_id: Optional[int]
         )
 
 
+@timed
 def pending_get(chat_id: int, user_id: int):
     with db_session() as conn:
         cur = conn.cursor()
@@ -229,12 +406,47 @@ def pending_get(chat_id: int, user_id: int):
         return cur.fetchone()
 
 
+@timed
 def pending_clear(chat_id: int, user_id: int):
     with db_session() as conn:
         conn.execute("DELETE FROM pending WHERE chat_id=? AND user_id=?", (chat_id, user_id))
 
 
+@timed
+def pending_fetch_all():
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT chat_id, user_id, action, task_id, meta, created_at FROM pending")
+        return cur.fetchall()
+
+
+@timed
+def pending_apply(upserts: list[tuple], deletes: list[tuple[int, int]]):
+    """Пачка изменений pending одной транзакцией.
+
+    upserts: (chat_id, user_id, action, task_id, meta, created_at_iso)
+    deletes: (chat_id, user_id)
+    """
+    with db_session() as conn:
+        if upserts:
+            conn.executemany(
+                """
+                INSERT INTO pending(chat_id, user_id, action, task_id, meta, created_at)
+                VALUES(?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chat_id, user_id) DO UPDATE SET
+                    action=excluded.action,
+                    task_id=excluded.task_id,
+                    meta=excluded.meta,
+                    created_at=excluded.created_at
+                """,
+                upserts,
+            )
+        if deletes:
+            conn.executemany("DELETE FROM pending WHERE chat_id=? AND user_id=?", deletes)
+
+
 # ---------- tasks ----------
+@timed
 def insert_task(chat_id: int, owner_id: int, owner_name: str, text: str) -> int:
     with db_session() as conn:
         cur = conn.cursor()
@@ -248,6 +460,43 @@ def insert_task(chat_id: int, owner_id: int, owner_name: str, text: str) -> int:
         return int(cur.lastrowid)
 
 
+@timed
+def insert_tasks(
+    chat_id: int,
+    owner_id: int,
+    owner_name: str,
+    texts: list[str],
+    max_open: int = 0,
+) -> Optional[list[int]]:
+    """Добавляет пачку задач одной транзакцией.
+
+    Лимит открытых задач (max_open > 0) проверяется под той же блокировкой записи,
+    что и вставка: либо добавляются все задачи, либо ни одной (тогда None).
+    Возвращает id новых задач в порядке texts.
+    """
+    if not texts:
+        return []
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        if max_open > 0:
+            cur.execute("SELECT COUNT(*) FROM tasks WHERE chat_id=? AND deleted=0 AND done=0", (chat_id,))
+            if cur.fetchone()[0] + len(texts) > max_open:
+                return None
+        now_iso = datetime.now(TZ).isoformat()
+        cur.executemany(
+            """
+            INSERT INTO tasks(chat_id, text, done, created_at, reminded, deleted, owner_id, owner_name)
+            VALUES(?, ?, 0, ?, 0, 0, ?, ?)
+            """,
+            [(chat_id, text, now_iso, owner_id, owner_name) for text in texts],
+        )
+        # пока держим блокировку записи, последние id чата — ровно наши строки
+        cur.execute("SELECT id FROM tasks WHERE chat_id=? ORDER BY id DESC LIMIT ?", (chat_id, len(texts)))
+        return [int(r["id"]) for r in reversed(cur.fetchall())]
+
+
+@timed
 def fetch_tasks(chat_id: int, limit: int = 20):
     with db_session() as conn:
         cur = conn.cursor()
@@ -264,6 +513,7 @@ def fetch_tasks(chat_id: int, limit: int = 20):
         return cur.fetchall()
 
 
+@timed
 def fetch_open_tasks(chat_id: int, limit: int = 10):
     with db_session() as conn:
         cur = conn.cursor()
@@ -280,6 +530,7 @@ def fetch_open_tasks(chat_id: int, limit: int = 10):
         return cur.fetchall()
 
 
+@timed
 def count_open_tasks(chat_id: int) -> int:
     with db_session() as conn:
         cur = conn.cursor()
@@ -290,6 +541,7 @@ def count_open_tasks(chat_id: int) -> int:
         return cur.fetchone()[0]
 
 
+@timed
 def fetch_task(chat_id: int, task_id: int):
     with db_session() as conn:
         cur = conn.cursor()
@@ -304,6 +556,7 @@ def fetch_task(chat_id: int, task_id: int):
         return cur.fetchone()
 
 
+@timed
 def set_task_remind(chat_id: int, task_id: int, remind_at_iso: Optional[str]):
     with db_session() as conn:
         conn.execute(
@@ -312,6 +565,7 @@ def set_task_remind(chat_id: int, task_id: int, remind_at_iso: Optional[str]):
         )
 
 
+@timed
 def set_task_reminder_message_id(chat_id: int, task_id: int, message_id: Optional[int]):
     with db_session() as conn:
         conn.execute(
@@ -320,7 +574,9 @@ def set_task_reminder_message_id(chat_id: int, task_id: int, message_id: Optiona
         )
 
 
+@timed
 def mark_done(chat_id: int, task_id: int, done_by_id: int, done_by_name: str) -> bool:
+    """Отмечает задачу выполненной и снимает с неё напоминание — как mark_done_many."""
     with db_session() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -329,7 +585,10 @@ def mark_done(chat_id: int, task_id: int, done_by_id: int, done_by_name: str) ->
             SET done=1,
                 done_by_id=?,
                 done_by_name=?,
-                done_at=?
+                done_at=?,
+                remind_at=NULL,
+                reminded=1,
+                reminder_message_id=NULL
             WHERE chat_id=? AND id=? AND deleted=0 AND done=0
             """,
             (done_by_id, done_by_name, datetime.now(TZ).isoformat(), chat_id, task_id),
@@ -337,21 +596,85 @@ def mark_done(chat_id: int, task_id: int, done_by_id: int, done_by_name: str) ->
         return cur.rowcount > 0
 
 
+@timed
 def soft_delete(chat_id: int, task_id: int) -> bool:
+    """Скрывает задачу — как soft_delete_many."""
     with db_session() as conn:
         cur = conn.cursor()
         cur.execute(
-            "UPDATE tasks SET deleted=1 WHERE chat_id=? AND id=? AND deleted=0",
+            "UPDATE tasks SET deleted=1, reminder_message_id=NULL WHERE chat_id=? AND id=? AND deleted=0",
             (chat_id, task_id),
         )
         return cur.rowcount > 0
 
 
+def _placeholders(n: int) -> str:
+    return ",".join("?" * n)
+
+
+def _lock_open_ids(cur: sqlite3.Cursor, chat_id: int, task_ids: list[int], where: str) -> list[int]:
+    """Берёт блокировку записи и возвращает те из task_ids, что подходят под where."""
+    cur.execute("BEGIN IMMEDIATE")
+    cur.execute(
+        f"SELECT id FROM tasks WHERE chat_id=? AND id IN ({_placeholders(len(task_ids))}) AND {where} ORDER BY id",
+        (chat_id, *task_ids),
+    )
+    return [int(r["id"]) for r in cur.fetchall()]
+
+
+@timed
+def mark_done_many(chat_id: int, task_ids: list[int], done_by_id: int, done_by_name: str) -> list[int]:
+    """Отмечает задачи выполненными одним UPDATE и снимает с них напоминания.
+
+    Возвращает id задач, которые действительно были открыты (уже выполненные и
+    удалённые пропускаются).
+    """
+    if not task_ids:
+        return []
+    with db_session() as conn:
+        cur = conn.cursor()
+        ids = _lock_open_ids(cur, chat_id, task_ids, "deleted=0 AND done=0")
+        if ids:
+            cur.execute(
+                f"""
+                UPDATE tasks
+                SET done=1,
+                    done_by_id=?,
+                    done_by_name=?,
+                    done_at=?,
+                    remind_at=NULL,
+                    reminded=1,
+                    reminder_message_id=NULL
+                WHERE chat_id=? AND id IN ({_placeholders(len(ids))})
+                """,
+                (done_by_id, done_by_name, datetime.now(TZ).isoformat(), chat_id, *ids),
+            )
+        return ids
+
+
+@timed
+def soft_delete_many(chat_id: int, task_ids: list[int]) -> list[int]:
+    """Скрывает задачи одним UPDATE; возвращает id тех, что ещё не были удалены."""
+    if not task_ids:
+        return []
+    with db_session() as conn:
+        cur = conn.cursor()
+        ids = _lock_open_ids(cur, chat_id, task_ids, "deleted=0")
+        if ids:
+            cur.execute(
+                f"UPDATE tasks SET deleted=1, reminder_message_id=NULL WHERE chat_id=? AND id IN ({_placeholders(len(ids))})",
+                (chat_id, *ids),
+            )
+        return ids
+
+
+@timed
 def mark_reminded(chat_id: int, task_id: int):
     with db_session() as conn:
         conn.execute("UPDATE tasks SET reminded=1 WHERE chat_id=? AND id=?", (chat_id, task_id))
 
 
+@timed
 def fetch_pending_reminders():
     with db_session() as conn:
         cur = conn.cursor()
@@ -366,6 +689,7 @@ def fetch_pending_reminders():
 
 
 # ---------- audit log ----------
+@timed
 def audit_insert(chat_id: int, actor_id: int, actor_name: str, action: str, task_id: Optional[int], meta: Optional[str]):
     with db_session() as conn:
         conn.execute(
@@ -377,6 +701,23 @@ def audit_insert(chat_id: int, actor_id: int, actor_name: str, action: str, task
         )
 
 
+@timed
+def audit_insert_many(rows: list[tuple]):
+    """rows: (chat_id, actor_id, actor_name, action, task_id, meta) — одной транзакцией."""
+    if not rows:
+        return
+    now_iso = datetime.now(TZ).isoformat()
+    with db_session() as conn:
+        conn.executemany(
+            """
+            INSERT INTO audit_log(chat_id, actor_id, actor_name, action, task_id, meta, created_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(*row, now_iso) for row in rows],
+        )
+
+
+@timed
 def audit_fetch(chat_id: int, limit: int = 50):
     with db_session() as conn:
         cur = conn.cursor()
@@ -393,6 +734,7 @@ def audit_fetch(chat_id: int, limit: int = 50):
         return cur.fetchall()
 
 
+@timed
 def fetch_task_text(chat_id: int, task_id: int) -> Optional[str]:
     with db_session() as conn:
         cur = conn.cursor()
@@ -405,6 +747,7 @@ def fetch_task_text(chat_id: int, task_id: int) -> Optional[str]:
 
 
 # ---------- recurring_reminders ----------
+@timed
 def recurring_insert(
     chat_id: int,
     owner_id: int,
@@ -443,6 +786,7 @@ def recurring_insert(
         return int(cur.lastrowid)
 
 
+@timed
 def recurring_fetch_by_chat(chat_id: int):
     with db_session() as conn:
         cur = conn.cursor()
@@ -458,6 +802,7 @@ def recurring_fetch_by_chat(chat_id: int):
         return cur.fetchall()
 
 
+@timed
 def recurring_fetch_one(chat_id: int, rec_id: int):
     with db_session() as conn:
         cur = conn.cursor()
@@ -468,6 +813,7 @@ def recurring_fetch_one(chat_id: int, rec_id: int):
         return cur.fetchone()
 
 
+@timed
 def recurring_update_next_run(rec_id: int, next_run_at_iso: str) -> bool:
     with db_session() as conn:
         cur = conn.cursor()
@@ -478,6 +824,7 @@ def recurring_update_next_run(rec_id: int, next_run_at_iso: str) -> bool:
         return cur.rowcount > 0
 
 
+@timed
 def recurring_delete(chat_id: int, rec_id: int) -> bool:
     with db_session() as conn:
         cur = conn.cursor()
@@ -485,6 +832,7 @@ def recurring_delete(chat_id: int, rec_id: int) -> bool:
         return cur.rowcount > 0
 
 
+@timed
 def recurring_fetch_due(now_iso: str):
     with db_session() as conn:
         cur = conn.cursor()
@@ -493,3 +841,171 @@ def recurring_fetch_due(now_iso: str):
             (now_iso,),
         )
         return cur.fetchall()
+
+
+# ---------- price_alerts ----------
+_ID_BATCH = 500
+
+
+@timed
+def alert_insert(
+    chat_id: int,
+    owner_id: int,
+    owner_name: str,
+    symbol: str,
+    direction: str,
+    threshold: float,
+) -> int:
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO price_alerts (chat_id, symbol, direction, threshold, created_at, owner_id, owner_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (chat_id, symbol, direction, threshold, datetime.now(TZ).isoformat(), owner_id, owner_name),
+        )
+        return int(cur.lastrowid)
+
+
+@timed
+def alert_fetch_by_chat(chat_id: int):
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT * FROM price_alerts WHERE chat_id=? ORDER BY symbol, threshold",
+            (chat_id,),
+        )
+        return cur.fetchall()
+
+
+@timed
+def alert_fetch_all():
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM price_alerts")
+        return cur.fetchall()
+
+
+@timed
+def alert_count_by_chat(chat_id: int) -> int:
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) AS c FROM price_alerts WHERE chat_id=?", (chat_id,))
+        return int(cur.fetchone()["c"])
+
+
+@timed
+def alert_delete(chat_id: int, alert_id: int) -> bool:
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM price_alerts WHERE chat_id=? AND id=?", (chat_id, alert_id))
+        return cur.rowcount > 0
+
+
+def _alive_alert_ids(cur: sqlite3.Cursor, alert_ids: list[int]) -> set[int]:
+    alive: set[int] = set()
+    # пачками: старые сборки SQLite ограничивают число параметров 999
+    for i in range(0, len(alert_ids), _ID_BATCH):
+        batch = alert_ids[i:i + _ID_BATCH]
+        cur.execute(f"SELECT id FROM price_alerts WHERE id IN ({_placeholders(len(batch))})", batch)
+        alive.update(int(r["id"]) for r in cur.fetchall())
+    return alive
+
+
+@timed
+def alert_alive_ids(alert_ids: list[int]) -> set[int]:
+    """Те из alert_ids, что ещё есть в БД."""
+    if not alert_ids:
+        return set()
+    with db_session() as conn:
+        return _alive_alert_ids(conn.cursor(), alert_ids)
+
+
+@timed
+def alert_fire_many(rows: list[tuple[int, int, int, str, str, str]]) -> dict[int, int]:
+    """Сработавшие алерты → задачи с напоминанием, одной транзакцией.
+
+    rows: (alert_id, chat_id, owner_id, owner_name, text, remind_at_iso). Алерты, которых
+    в БД уже нет (удалены, пока ждали доставки), пропускаются. Остальные удаляются в
+    той же транзакции, что создаёт их задачи, так что второй задачи алерт не создаст.
+    Возвращает {alert_id: task_id}.
+    """
+    if not rows:
+        return {}
+    now_iso = datetime.now(TZ).isoformat()
+    task_ids: dict[int, int] = {}
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        alive = _alive_alert_ids(cur, [row[0] for row in rows])
+        for alert_id, chat_id, owner_id, owner_name, text, remind_at_iso in rows:
+            if alert_id not in alive:
+                continue
+            cur.execute(
+                """
+                INSERT INTO tasks(chat_id, text, done, created_at, reminded, deleted, owner_id, owner_name, remind_at)
+                VALUES(?, ?, 0, ?, 0, 0, ?, ?, ?)
+                """,
+                (chat_id, text, now_iso, owner_id, owner_name, remind_at_iso),
+            )
+            task_ids[alert_id] = int(cur.lastrowid)
+        fired = list(task_ids)
+        for i in range(0, len(fired), _ID_BATCH):
+            batch = fired[i:i + _ID_BATCH]
+            cur.execute(f"DELETE FROM price_alerts WHERE id IN ({_placeholders(len(batch))})", batch)
+    return task_ids
+
+
+# ---------- rate_history ----------
+@timed
+def history_record(ticks: list[tuple[str, float, float]], resolutions: tuple[int, ...]) -> None:
+    """Добавляет тики (symbol, unix-время, цена) во все разрешения одной транзакцией."""
+    rows = [
+        (res, symbol, int(ts) // res * res, price, price, price, price)
+        for symbol, ts, price in ticks
+        for res in resolutions
+    ]
+    if not rows:
+        return
+    with db_session() as conn:
+        conn.executemany(
+            """
+            INSERT INTO rate_history (resolution, symbol, bucket, min, max, sum, count, last)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?)
+            ON CONFLICT (resolution, symbol, bucket) DO UPDATE SET
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max),
+                sum = sum + excluded.sum,
+                count = count + 1,
+                last = excluded.last
+            """,
+            rows,
+        )
+
+
+@timed
+def history_fetch(symbol: str, resolution: int, since: int):
+    with db_session() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT bucket, min, max, sum, count, last FROM rate_history
+            WHERE resolution=? AND symbol=? AND bucket>=?
+            ORDER BY bucket
+            """,
+            (resolution, symbol, since),
+        )
+        return cur.fetchall()
+
+
+@timed
+def history_prune(cutoffs: dict[int, int]) -> int:
+    """Удаляет бакеты старше cutoffs[resolution] (unix-время); возвращает число удалённых."""
+    deleted = 0
+    with db_session() as conn:
+        cur = conn.cursor()
+        for resolution, before in cutoffs.items():
+            cur.execute("DELETE FROM rate_history WHERE resolution=? AND bucket<?", (resolution, before))
+            deleted += cur.rowcount
+    return deleted
@@ -1,34 +1,42 @@
 import asyncio
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 
-from telegram import Update, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardMarkup, CallbackQuery, Chat
 from telegram.ext import ContextTypes, Application
 from telegram.error import BadRequest
 
 from .config import (
     TZ, FLASH_SECONDS_DEFAULT,
     PICK_DONE_LIMIT, PICK_DEL_LIMIT, PICK_REM_LIMIT,
-    TASK_TEXT_MAX_LEN, MAX_TASKS_PER_CHAT,
+    TASK_TEXT_MAX_LEN, MAX_TASKS_PER_CHAT, BULK_ADD_MAX,
     RECURRING_DEFAULT_HOUR, RECURRING_DEFAULT_MINUTE,
-    SCHEDULE_DELETE_SECONDS,
+    SCHEDULE_DELETE_SECONDS, ALERTS_MAX_PER_CHAT, RATES_STALE_WAIT_SECONDS,
 )
 from . import db, services
-from .callbacks import CB, parse_callback
+from .callbacks import CB
+from .router import CallbackRouter
 from .ui import (
-    panel_keyboard,
-    format_tasks_text,
+    tasks_panel,
+    invalidate_tasks_text,
     render_panel,
     remind_quick_keyboard,
     Screen,
 )
 from .timeparse import parse_remind_time
-from .permissions import can_action
+from .permissions import can_action, admin_cache
 from .reminders import cancel_reminder, cancel_reminder_repeat
 from .models import Task
 from .recurring_logic import compute_next_run
 from .recurring_parse import parse_recurring_schedule, MONTHS_SHORT
-from .rates import format_usdt_thb
+from .tasks_parse import split_task_lines
+from .chat_runtime import PickSelection, get_chat_runtime
+from .pending import pending_store
+from .rates import format_usdt_thb, last_price, rate_cache
+from .history import format_history
+from .alerts import Alert, alert_engine, format_price, parse_alert
+from .profiling import profiled
 
 logger = logging.getLogger(__name__)
 
@@ -131,33 +139,23 @@ async def _handle_reminder_message_action(
         return
 
 
-# ---------- panel lock ----------
-def _get_panel_lock(app: Application, chat_id: int) -> asyncio.Lock:
-    locks = app.bot_data.setdefault("panel_locks", {})
-    lock = locks.get(chat_id)
-    if lock is None:
-        lock = asyncio.Lock()
-        locks[chat_id] = lock
-    return lock
-
-
 async def ensure_panel(app: Application, chat_id: int):
     mid = db.get_panel_message_id(chat_id)
     if mid is not None:
         return
 
+    text, markup = tasks_panel(chat_id)
     msg = await app.bot.send_message(
         chat_id=chat_id,
-        text=format_tasks_text(chat_id),
-        reply_markup=panel_keyboard(),
+        text=text,
+        reply_markup=markup,
         disable_web_page_preview=True,
     )
     db.set_panel_message_id(chat_id, msg.message_id)
 
 
 async def edit_panel(app: Application, chat_id: int, text: str, markup: InlineKeyboardMarkup):
-    lock = _get_panel_lock(app, chat_id)
-    async with lock:
+    async with get_chat_runtime(app, chat_id).hold_panel():
         await ensure_panel(app, chat_id)
         mid = db.get_panel_message_id(chat_id)
         if mid is None:
@@ -207,29 +205,16 @@ async def flash_panel(
     flash_line: str,
     seconds: float = FLASH_SECONDS_DEFAULT,
 ):
-    # Flash uses router (Screen.FLASH)
+    # Flash uses router (Screen.FLASH); it also fills the render cache for restore
     await show_screen(context, chat_id, Screen.FLASH, {"line": flash_line})
 
     app = context.application
-    name = f"flash:{chat_id}"
 
     async def restore():
-        await show_screen(context, chat_id, Screen.LIST)
-
-    if app.job_queue is not None:
-        for j in app.job_queue.get_jobs_by_name(name):
-            j.schedule_removal()
-
-        async def job_restore(job_context: ContextTypes.DEFAULT_TYPE):
-            await restore()
-
-        app.job_queue.run_once(job_restore, when=seconds, name=name, data={})
-    else:
-        async def sleeper():
-            await asyncio.sleep(seconds)
-            await restore()
+        text, markup = tasks_panel(chat_id, cached=True)
+        await edit_panel(app, chat_id, text, markup)
 
-        asyncio.create_task(sleeper())
+    get_chat_runtime(app, chat_id).schedule_flash(seconds, lambda: app.create_task(restore()))
 
 
 # ---------- message deletion helpers ----------
@@ -263,6 +248,7 @@ _HELP_TEXT = (
     "<b>Команды:</b>\n"
     "/start — открыть панель управления\n"
     "/timezone — посмотреть или изменить часовой пояс\n"
+    "/alert — ценовые алерты: <code>/alert USDT ниже 33.5</code>\n"
     "/help — эта справка\n\n"
     "<b>Панель управления:</b>\n"
     "➕ Добавить — создать новую задачу\n"
@@ -296,9 +282,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     is_first = db.get_panel_message_id(chat_id) is None
 
+    text, markup = tasks_panel(chat_id)
     msg = await update.effective_chat.send_message(
-        text=format_tasks_text(chat_id),
-        reply_markup=panel_keyboard(),
+        text=text,
+        reply_markup=markup,
         disable_web_page_preview=True,
     )
     db.set_panel_message_id(chat_id, msg.message_id)
@@ -317,338 +304,451 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     schedule_delete_message(context.application, hint.chat_id, hint.message_id, when_seconds=SCHEDULE_DELETE_SECONDS)
 
 
-async def on_panel_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    q = update.callback_query
-    if not q:
-        return
+# ---------- callback routes ----------
+@dataclass
+class CallbackCall:
+    """Контекст нажатия кнопки, общий для всех callback-маршрутов."""
 
-    data = q.data or ""
-    parsed = parse_callback(data)
-    chat = q.message.chat
-    chat_id = chat.id
-    user = q.from_user
-    user_id = user.id
-    actor_name = user.full_name
+    context: ContextTypes.DEFAULT_TYPE
+    q: CallbackQuery
+    chat: Chat
+    chat_id: int
+    user_id: int
+    actor_name: str
 
-    try:
-        await q.answer()
-    except Exception:
-        logger.debug("callback_query.answer failed", exc_info=True)
 
-    # --- reminder message actions ---
-    if parsed.type == "REMINDER_MSG":
-        await _handle_reminder_message_action(
-            context=context, chat=chat, chat_id=chat_id,
-            user_id=user_id, actor_name=actor_name, parsed=parsed, q=q,
-        )
-        return
+callback_router = CallbackRouter()
 
-    # --- panel actions ---
-    if parsed.type == "PANEL":
-        action = parsed.action
-        if action == CB.LIST:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.LIST)
-            return
 
-        if action == CB.HIST:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.HIST)
-            return
+# ---------- multi-select pickers (DONE / DEL) ----------
+_PICK_SCREENS = {"DONE": Screen.PICK_DONE, "DEL": Screen.PICK_DEL}
 
-        if action == CB.ADD:
-            db.pending_set(chat_id, user_id, PENDING_ADD_WAIT_TEXT)
-            await show_screen(context, chat_id, Screen.ADD_PROMPT)
-            return
 
-        if action == CB.DONE:
-            db.pending_clear(chat_id, user_id)
-            rows = db.fetch_open_tasks(chat_id, limit=PICK_DONE_LIMIT)
-            tasks = [Task.from_row(chat_id, r) for r in rows]
-            await show_screen(context, chat_id, Screen.PICK_DONE, {"rows": tasks})
-            return
+def _open_pick(call: CallbackCall, kind: str) -> PickSelection:
+    """Загружает задачи для пикера и запоминает пустой выбор нажавшего в runtime чата."""
+    if kind == "DONE":
+        rows = db.fetch_open_tasks(call.chat_id, limit=PICK_DONE_LIMIT)
+    else:
+        rows = db.fetch_tasks(call.chat_id, limit=PICK_DEL_LIMIT)
+    pick = PickSelection(kind=kind, rows=[Task.from_row(call.chat_id, r) for r in rows])
+    get_chat_runtime(call.context.application, call.chat_id).picks[call.user_id] = pick
+    return pick
+
+
+async def _show_pick(call: CallbackCall, pick: PickSelection) -> None:
+    await show_screen(
+        call.context,
+        call.chat_id,
+        _PICK_SCREENS[pick.kind],
+        {"rows": pick.rows, "selected": pick.selected},
+    )
 
-        if action == CB.DEL:
-            db.pending_clear(chat_id, user_id)
-            rows = db.fetch_tasks(chat_id, limit=PICK_DEL_LIMIT)
-            tasks = [Task.from_row(chat_id, r) for r in rows]
-            await show_screen(context, chat_id, Screen.PICK_DEL, {"rows": tasks})
-            return
 
-        if action == CB.REM:
-            db.pending_clear(chat_id, user_id)
-            rows = db.fetch_open_tasks(chat_id, limit=PICK_REM_LIMIT)
-            tasks = [Task.from_row(chat_id, r) for r in rows]
-            await show_screen(context, chat_id, Screen.PICK_REM, {"rows": tasks})
-            return
+async def _fetch_live_task(call: CallbackCall, task_id: int) -> Task | None:
+    """Задача для picker/RSET; если её нет или она удалена — flash и None."""
+    row = db.fetch_task(call.chat_id, task_id)
+    task = Task.from_row(call.chat_id, row) if row else None
+    if task is None or task.deleted:
+        await flash_panel(call.context, call.chat_id, "ℹ️ Не нашёл задачу.")
+        return None
+    return task
 
-        if action == CB.RECUR:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.RECUR_LIST)
-            return
 
-        if action == CB.RECUR_ADD:
-            db.pending_set(chat_id, user_id, PENDING_RECUR_ADD_TEXT)
-            await show_screen(context, chat_id, Screen.RECUR_ADD_PROMPT)
-            return
+# --- reminder message actions ---
+@callback_router.route(CB.RM)
+async def _route_reminder_message(call: CallbackCall, parsed) -> None:
+    await _handle_reminder_message_action(
+        context=call.context, chat=call.chat, chat_id=call.chat_id,
+        user_id=call.user_id, actor_name=call.actor_name, parsed=parsed, q=call.q,
+    )
 
-        if action == CB.RECUR_DEL_PICK:
-            db.pending_clear(chat_id, user_id)
-            rows = db.recurring_fetch_by_chat(chat_id)
-            await show_screen(context, chat_id, Screen.RECUR_PICK_DEL, {"rows": rows})
-            return
 
-        if action == CB.RATES:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.RATES, {"rate_text": "⏳ Получаю курс..."})
-            rate_text = await format_usdt_thb()
-            await show_screen(context, chat_id, Screen.RATES, {"rate_text": rate_text})
-            return
+# --- panel actions ---
+@callback_router.route(CB.LIST)
+async def _route_list(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    await show_screen(call.context, call.chat_id, Screen.LIST)
+
+
+@callback_router.route(CB.PAGE)
+async def _route_list_page(call: CallbackCall, parsed) -> None:
+    await show_screen(call.context, call.chat_id, Screen.LIST, {"page": parsed.task_id or 0})
+
+
+@callback_router.route(CB.HIST)
+async def _route_hist(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    await show_screen(call.context, call.chat_id, Screen.HIST)
 
-        if action == CB.RECUR_ADD_CUSTOM:
-            p = db.pending_get(chat_id, user_id)
-            reminder_text = (p["meta"] or "") if p and p["action"] == PENDING_RECUR_ADD_SCHEDULE else ""
-            db.pending_set(chat_id, user_id, PENDING_RECUR_ADD_CUSTOM_DAY, meta=reminder_text)
-            await show_screen(context, chat_id, Screen.RECUR_ADD_CUSTOM_DAY, {"reminder_text": reminder_text})
-            return
 
+@callback_router.route(CB.ADD)
+async def _route_add(call: CallbackCall, parsed) -> None:
+    pending_store.set(call.chat_id, call.user_id, PENDING_ADD_WAIT_TEXT)
+    await show_screen(call.context, call.chat_id, Screen.ADD_PROMPT)
+
+
+@callback_router.route(CB.DONE)
+async def _route_done_picker(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    await _show_pick(call, _open_pick(call, "DONE"))
+
+
+@callback_router.route(CB.DEL)
+async def _route_del_picker(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    await _show_pick(call, _open_pick(call, "DEL"))
+
+
+@callback_router.route(CB.REM)
+async def _route_rem_picker(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    rows = db.fetch_open_tasks(call.chat_id, limit=PICK_REM_LIMIT)
+    tasks = [Task.from_row(call.chat_id, r) for r in rows]
+    await show_screen(call.context, call.chat_id, Screen.PICK_REM, {"rows": tasks})
+
+
+@callback_router.route(CB.RECUR)
+async def _route_recur(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    await show_screen(call.context, call.chat_id, Screen.RECUR_LIST)
+
+
+@callback_router.route(CB.RECUR_ADD)
+async def _route_recur_add(call: CallbackCall, parsed) -> None:
+    pending_store.set(call.chat_id, call.user_id, PENDING_RECUR_ADD_TEXT)
+    await show_screen(call.context, call.chat_id, Screen.RECUR_ADD_PROMPT)
+
+
+@callback_router.route(CB.RECUR_DEL_PICK)
+async def _route_recur_del_picker(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    rows = db.recurring_fetch_by_chat(call.chat_id)
+    await show_screen(call.context, call.chat_id, Screen.RECUR_PICK_DEL, {"rows": rows})
+
+
+@callback_router.route(CB.RATES)
+async def _route_rates(call: CallbackCall, parsed) -> None:
+    pending_store.clear(call.chat_id, call.user_id)
+    if not rate_cache.is_fresh():
+        # за курсом придётся сходить на биржу — сначала показываем, что ждём
+        await show_screen(call.context, call.chat_id, Screen.RATES, {"rate_text": "⏳ Получаю курс..."})
+    rate_text = await format_usdt_thb()
+    history_text = format_history("USDT_THB")
+    if history_text:
+        rate_text += f"\n\n{history_text}"
+    await show_screen(call.context, call.chat_id, Screen.RATES, {"rate_text": rate_text})
+
+
+@callback_router.route(CB.RECUR_ADD_CUSTOM)
+async def _route_recur_add_custom(call: CallbackCall, parsed) -> None:
+    p = pending_store.get(call.chat_id, call.user_id)
+    reminder_text = (p.meta or "") if p and p.action == PENDING_RECUR_ADD_SCHEDULE else ""
+    pending_store.set(call.chat_id, call.user_id, PENDING_RECUR_ADD_CUSTOM_DAY, meta=reminder_text)
+    await show_screen(call.context, call.chat_id, Screen.RECUR_ADD_CUSTOM_DAY, {"reminder_text": reminder_text})
+
+
+# --- pickers / RSET ---
+@callback_router.route(CB.DONE_PICK)
+async def _route_pick_done(call: CallbackCall, parsed) -> None:
+    task_id = parsed.task_id
+    if not task_id:
+        return
+    task = await _fetch_live_task(call, task_id)
+    if task is None:
         return
+    allowed = await can_action(
+        context=call.context,
+        chat=call.chat,
+        actor_id=call.user_id,
+        action="DONE",
+        task_owner_id=task.owner_id,
+    )
+    if not allowed:
+        await flash_panel(call.context, call.chat_id, "🚫 Отметить выполненной может только автор или админ.")
+        return
+    ok = services.mark_done(
+        app=call.context.application,
+        chat_id=call.chat_id,
+        actor_id=call.user_id,
+        actor_name=call.actor_name,
+        task_id=task_id,
+    )
+    await flash_panel(call.context, call.chat_id, "✅ Готово." if ok else "ℹ️ Уже выполнено.")
 
-    # --- pickers / RSET ---
-    if parsed.type == "PICK_DONE":
-        task_id = parsed.task_id
-        if not task_id:
-            return
-        row = db.fetch_task(chat_id, task_id)
-        if not row:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
-        task = Task.from_row(chat_id, row)
-        if task.deleted:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
-        allowed = await can_action(
-            context=context,
-            chat=chat,
-            actor_id=user_id,
-            action="DONE",
-            task_owner_id=task.owner_id,
-        )
-        if not allowed:
-            await flash_panel(context, chat_id, "🚫 Отметить выполненной может только автор или админ.")
-            return
-        ok = services.mark_done(
-            app=context.application,
-            chat_id=chat_id,
-            actor_id=user_id,
-            actor_name=actor_name,
-            task_id=task_id,
-        )
-        await flash_panel(context, chat_id, "✅ Готово." if ok else "ℹ️ Уже выполнено.")
+
+@callback_router.route(CB.DEL_PICK)
+async def _route_pick_del(call: CallbackCall, parsed) -> None:
+    task_id = parsed.task_id
+    if not task_id:
+        return
+    task = await _fetch_live_task(call, task_id)
+    if task is None:
         return
 
-    if parsed.type == "PICK_DEL":
-        task_id = parsed.task_id
-        if not task_id:
-            return
-        row = db.fetch_task(chat_id, task_id)
-        if not row:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
-        task = Task.from_row(chat_id, row)
-        if task.deleted:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
+    allowed = await can_action(
+        context=call.context,
+        chat=call.chat,
+        actor_id=call.user_id,
+        action="DELETE",
+        task_owner_id=task.owner_id,
+    )
+    if not allowed:
+        await flash_panel(call.context, call.chat_id, "🚫 Удалять может только автор или админ.")
+        return
 
-        allowed = await can_action(
-            context=context,
-            chat=chat,
-            actor_id=user_id,
-            action="DELETE",
-            task_owner_id=task.owner_id,
-        )
-        if not allowed:
-            await flash_panel(context, chat_id, "🚫 Удалять может только автор или админ.")
-            return
+    ok = services.delete_task(
+        app=call.context.application,
+        chat_id=call.chat_id,
+        actor_id=call.user_id,
+        actor_name=call.actor_name,
+        task_id=task_id,
+    )
+    await flash_panel(call.context, call.chat_id, "🗑 Удалено (скрыто)." if ok else "ℹ️ Не нашёл задачу.")
 
-        ok = services.delete_task(
-            app=context.application,
-            chat_id=chat_id,
-            actor_id=user_id,
-            actor_name=actor_name,
-            task_id=task_id,
-        )
-        await flash_panel(context, chat_id, "🗑 Удалено (скрыто)." if ok else "ℹ️ Не нашёл задачу.")
+
+@callback_router.route(CB.SEL)
+async def _route_pick_toggle(call: CallbackCall, parsed) -> None:
+    task_id = parsed.task_id
+    if not task_id:
         return
+    pick = get_chat_runtime(call.context.application, call.chat_id).picks.get(call.user_id)
+    if pick is None or pick.kind != parsed.action:
+        # выбор потерян (перезапуск, вытеснение) или открыт другой пикер — начинаем заново
+        pick = _open_pick(call, parsed.action)
+    pick.toggle(task_id)
+    await _show_pick(call, pick)
+
+
+@callback_router.route(CB.APPLY)
+async def _route_pick_apply(call: CallbackCall, parsed) -> None:
+    picks = get_chat_runtime(call.context.application, call.chat_id).picks
+    pick = picks.get(call.user_id)
+    if pick is None or pick.kind != parsed.action or not pick.selected:
+        await flash_panel(call.context, call.chat_id, "ℹ️ Ничего не выбрано.")
+        return
+    del picks[call.user_id]
+
+    action = "DONE" if pick.kind == "DONE" else "DELETE"
+    rows = pick.selected_rows()
+    # права зависят только от автора задачи: одна проверка на автора, а не на задачу
+    allowed_owners = set()
+    for owner_id in {row.owner_id for row in rows}:
+        if await can_action(
+            context=call.context,
+            chat=call.chat,
+            actor_id=call.user_id,
+            action=action,
+            task_owner_id=owner_id,
+        ):
+            allowed_owners.add(owner_id)
+    task_ids = [row.id for row in rows if row.owner_id in allowed_owners]
+    denied = len(rows) - len(task_ids)
+
+    bulk = services.mark_done_many if pick.kind == "DONE" else services.delete_tasks
+    changed = bulk(
+        app=call.context.application,
+        chat_id=call.chat_id,
+        actor_id=call.user_id,
+        actor_name=call.actor_name,
+        task_ids=task_ids,
+    )
 
-    if parsed.type == "PICK_REM":
-        task_id = parsed.task_id
-        if not task_id:
-            return
-        row = db.fetch_task(chat_id, task_id)
-        if not row:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
-        task = Task.from_row(chat_id, row)
-        if task.deleted:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
+    if pick.kind == "DONE":
+        line = f"✅ Выполнено: {len(changed)}."
+    else:
+        line = f"🗑 Удалено (скрыто): {len(changed)}."
+    if denied:
+        line += f" 🚫 Без прав: {denied}."
+    await flash_panel(call.context, call.chat_id, line)
 
-        allowed = await can_action(
-            context=context,
-            chat=chat,
-            actor_id=user_id,
-            action="REM",
-            task_owner_id=task.owner_id,
-        )
-        if not allowed:
-            await flash_panel(context, chat_id, "🚫 Напоминание может менять только автор или админ.")
-            return
 
-        db.pending_set(chat_id, user_id, PENDING_REM_WAIT_TIME, task_id=task_id)
-        await show_screen(context, chat_id, Screen.REM_PROMPT, {"task_id": task_id, "task_text": task.text})
+@callback_router.route(CB.REM_PICK)
+async def _route_pick_rem(call: CallbackCall, parsed) -> None:
+    task_id = parsed.task_id
+    if not task_id:
+        return
+    task = await _fetch_live_task(call, task_id)
+    if task is None:
         return
 
-    if parsed.type == "RSET":
-        task_id = parsed.task_id
-        kind = parsed.action or ""
-        if not task_id:
-            return
+    allowed = await can_action(
+        context=call.context,
+        chat=call.chat,
+        actor_id=call.user_id,
+        action="REM",
+        task_owner_id=task.owner_id,
+    )
+    if not allowed:
+        await flash_panel(call.context, call.chat_id, "🚫 Напоминание может менять только автор или админ.")
+        return
 
-        row = db.fetch_task(chat_id, task_id)
-        if not row:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
-        task = Task.from_row(chat_id, row)
-        if task.deleted:
-            await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
-            return
+    pending_store.set(call.chat_id, call.user_id, PENDING_REM_WAIT_TIME, task_id=task_id)
+    await show_screen(call.context, call.chat_id, Screen.REM_PROMPT, {"task_id": task_id, "task_text": task.text})
 
-        allowed = await can_action(
-            context=context,
-            chat=chat,
-            actor_id=user_id,
-            action="REM",
-            task_owner_id=task.owner_id,
-        )
-        if not allowed:
-            await flash_panel(context, chat_id, "🚫 Напоминание может менять только автор или админ.")
-            return
 
-        if kind == "MANUAL":
-            db.pending_set(chat_id, user_id, PENDING_REM_WAIT_TIME_TEXT, task_id=task_id)
-            await show_screen(context, chat_id, Screen.REM_MANUAL_PROMPT)
-            return
+@callback_router.route(CB.RSET)
+async def _route_rset(call: CallbackCall, parsed) -> None:
+    context, chat_id, user_id, actor_name = call.context, call.chat_id, call.user_id, call.actor_name
+    task_id = parsed.task_id
+    kind = parsed.action or ""
+    if not task_id:
+        return
 
-        if kind == "NONE":
-            services.clear_reminder(
-                app=context.application,
-                chat_id=chat_id,
-                actor_id=user_id,
-                actor_name=actor_name,
-                task_id=task_id,
-            )
-            db.pending_clear(chat_id, user_id)
-            await flash_panel(context, chat_id, "✅ Напоминание убрано.")
-            return
+    task = await _fetch_live_task(call, task_id)
+    if task is None:
+        return
 
-        chat_tz = db.get_chat_tz(chat_id)
-        now_local = datetime.now(chat_tz)
-        if kind == "30M":
-            dt = now_local + timedelta(minutes=30)
-        elif kind == "2H":
-            dt = now_local + timedelta(hours=2)
-        elif kind == "TOM10":
-            base = now_local + timedelta(days=1)
-            dt = base.replace(hour=10, minute=0, second=0, microsecond=0)
-        else:
-            await flash_panel(context, chat_id, "ℹ️ Неизвестная команда.")
-            return
+    allowed = await can_action(
+        context=context,
+        chat=call.chat,
+        actor_id=user_id,
+        action="REM",
+        task_owner_id=task.owner_id,
+    )
+    if not allowed:
+        await flash_panel(context, chat_id, "🚫 Напоминание может менять только автор или админ.")
+        return
 
-        services.set_reminder(
+    if kind == "MANUAL":
+        pending_store.set(chat_id, user_id, PENDING_REM_WAIT_TIME_TEXT, task_id=task_id)
+        await show_screen(context, chat_id, Screen.REM_MANUAL_PROMPT)
+        return
+
+    if kind == "NONE":
+        services.clear_reminder(
             app=context.application,
             chat_id=chat_id,
             actor_id=user_id,
             actor_name=actor_name,
             task_id=task_id,
-            remind_at=dt,
         )
-        db.pending_clear(chat_id, user_id)
-        await flash_panel(context, chat_id, f"✅ Напоминание: {dt.strftime('%d.%m %H:%M')}")
+        pending_store.clear(chat_id, user_id)
+        await flash_panel(context, chat_id, "✅ Напоминание убрано.")
         return
 
-    if parsed.type == "RECUR_DEL":
-        rec_id = parsed.task_id
-        if not rec_id:
-            return
-        ok = db.recurring_delete(chat_id, rec_id)
-        await show_screen(context, chat_id, Screen.RECUR_LIST)
-        if ok:
-            await flash_panel(context, chat_id, "🗑 Повторяющееся напоминание удалено.")
+    chat_tz = db.get_chat_tz(chat_id)
+    now_local = datetime.now(chat_tz)
+    if kind == "30M":
+        dt = now_local + timedelta(minutes=30)
+    elif kind == "2H":
+        dt = now_local + timedelta(hours=2)
+    elif kind == "TOM10":
+        base = now_local + timedelta(days=1)
+        dt = base.replace(hour=10, minute=0, second=0, microsecond=0)
+    else:
+        await flash_panel(context, chat_id, "ℹ️ Неизвестная команда.")
         return
 
-    if parsed.type == "RECUR_SCHED":
-        act = (parsed.action or "").strip()
-        if not act:
-            return
-        p = db.pending_get(chat_id, user_id)
-        if not p or p["action"] != PENDING_RECUR_ADD_SCHEDULE:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.RECUR_LIST)
-            return
-        reminder_text = (p["meta"] or "").strip()
-        if not reminder_text:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.RECUR_LIST)
-            return
-        parts = act.split(":")
-        if len(parts) < 2:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.RECUR_LIST)
-            return
-        kind_char, day_str = parts[0], parts[1]
+    services.set_reminder(
+        app=context.application,
+        chat_id=chat_id,
+        actor_id=user_id,
+        actor_name=actor_name,
+        task_id=task_id,
+        remind_at=dt,
+    )
+    pending_store.clear(chat_id, user_id)
+    await flash_panel(context, chat_id, f"✅ Напоминание: {dt.strftime('%d.%m %H:%M')}")
+
+
+@callback_router.route("RECUR_DEL")
+async def _route_recur_del(call: CallbackCall, parsed) -> None:
+    rec_id = parsed.task_id
+    if not rec_id:
+        return
+    ok = db.recurring_delete(call.chat_id, rec_id)
+    await show_screen(call.context, call.chat_id, Screen.RECUR_LIST)
+    if ok:
+        await flash_panel(call.context, call.chat_id, "🗑 Повторяющееся напоминание удалено.")
+
+
+@callback_router.route("RSCHED")
+async def _route_recur_sched(call: CallbackCall, parsed) -> None:
+    context, chat_id, user_id, actor_name = call.context, call.chat_id, call.user_id, call.actor_name
+    act = (parsed.action or "").strip()
+    if not act:
+        return
+    p = pending_store.get(chat_id, user_id)
+    if not p or p.action != PENDING_RECUR_ADD_SCHEDULE:
+        pending_store.clear(chat_id, user_id)
+        await show_screen(context, chat_id, Screen.RECUR_LIST)
+        return
+    reminder_text = (p.meta or "").strip()
+    if not reminder_text:
+        pending_store.clear(chat_id, user_id)
+        await show_screen(context, chat_id, Screen.RECUR_LIST)
+        return
+    parts = act.split(":")
+    if len(parts) < 2:
+        pending_store.clear(chat_id, user_id)
+        await show_screen(context, chat_id, Screen.RECUR_LIST)
+        return
+    kind_char, day_str = parts[0], parts[1]
+    try:
+        day = int(day_str)
+    except ValueError:
+        pending_store.clear(chat_id, user_id)
+        await show_screen(context, chat_id, Screen.RECUR_LIST)
+        return
+    month = None
+    if kind_char == "Y" and len(parts) >= 3:
         try:
-            day = int(day_str)
+            month = int(parts[2])
         except ValueError:
-            db.pending_clear(chat_id, user_id)
-            await show_screen(context, chat_id, Screen.RECUR_LIST)
-            return
-        month = None
-        if kind_char == "Y" and len(parts) >= 3:
-            try:
-                month = int(parts[2])
-            except ValueError:
-                month = None
-        repeat_kind = "MONTHLY" if kind_char == "M" else "YEARLY"
-        if repeat_kind == "YEARLY" and month is None:
-            month = 1
-        now_local = datetime.now(db.get_chat_tz(chat_id))
-        next_dt = compute_next_run(
-            repeat_kind=repeat_kind,
-            day_of_month=day,
-            from_dt=now_local,
-            month=month,
-            hour=RECURRING_DEFAULT_HOUR,
-            minute=RECURRING_DEFAULT_MINUTE,
-        )
-        next_iso = next_dt.isoformat()
-        db.recurring_insert(
-            chat_id=chat_id,
-            owner_id=user_id,
-            owner_name=actor_name,
-            text=reminder_text,
-            repeat_kind=repeat_kind,
-            day_of_month=day,
-            next_run_at_iso=next_iso,
-            month=month,
-            hour=RECURRING_DEFAULT_HOUR,
-            minute=RECURRING_DEFAULT_MINUTE,
-        )
-        db.pending_clear(chat_id, user_id)
-        await flash_panel(context, chat_id, f"✅ Добавлено повторяющееся напоминание. След. раз: {next_dt.strftime('%d.%m %H:%M')}")
-        await show_screen(context, chat_id, Screen.RECUR_LIST)
+            month = None
+    repeat_kind = "MONTHLY" if kind_char == "M" else "YEARLY"
+    if repeat_kind == "YEARLY" and month is None:
+        month = 1
+    now_local = datetime.now(db.get_chat_tz(chat_id))
+    next_dt = compute_next_run(
+        repeat_kind=repeat_kind,
+        day_of_month=day,
+        from_dt=now_local,
+        month=month,
+        hour=RECURRING_DEFAULT_HOUR,
+        minute=RECURRING_DEFAULT_MINUTE,
+    )
+    next_iso = next_dt.isoformat()
+    db.recurring_insert(
+        chat_id=chat_id,
+        owner_id=user_id,
+        owner_name=actor_name,
+        text=reminder_text,
+        repeat_kind=repeat_kind,
+        day_of_month=day,
+        next_run_at_iso=next_iso,
+        month=month,
+        hour=RECURRING_DEFAULT_HOUR,
+        minute=RECURRING_DEFAULT_MINUTE,
+    )
+    pending_store.clear(chat_id, user_id)
+    await flash_panel(context, chat_id, f"✅ Добавлено повторяющееся напоминание. След. раз: {next_dt.strftime('%d.%m %H:%M')}")
+    await show_screen(context, chat_id, Screen.RECUR_LIST)
+
+
+@profiled
+async def on_panel_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    if not q:
         return
 
+    try:
+        await q.answer()
+    except Exception:
+        logger.debug("callback_query.answer failed", exc_info=True)
+
+    chat = q.message.chat
+    user = q.from_user
+    call = CallbackCall(
+        context=context,
+        q=q,
+        chat=chat,
+        chat_id=chat.id,
+        user_id=user.id,
+        actor_name=user.full_name,
+    )
+    await callback_router.dispatch(q.data or "", call)
+
 
 async def cmd_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
@@ -686,6 +786,7 @@ async def cmd_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     db.set_chat_tz(chat_id, tz_name)
+    invalidate_tasks_text(chat_id)
     msg = await update.message.reply_text(
         f"✅ Часовой пояс установлен: <b>{tz_name}</b>",
         parse_mode="HTML",
@@ -693,6 +794,140 @@ async def cmd_timezone(update: Update, context: ContextTypes.DEFAULT_TYPE):
     schedule_delete_message(context.application, chat_id, msg.message_id, when_seconds=10)
 
 
+_ALERT_USAGE = (
+    "Формат:\n"
+    "<code>/alert USDT ниже 33.5</code>\n"
+    "<code>/alert BTC/THB > 2500000</code>\n"
+    "<code>/alert del 3</code> — удалить алерт #3"
+)
+
+
+async def _reply_and_delete(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str, when_seconds: int) -> None:
+    msg = await update.message.reply_text(text, parse_mode="HTML")
+    schedule_delete_message(context.application, update.effective_chat.id, msg.message_id, when_seconds=when_seconds)
+
+
+async def cmd_alert(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    args = context.args or []
+
+    if not args:
+        alerts = [Alert.from_row(r) for r in db.alert_fetch_by_chat(chat_id)]
+        if alerts:
+            lines = "\n".join(f"#{a.id}  {a.label}" for a in alerts)
+            text = f"🔔 <b>Ценовые алерты:</b>\n{lines}\n\n{_ALERT_USAGE}"
+        else:
+            text = f"🔔 Алертов нет.\n\n{_ALERT_USAGE}"
+        await _reply_and_delete(update, context, text, when_seconds=60)
+        return
+
+    if args[0].lower() in ("del", "удалить"):
+        try:
+            alert_id = int(args[1].lstrip("#"))
+        except (IndexError, ValueError):
+            await _reply_and_delete(update, context, _ALERT_USAGE, when_seconds=20)
+            return
+        if alert_engine.remove(chat_id, alert_id):
+            text = f"🗑 Алерт #{alert_id} удалён"
+        else:
+            text = f"❌ Алерт #{alert_id} не найден"
+        await _reply_and_delete(update, context, text, when_seconds=SCHEDULE_DELETE_SECONDS)
+        return
+
+    parsed = parse_alert(" ".join(args))
+    if parsed is None:
+        await _reply_and_delete(update, context, f"❌ Не понял алерт.\n\n{_ALERT_USAGE}", when_seconds=20)
+        return
+    symbol, direction, threshold = parsed
+
+    if db.alert_count_by_chat(chat_id) >= ALERTS_MAX_PER_CHAT:
+        text = f"❌ В чате уже {ALERTS_MAX_PER_CHAT} алертов — удали ненужные: /alert"
+        await _reply_and_delete(update, context, text, when_seconds=20)
+        return
+
+    # заодно проверяем, что такая пара есть на бирже. Не через get: алерт — не просмотр
+    # курсов и не должен включать фоновое обновление тикера (rates_refresh)
+    if not rate_cache.is_fresh():
+        # не дольше, чем RATES ждёт протухший курс: пока хэндлер ждёт, очередь апдейтов
+        # чата стоит, а при недоступной бирже запрос с повторами идёт ~30 с
+        try:
+            await asyncio.wait_for(asyncio.shield(rate_cache.refresh()), RATES_STALE_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    price = last_price(rate_cache.peek(symbol))
+    if price is None:
+        text = f"❌ Нет курса {symbol.replace('_', '/')} на Bitkub: такой пары нет или биржа не отвечает."
+        await _reply_and_delete(update, context, text, when_seconds=20)
+        return
+
+    user = update.effective_user
+    alert = alert_engine.add(chat_id, user.id, user.full_name, symbol, direction, threshold)
+    text = f"🔔 Алерт #{alert.id}: {alert.label}\nСейчас: {format_price(price)} ฿"
+    if alert.triggered_by(price):
+        text += "\n\nУсловие уже выполнено — сработает при ближайшей проверке курса."
+    await _reply_and_delete(update, context, text, when_seconds=30)
+
+
+async def on_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Держит кэш администраторов в актуальном состоянии по событиям смены статусов."""
+    if update.my_chat_member is not None:
+        # статус самого бота поменялся — список админов мог стать (не)доступен
+        admin_cache.invalidate(update.my_chat_member.chat.id)
+        return
+
+    cmu = update.chat_member
+    if cmu is None:
+        return
+    admin_cache.apply_status(cmu.chat.id, cmu.new_chat_member.user.id, cmu.new_chat_member.status)
+
+
+async def _add_tasks_bulk(
+    context: ContextTypes.DEFAULT_TYPE,
+    chat_id: int,
+    user_id: int,
+    actor_name: str,
+    items: list[str],
+) -> None:
+    if len(items) > BULK_ADD_MAX:
+        await show_screen(
+            context,
+            chat_id,
+            Screen.ADD_PROMPT,
+            {"hint": f"Слишком много строк ({len(items)}, максимум {BULK_ADD_MAX})."},
+        )
+        return
+    too_long = [idx for idx, item in enumerate(items, start=1) if len(item) > TASK_TEXT_MAX_LEN]
+    if too_long:
+        await show_screen(
+            context,
+            chat_id,
+            Screen.ADD_PROMPT,
+            {"hint": f"Строка {too_long[0]} слишком длинная (максимум {TASK_TEXT_MAX_LEN} символов)."},
+        )
+        return
+
+    tids = services.add_tasks(
+        chat_id=chat_id,
+        owner_id=user_id,
+        owner_name=actor_name,
+        texts=items,
+        max_open=MAX_TASKS_PER_CHAT,
+    )
+    if tids is None:
+        free = max(MAX_TASKS_PER_CHAT - db.count_open_tasks(chat_id), 0)
+        await show_screen(
+            context,
+            chat_id,
+            Screen.ADD_PROMPT,
+            {"hint": f"Список не влезает в лимит задач ({MAX_TASKS_PER_CHAT}): свободно {free}, в списке {len(items)}."},
+        )
+        return
+
+    pending_store.clear(chat_id, user_id)
+    await flash_panel(context, chat_id, f"✅ Добавил задач: {len(tids)} (#{tids[0]}–#{tids[-1]})")
+
+
+@profiled
 async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.message or not update.message.text:
         return
@@ -703,16 +938,20 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     actor_name = user.full_name
     text = update.message.text.strip()
 
-    p = db.pending_get(chat_id, user_id)
+    p = pending_store.get(chat_id, user_id)
     if not p:
         return
 
     # delete service message (so chat is clean)
     await try_delete_message(context, chat_id, update.message.message_id)
 
-    action = p["action"]
+    action = p.action
 
     if action == PENDING_ADD_WAIT_TEXT:
+        items = split_task_lines(text)
+        if len(items) > 1:
+            await _add_tasks_bulk(context, chat_id, user_id, actor_name, items)
+            return
         if not text:
             await show_screen(
                 context,
@@ -738,7 +977,7 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
         tid = services.add_task(chat_id=chat_id, owner_id=user_id, owner_name=actor_name, text=text)
-        db.pending_set(chat_id, user_id, PENDING_REM_WAIT_TIME, task_id=tid)
+        pending_store.set(chat_id, user_id, PENDING_REM_WAIT_TIME, task_id=tid)
         await edit_panel(
             context.application,
             chat_id,
@@ -748,19 +987,19 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if action in (PENDING_REM_WAIT_TIME, PENDING_REM_WAIT_TIME_TEXT):
-        task_id = p["task_id"]
+        task_id = p.task_id
         if not task_id:
-            db.pending_clear(chat_id, user_id)
+            pending_store.clear(chat_id, user_id)
             return
 
         row = db.fetch_task(chat_id, task_id)
         if not row:
-            db.pending_clear(chat_id, user_id)
+            pending_store.clear(chat_id, user_id)
             await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
             return
         task = Task.from_row(chat_id, row)
         if task.deleted:
-            db.pending_clear(chat_id, user_id)
+            pending_store.clear(chat_id, user_id)
             await flash_panel(context, chat_id, "ℹ️ Не нашёл задачу.")
             return
 
@@ -772,7 +1011,7 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             task_owner_id=task.owner_id,
         )
         if not allowed:
-            db.pending_clear(chat_id, user_id)
+            pending_store.clear(chat_id, user_id)
             await flash_panel(context, chat_id, "🚫 Напоминание может менять только автор или админ.")
             return
 
@@ -794,7 +1033,7 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 actor_name=actor_name,
                 task_id=task_id,
             )
-            db.pending_clear(chat_id, user_id)
+            pending_store.clear(chat_id, user_id)
             await flash_panel(context, chat_id, "✅ Ок. Без напоминания.")
             return
 
@@ -807,7 +1046,7 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             task_id=task_id,
             remind_at=parsed,
         )
-        db.pending_clear(chat_id, user_id)
+        pending_store.clear(chat_id, user_id)
         await flash_panel(context, chat_id, f"✅ Напоминание: {parsed.strftime('%d.%m %H:%M')}")
         return
 
@@ -820,12 +1059,12 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 {"hint": "Введи непустой текст."},
             )
             return
-        db.pending_set(chat_id, user_id, PENDING_RECUR_ADD_SCHEDULE, meta=text)
+        pending_store.set(chat_id, user_id, PENDING_RECUR_ADD_SCHEDULE, meta=text)
         await show_screen(context, chat_id, Screen.RECUR_ADD_SCHEDULE, {"reminder_text": text})
         return
 
     if action == PENDING_RECUR_ADD_CUSTOM_DAY:
-        reminder_text = (p["meta"] or "").strip()
+        reminder_text = (p.meta or "").strip()
         parsed_sched = parse_recurring_schedule(text)
         if parsed_sched == "INVALID":
             await show_screen(
@@ -859,7 +1098,7 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             hour=RECURRING_DEFAULT_HOUR,
             minute=RECURRING_DEFAULT_MINUTE,
         )
-        db.pending_clear(chat_id, user_id)
+        pending_store.clear(chat_id, user_id)
         if repeat_kind == "MONTHLY":
             sched_label = f"каждый месяц {day}-го"
         else:
@@ -868,4 +1107,4 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await show_screen(context, chat_id, Screen.RECUR_LIST)
         return
 
-    db.pending_clear(chat_id, user_id)
+    pending_store.clear(chat_id, user_id)
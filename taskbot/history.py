@@ -0,0 +1,158 @@
+"""История курсов: тики с понижением разрешения, статистика и спарклайны для экрана RATES.
+
+Каждое обновление тикера пишет цену отслеживаемых пар (USDT_THB и RATES_EXTRA_SYMBOLS)
+сразу во все разрешения таблицы rate_history: сырые тики (бакет 1 с), 5-минутные и
+часовые бакеты с min/max/sum/count. Строки старше срока своего разрешения удаляются,
+поэтому объём ограничен: сутки тиков, неделя 5-минуток, RATES_HISTORY_DAYS часовых.
+
+Экран RATES читает только готовые бакеты — не больше 288 пятиминутных за 24 ч и 168
+часовых за 7 д, сколько бы тиков ни накопилось.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from telegram.ext import Application, ContextTypes
+
+from . import db
+from .config import RATES_EXTRA_SYMBOLS, RATES_HISTORY_DAYS, RATES_HISTORY_SAMPLE_SECONDS
+from .rates import last_price, rate_cache
+
+RAW = 1
+FIVE_MIN = 300
+HOUR = 3600
+DAY = 86400
+# разрешение бакета (секунды) -> сколько секунд его хранить
+RETENTION = {RAW: DAY, FIVE_MIN: 7 * DAY, HOUR: RATES_HISTORY_DAYS * DAY}
+PRUNE_INTERVAL = HOUR
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+SPARK_WIDTH = 24
+# окна экрана RATES: (подпись, разрешение, длина окна)
+WINDOWS = (("24 ч", FIVE_MIN, DAY), ("7 д", HOUR, 7 * DAY))
+
+
+def tracked_symbols() -> tuple[str, ...]:
+    return tuple(dict.fromkeys(("USDT_THB", *RATES_EXTRA_SYMBOLS)))
+
+
+class HistoryRecorder:
+    """Пишет тикер в rate_history на каждом обновлении кэша курсов и раз в час чистит старое."""
+
+    def __init__(self):
+        self.enabled = False
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        # пишем только пока бот запущен (post_init → post_shutdown), а не в любом собранном Application
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def on_ticker(self, ticker: dict[str, dict]) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        ticks = []
+        for symbol in tracked_symbols():
+            price = last_price(ticker.get(symbol))
+            if price is not None:
+                ticks.append((symbol, now, price))
+        db.history_record(ticks, tuple(RETENTION))
+        if now - self._pruned_at >= PRUNE_INTERVAL:
+            self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        self._pruned_at = now
+        return db.history_prune({res: int(now) - keep for res, keep in RETENTION.items()})
+
+
+history_recorder = HistoryRecorder()
+rate_cache.subscribe(history_recorder.on_ticker)
+
+
+@dataclass
+class WindowStats:
+    low: float
+    high: float
+    avg: float
+    spark: str
+
+
+def sparkline(values: list[Optional[float]]) -> str:
+    """Столбик на значение; None — пробел (в этом отрезке курс не снимали)."""
+    present = [v for v in values if v is not None]
+    if not present:
+        return ""
+    low, high = min(present), max(present)
+    top = len(SPARK_CHARS) - 1
+    chars = []
+    for v in values:
+        if v is None:
+            chars.append(" ")
+        elif high == low:
+            chars.append(SPARK_CHARS[top // 2])
+        else:
+            chars.append(SPARK_CHARS[round((v - low) / (high - low) * top)])
+    return "".join(chars)
+
+
+def window_stats(symbol: str, resolution: int, seconds: int, width: int = SPARK_WIDTH,
+                 now: Optional[float] = None) -> Optional[WindowStats]:
+    """min/max/среднее и спарклайн за последние seconds по бакетам resolution."""
+    now = time.time() if now is None else now
+    # окно — ровно seconds // resolution бакетов, последний из них текущий
+    start = (int(now) // resolution + 1) * resolution - seconds
+    rows = db.history_fetch(symbol, resolution, start)
+    if not rows:
+        return None
+    per_column = max(1, seconds // resolution // width)
+    sums = [0.0] * width
+    counts = [0] * width
+    for r in rows:
+        col = (r["bucket"] - start) // resolution // per_column
+        if 0 <= col < width:
+            sums[col] += r["sum"]
+            counts[col] += r["count"]
+    return WindowStats(
+        low=min(r["min"] for r in rows),
+        high=max(r["max"] for r in rows),
+        avg=sum(r["sum"] for r in rows) / sum(r["count"] for r in rows),
+        spark=sparkline([s / c if c else None for s, c in zip(sums, counts)]),
+    )
+
+
+def format_history(symbol: str = "USDT_THB", now: Optional[float] = None) -> str:
+    """Блок для экрана RATES: по строке статистики и спарклайну на окно; пусто, если истории нет."""
+    lines = []
+    for title, resolution, seconds in WINDOWS:
+        stats = window_stats(symbol, resolution, seconds, now=now)
+        if stats is None:
+            continue
+        lines += [
+            f"{title}:  мин {stats.low:,.2f}  макс {stats.high:,.2f}  ср {stats.avg:,.2f}",
+            stats.spark,
+        ]
+    return "\n".join(lines)
+
+
+async def _history_tick(context: ContextTypes.DEFAULT_TYPE):
+    # свежий тикер уже записан при обновлении — сами ходим на биржу, только если его давно не было
+    age = rate_cache.age
+    if age is None or age >= RATES_HISTORY_SAMPLE_SECONDS:
+        await rate_cache.refresh()
+
+
+def start_history_job(app: Application):
+    if app.job_queue is None or RATES_HISTORY_SAMPLE_SECONDS <= 0:
+        return
+    app.job_queue.run_repeating(
+        _history_tick,
+        interval=RATES_HISTORY_SAMPLE_SECONDS,
+        first=RATES_HISTORY_SAMPLE_SECONDS,
+        name="rates_history",
+    )
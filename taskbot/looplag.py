@@ -0,0 +1,165 @@
+"""Монитор задержки event loop: кто и где блокирует цикл синхронным кодом.
+
+Heartbeat-корутина раз в interval засыпает на interval и меряет, насколько позже
+срока она проснулась (это и есть lag: всё это время цикл был занят чужим
+синхронным кодом — db.*, Task.from_row, рендер). Сторожевой поток следит за тем же
+сроком снаружи: если цикл не вернулся к heartbeat дольше threshold, он снимает стек
+потока цикла прямо во время блокировки и запоминает хэндлер, который его держит.
+
+Перцентили lag за последнее окно и число блокировок по хэндлерам отдаются в /metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .config import LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD_MS
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+# обёртки вокруг хэндлеров — хэндлером считаем первый кадр приложения после них
+_WRAPPER_MODULES = frozenset({"updates.py", "metrics.py", "profiling.py", "looplag.py"})
+LAG_WINDOW = 600
+STALLS_KEPT = 20
+STACK_DEPTH = 25
+QUANTILES = (0.5, 0.9, 0.99)
+
+LOOP_LAG_SECONDS = registry.histogram(
+    "taskbot_loop_lag_seconds", "Event loop scheduling delay measured by the heartbeat.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS_TOTAL = registry.counter(
+    "taskbot_loop_stalls_total", "Event loop blocked longer than the threshold, by handler.", ("handler",)
+)
+
+
+@dataclass
+class Stall:
+    at: datetime
+    handler: str
+    stack: list[str]
+    # пока блокировка не кончилась — сколько прошло к моменту снимка, потом — итоговый lag
+    seconds: float
+    finished: bool = False
+
+
+@dataclass
+class LoopLagMonitor:
+    interval: float = LOOP_LAG_INTERVAL
+    threshold: float = LOOP_LAG_THRESHOLD_MS / 1000
+    roots: tuple[Path, ...] = (PACKAGE_DIR,)
+    samples: deque = field(default_factory=lambda: deque(maxlen=LAG_WINDOW))
+    stalls: deque = field(default_factory=lambda: deque(maxlen=STALLS_KEPT))
+
+    def __post_init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._loop_thread_id = 0
+        # срок, к которому heartbeat должен проснуться, и номер такта (для одного снимка на блокировку)
+        self._deadline = 0.0
+        self._beat = 0
+        self._captured_beat = -1
+        self._pending: Optional[Stall] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> bool:
+        """Вызывать из event loop; при LOOP_LAG_THRESHOLD_MS=0 монитор выключен."""
+        if self.running or self.threshold <= 0:
+            return False
+        self._loop_thread_id = threading.get_ident()
+        self._deadline = time.monotonic() + self.interval
+        self._stop_event.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat(), name="loop-lag-heartbeat")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        return True
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self._stop_event.set()
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    # ---------- сторона event loop ----------
+    async def _heartbeat(self) -> None:
+        while True:
+            self._deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._observe(max(time.monotonic() - self._deadline, 0.0))
+            self._beat += 1
+
+    def _observe(self, lag: float) -> None:
+        self.samples.append(lag)
+        LOOP_LAG_SECONDS.observe(lag)
+        stall, self._pending = self._pending, None
+        if stall is not None:
+            stall.seconds = lag
+            stall.finished = True
+            LOOP_STALLS_TOTAL.inc(stall.handler)
+            logger.warning(
+                "event loop blocked for %.0f ms by %s\n%s", lag * 1000, stall.handler, "".join(stall.stack)
+            )
+
+    # ---------- сторожевой поток ----------
+    def _watch(self) -> None:
+        step = min(self.interval, self.threshold) / 2
+        while not self._stop_event.wait(step):
+            overdue = time.monotonic() - self._deadline
+            if overdue < self.threshold or self._captured_beat == self._beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._captured_beat = self._beat
+            stall = Stall(datetime.now(), *self.describe(frame), seconds=overdue)
+            self._pending = stall
+            self.stalls.append(stall)
+
+    def describe(self, frame) -> tuple[str, list[str]]:
+        """(хэндлер, стек) для кадра: хэндлер — первый кадр приложения после обёрток."""
+        stack = traceback.extract_stack(frame)
+        handler = "unknown"
+        for fs in stack:
+            path = Path(fs.filename)
+            if path.name not in _WRAPPER_MODULES and any(path.is_relative_to(root) for root in self.roots):
+                handler = f"{path.stem}.{fs.name}"
+                break
+        return handler, traceback.format_list(stack[-STACK_DEPTH:])
+
+    # ---------- сводки ----------
+    def quantiles(self) -> dict[float, float]:
+        data = sorted(self.samples)
+        if not data:
+            return {}
+        return {q: data[min(int(q * len(data)), len(data) - 1)] for q in QUANTILES}
+
+
+loop_monitor = LoopLagMonitor()
+
+registry.collected(
+    "taskbot_loop_lag_quantile_seconds",
+    f"Event loop lag quantiles over the last {LAG_WINDOW} heartbeats.", ("quantile",),
+    lambda: [((str(q),), v) for q, v in loop_monitor.quantiles().items()],
+)
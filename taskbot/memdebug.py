@@ -0,0 +1,180 @@
+"""Интроспекция памяти процесса: RSS, джобы, runtime-реестры, кэши, крупнейшие аллокации.
+
+Снимок (MemorySnapshot) собирается по требованию владельца (/debug) и может быть
+сравнен с сохранённым ранее — так видно, что растёт: джобы JobQueue, состояние
+чатов, кэши или внутренности PTB/Python (по числу объектов каждого типа).
+Топ аллокаций — из tracemalloc, если он включён (/debug trace on или PYTHONTRACEMALLOC).
+"""
+from __future__ import annotations
+
+import asyncio
+import gc
+import resource
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from telegram.ext import Application
+
+TOP_N = 10
+TRACE_FRAMES = 5
+
+
+def rss_bytes() -> int:
+    """Текущий RSS из /proc (Linux, Raspberry Pi); иначе — пиковый из getrusage."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдаёт байты, Linux — килобайты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def job_counts(app: Application) -> Counter[str]:
+    """Джобы JobQueue по виду: имя до первого ":" (remind, repeat, ...) или целиком (delete_job, ...)."""
+    counts: Counter[str] = Counter()
+    if app.job_queue is not None:
+        for job in app.job_queue.jobs():
+            counts[(job.name or "unnamed").split(":", 1)[0]] += 1
+    return counts
+
+
+def cache_sizes(app: Application) -> dict[str, int]:
+    """Число записей во всех реестрах и кэшах процесса, которые могут расти."""
+    from . import db
+    from .alerts import alert_engine
+    from .chat_runtime import get_chat_runtime_registry
+    from .permissions import admin_cache
+    from .pending import pending_store
+    from .ui import _tasks_lines_cache
+
+    runtime = get_chat_runtime_registry(app).stats()
+    try:
+        tasks = len(asyncio.all_tasks())
+    except RuntimeError:
+        tasks = 0
+    return {
+        "chat_runtime": runtime["chats"],
+        "chat_runtime_locked": runtime["locked"],
+        "flash_pending": runtime["flash_pending"],
+        "render_cache": len(_tasks_lines_cache),
+        "admin_cache": len(admin_cache),
+        "pending_states": len(pending_store),
+        "pending_dirty": pending_store.dirty_count,
+        "query_stats": len(db.query_stats),
+        "price_alerts": len(alert_engine.index),
+        "ptb_chat_data": len(app.chat_data),
+        "ptb_user_data": len(app.user_data),
+        "asyncio_tasks": tasks,
+    }
+
+
+def object_counts() -> Counter[str]:
+    """Объекты под управлением gc по типам — десятки миллисекунд, только по запросу."""
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+@dataclass
+class MemorySnapshot:
+    taken_at: datetime
+    rss: int
+    jobs: Counter
+    caches: dict[str, int]
+    objects: Counter
+    traced: Optional[tracemalloc.Snapshot] = field(default=None, repr=False)
+    took: float = 0.0
+
+
+def take_snapshot(app: Application) -> MemorySnapshot:
+    started = time.perf_counter()
+    traced = None
+    if tracemalloc.is_tracing():
+        # свои аллокации tracemalloc в отчёт не пускаем
+        traced = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+        )
+    return MemorySnapshot(
+        taken_at=datetime.now(),
+        rss=rss_bytes(),
+        jobs=job_counts(app),
+        caches=cache_sizes(app),
+        objects=object_counts(),
+        traced=traced,
+        took=time.perf_counter() - started,
+    )
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f} MB"
+
+
+def _where(trace: tracemalloc.Traceback) -> str:
+    frame = trace[0]
+    return f"{Path(frame.filename).name}:{frame.lineno}"
+
+
+def start_tracing(frames: int = TRACE_FRAMES) -> bool:
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracing() -> bool:
+    if not tracemalloc.is_tracing():
+        return False
+    tracemalloc.stop()
+    return True
+
+
+def format_snapshot(snap: MemorySnapshot, top: int = TOP_N) -> str:
+    lines = [f"RSS {_mb(snap.rss)}  (снимок за {snap.took * 1000:.0f} ms)", "", "jobs:"]
+    lines += [f"  {kind:<22} {n:>7}" for kind, n in sorted(snap.jobs.items())] or ["  —"]
+    lines += ["", "caches:"]
+    lines += [f"  {name:<22} {n:>7}" for name, n in snap.caches.items()]
+    lines += ["", f"objects: {sum(snap.objects.values())}"]
+    lines += [f"  {name:<22} {n:>7}" for name, n in snap.objects.most_common(top)]
+    lines += ["", "tracemalloc:"]
+    if snap.traced is None:
+        lines.append("  выключен (/debug trace on)")
+    else:
+        for stat in snap.traced.statistics("lineno")[:top]:
+            lines.append(f"  {_where(stat.traceback):<30} {_mb(stat.size):>9} {stat.count:>7}")
+    return "\n".join(lines)
+
+
+def _counter_diff(old: dict[str, int], new: dict[str, int]) -> list[tuple[str, int, int]]:
+    keys = set(old) | set(new)
+    return sorted(
+        ((k, old.get(k, 0), new.get(k, 0)) for k in keys if old.get(k, 0) != new.get(k, 0)),
+        key=lambda item: -abs(item[2] - item[1]),
+    )
+
+
+def format_diff(old: MemorySnapshot, new: MemorySnapshot, top: int = TOP_N) -> str:
+    seconds = (new.taken_at - old.taken_at).total_seconds()
+    lines = [f"за {seconds:.0f} с: RSS {_mb(old.rss)} → {_mb(new.rss)} ({(new.rss - old.rss) / 1024 / 1024:+.1f} MB)"]
+    for title, before, after in (
+        ("jobs", old.jobs, new.jobs),
+        ("caches", old.caches, new.caches),
+        ("objects", old.objects, new.objects),
+    ):
+        changes = _counter_diff(before, after)[:top]
+        lines += ["", f"{title}:"]
+        lines += [f"  {k:<22} {a:>7} → {b:<7} ({b - a:+d})" for k, a, b in changes] or ["  без изменений"]
+    lines += ["", "tracemalloc:"]
+    if old.traced is None or new.traced is None:
+        lines.append("  нужны оба снимка с включённым tracemalloc")
+    else:
+        for stat in new.traced.compare_to(old.traced, "lineno")[:top]:
+            lines.append(f"  {_where(stat.traceback):<30} {stat.size_diff / 1024:>+9.1f} KiB {stat.count_diff:>+7d}")
+    return "\n".join(lines)
@@ -0,0 +1,379 @@
+"""Метрики процесса в формате Prometheus и опциональный локальный HTTP-эндпоинт /metrics.
+
+На горячем пути — только инкремент счётчика в dict и bisect по границам бакетов;
+всё, что можно посчитать в момент запроса (джобы, размеры реестров), считается
+коллекторами при отдаче /metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from telegram.request import BaseRequest, RequestData
+
+from .config import METRICS_HOST, METRICS_PORT
+from .router import LATENCY_BUCKETS, LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(self.values.items())
+        ]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+        self.series: dict[LabelValues, LatencyHistogram] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        hist = self.series.get(labels)
+        if hist is None:
+            hist = self.series[labels] = LatencyHistogram(buckets=self.buckets)
+        hist.observe(value)
+
+    def samples(self) -> list[str]:
+        return render_histogram_series(self.name, self.labelnames, sorted(self.series.items()))
+
+
+def render_histogram_series(
+    name: str,
+    labelnames: tuple[str, ...],
+    series: Iterable[tuple[LabelValues, LatencyHistogram]],
+) -> list[str]:
+    lines = []
+    for labels, hist in series:
+        for bound, acc in hist.cumulative():
+            le = 'le="%s"' % _number(bound)
+            lines.append(f"{name}_bucket{_labels(labelnames, labels, le)} {acc}")
+        lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(hist.total)}")
+        lines.append(f"{name}_count{_labels(labelnames, labels)} {hist.count}")
+    return lines
+
+
+class CollectedMetric(Metric):
+    """Метрика, значения которой считаются при отдаче /metrics (gauge, чужие гистограммы)."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...],
+        collect: Callable[[], Iterable[tuple[LabelValues, Any]]],
+        type_name: str = "gauge",
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.type_name = type_name
+        self._collect = collect
+
+    def samples(self) -> list[str]:
+        items = sorted(self._collect())
+        if self.type_name == "histogram":
+            return render_histogram_series(self.name, self.labelnames, items)
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def collected(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...],
+        collect: Callable[[], Iterable[tuple[LabelValues, Any]]],
+        type_name: str = "gauge",
+    ) -> CollectedMetric:
+        self.unregister(name)
+        return self.register(CollectedMetric(name, help_text, labelnames, collect, type_name))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception:
+                logger.warning("metrics collect failed name=%s", metric.name, exc_info=True)
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+UPDATES_TOTAL = registry.counter("taskbot_updates_total", "Handled updates by type.", ("type",))
+UPDATE_SECONDS = registry.histogram(
+    "taskbot_update_duration_seconds", "Time to process one update (all handlers) by type.", ("type",)
+)
+HANDLER_SECONDS = registry.histogram(
+    "taskbot_handler_duration_seconds", "Handler callback latency.", ("handler",)
+)
+TELEGRAM_CALLS = registry.counter(
+    "taskbot_telegram_api_calls_total", "Bot API requests by method and outcome (HTTP status or error).",
+    ("method", "outcome"),
+)
+TELEGRAM_SECONDS = registry.histogram(
+    "taskbot_telegram_api_duration_seconds", "Bot API request latency by method.", ("method",)
+)
+DB_SECONDS = registry.histogram(
+    "taskbot_db_query_duration_seconds", "Time spent in db.py functions.", ("function",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+RECURRING_TICK_SECONDS = registry.histogram(
+    "taskbot_recurring_tick_duration_seconds", "Duration of one recurring reminders tick."
+)
+RATE_FETCH_SECONDS = registry.histogram(
+    "taskbot_rate_fetch_duration_seconds", "Exchange rate fetch latency by outcome.", ("outcome",)
+)
+
+
+def update_type(update: object) -> str:
+    """Тип апдейта для метки: message / callback_query / chat_member / ..."""
+    for attr in ("callback_query", "message", "edited_message", "chat_member", "my_chat_member"):
+        if getattr(update, attr, None) is not None:
+            return attr
+    return "other" if update is not None else "none"
+
+
+def timed_handler(callback: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Обёртка над хэндлером PTB: latency в HANDLER_SECONDS с меткой имени функции."""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+class DelegatingRequest(BaseRequest):
+    """BaseRequest, который всё передаёт во внутренний; основа для обёрток HTTP-слоя."""
+
+    def __init__(self, inner: BaseRequest):
+        self._inner = inner
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return self._inner.read_timeout
+
+    async def initialize(self) -> None:
+        await self._inner.initialize()
+
+    async def shutdown(self) -> None:
+        await self._inner.shutdown()
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        return await self._inner.do_request(
+            url,
+            method,
+            request_data=request_data,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            connect_timeout=connect_timeout,
+            pool_timeout=pool_timeout,
+        )
+
+
+class InstrumentedRequest(DelegatingRequest):
+    """Обёртка над HTTP-слоем Bot API: считает вызовы по методу и исходу (200, 429, 400, error)."""
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            code, payload = await super().do_request(
+                url,
+                method,
+                request_data=request_data,
+                read_timeout=read_timeout,
+                write_timeout=write_timeout,
+                connect_timeout=connect_timeout,
+                pool_timeout=pool_timeout,
+            )
+            outcome = str(code)
+            return code, payload
+        finally:
+            TELEGRAM_CALLS.inc(api_method, outcome)
+            TELEGRAM_SECONDS.observe(time.perf_counter() - started, api_method)
+
+
+def register_app_collectors(app) -> None:
+    """Метрики, которые читаются из состояния приложения при каждом /metrics."""
+    from .chat_runtime import get_chat_runtime_registry
+    from .handlers import callback_router
+    from .memdebug import cache_sizes, job_counts, rss_bytes
+    from .pending import pending_store
+
+    registry.collected(
+        "taskbot_scheduled_jobs", "Scheduled JobQueue jobs by kind (remind, repeat, ...).", ("kind",),
+        lambda: [((kind,), n) for kind, n in job_counts(app).items()],
+    )
+    registry.collected(
+        "taskbot_chat_runtime", "Per-chat runtime registry state.", ("state",),
+        lambda: [((k,), v) for k, v in get_chat_runtime_registry(app).stats().items()],
+    )
+    registry.collected(
+        "taskbot_pending_states", "Conversation states kept in memory.", (),
+        lambda: [((), len(pending_store))],
+    )
+    registry.collected(
+        "taskbot_process_resident_memory_bytes", "Resident set size of the bot process.", (),
+        lambda: [((), rss_bytes())],
+    )
+    registry.collected(
+        "taskbot_cache_entries", "Entries in in-process registries and caches.", ("cache",),
+        lambda: [((name,), n) for name, n in cache_sizes(app).items()],
+    )
+    registry.collected(
+        "taskbot_callback_route_duration_seconds", "Callback route latency.", ("route",),
+        lambda: [((route.key,), route.latency) for route in callback_router.routes()],
+        type_name="histogram",
+    )
+
+
+# ---------- HTTP endpoint ----------
+async def _serve_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # заголовки читаем до пустой строки и игнорируем
+        while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+            pass
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+            status, body = "200 OK", registry.render().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            status, body, content_type = "404 Not Found", b"not found\n", "text/plain"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+    except Exception:
+        logger.debug("metrics request failed", exc_info=True)
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(app, host: str = METRICS_HOST, port: int = METRICS_PORT) -> Optional[asyncio.AbstractServer]:
+    """Поднимает /metrics, если задан порт; сервер кладётся в bot_data["metrics_server"]."""
+    if not port:
+        return None
+    register_app_collectors(app)
+    server = await asyncio.start_server(_serve_client, host, port)
+    app.bot_data["metrics_server"] = server
+    logger.info("Metrics endpoint on http://%s:%s/metrics", host, port)
+    return server
+
+
+async def stop_metrics_server(app) -> None:
+    server = app.bot_data.pop("metrics_server", None)
+    if server is not None:
+        server.close()
+        await server.wait_closed()
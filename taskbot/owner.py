@@ -0,0 +1,179 @@
+"""Служебные команды владельца бота (BOT_OWNER_IDS): диагностика под реальной нагрузкой."""
+from __future__ import annotations
+
+import functools
+import html
+import logging
+from typing import Any, Awaitable, Callable
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from .config import OWNER_IDS, PROFILE_SECONDS
+from . import db, memdebug
+from .looplag import LoopLagMonitor, loop_monitor
+from .profiling import MODES, ProfileResult, profiler
+
+logger = logging.getLogger(__name__)
+
+DBTOP_DEFAULT_N = 10
+DBTOP_KEYS = ("total", "max", "calls", "avg")
+# Telegram не примет сообщение длиннее 4096 — длинные отчёты в <pre> обрезаем
+REPLY_PRE_MAX = 3500
+
+
+def is_owner(user_id: int | None) -> bool:
+    return user_id is not None and user_id in OWNER_IDS
+
+
+def owner_only(callback: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Команду молча игнорируем для всех, кроме владельцев: её существование не светим."""
+
+    @functools.wraps(callback)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if not is_owner(user.id if user else None):
+            return None
+        return await callback(update, context)
+
+    return wrapper
+
+
+def format_dbtop(stats: list[db.QueryStats], key: str) -> str:
+    lines = [f"{'function':<28} {'calls':>7} {'total ms':>10} {'avg ms':>8} {'max ms':>8} {'rows':>8}"]
+    for s in stats:
+        lines.append(
+            f"{s.name[:28]:<28} {s.calls:>7} {s.total * 1000:>10.1f} {s.avg * 1000:>8.2f} "
+            f"{s.max * 1000:>8.1f} {s.rows:>8}"
+        )
+    session = db.session_stats
+    lines.append("")
+    lines.append(f"sessions: {session.calls}, avg {session.avg * 1000:.2f} ms, max {session.max * 1000:.1f} ms")
+    return f"<b>🗄 DB: топ-{len(stats)} по {key}</b>\n<pre>{html.escape(chr(10).join(lines))}</pre>"
+
+
+@owner_only
+async def cmd_dbtop(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/dbtop [N] [total|max|calls|avg] — самые горячие функции db.py; /dbtop reset — обнулить."""
+    args = context.args or []
+    if args and args[0] == "reset":
+        db.reset_query_stats()
+        await update.message.reply_text("🗄 Статистика запросов обнулена.")
+        return
+
+    n = DBTOP_DEFAULT_N
+    key = "total"
+    for arg in args:
+        if arg.isdigit():
+            n = max(1, min(int(arg), 50))
+        elif arg in DBTOP_KEYS:
+            key = arg
+    stats = db.top_queries(n, key=key)
+    if not stats:
+        await update.message.reply_text("🗄 Запросов ещё не было.")
+        return
+    await update.message.reply_text(format_dbtop(stats, key), parse_mode="HTML")
+
+
+def format_profile_result(result: ProfileResult) -> str:
+    lines = [f"{name:<20} calls={s.calls:<6} {s.seconds * 1000:.1f} ms" for name, s in sorted(result.targets.items())]
+    body = "\n".join(lines or ["(цели не вызывались)"]) + "\n\n" + result.summary
+    return (
+        f"<b>⏱ Профиль ({result.mode}, {result.seconds:.0f} с) готов</b>\n"
+        f"<code>{html.escape(str(result.path))}</code>\n"
+        f"<pre>{html.escape(body[:REPLY_PRE_MAX])}</pre>"
+    )
+
+
+@owner_only
+async def cmd_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/profile [секунды] [cprofile|sample] — записать профиль хэндлеров и джобов; /profile stop — завершить досрочно."""
+    args = context.args or []
+    if args and args[0] == "stop":
+        if profiler.stop() is None:
+            await update.message.reply_text("⏱ Профилирование не запущено.")
+        return
+
+    seconds = PROFILE_SECONDS
+    mode = "cprofile"
+    for arg in args:
+        if arg.isdigit():
+            seconds = float(arg)
+        elif arg in MODES:
+            mode = arg
+
+    chat_id = update.effective_chat.id
+    app = context.application
+
+    def on_done(result: ProfileResult) -> None:
+        app.create_task(app.bot.send_message(chat_id, format_profile_result(result), parse_mode="HTML"))
+
+    try:
+        session = profiler.start(seconds, mode, on_done=on_done)
+    except RuntimeError:
+        await update.message.reply_text("⏱ Профилирование уже идёт. /profile stop — завершить.")
+        return
+    await update.message.reply_text(f"⏱ Профилирование ({mode}) на {session.seconds:.0f} с запущено.")
+
+
+def format_looplag(monitor: LoopLagMonitor) -> str:
+    quantiles = monitor.quantiles()
+    if not monitor.running:
+        head = "монитор выключен (LOOP_LAG_THRESHOLD_MS=0)"
+    elif quantiles:
+        head = "  ".join(f"p{round(q * 100)} {v * 1000:.1f} ms" for q, v in quantiles.items())
+    else:
+        head = "замеров ещё нет"
+    lines = [head, f"порог {monitor.threshold * 1000:.0f} ms", ""]
+    for stall in reversed(monitor.stalls):
+        mark = "" if stall.finished else "≥"
+        lines.append(f"{stall.at:%d.%m %H:%M:%S}  {mark}{stall.seconds * 1000:.0f} ms  {stall.handler}")
+    if not monitor.stalls:
+        lines.append("блокировок не было")
+    text = "\n".join(lines)
+    if monitor.stalls:
+        # стек последней блокировки — самое полезное, но длинное: только хвост
+        text += "\n\n" + "".join(monitor.stalls[-1].stack)[-REPLY_PRE_MAX // 2:]
+    return f"<b>🐢 Задержка event loop</b>\n<pre>{html.escape(text[:REPLY_PRE_MAX])}</pre>"
+
+
+@owner_only
+async def cmd_looplag(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/looplag — перцентили задержки event loop и последние блокировки со стеком."""
+    await update.message.reply_text(format_looplag(loop_monitor), parse_mode="HTML")
+
+
+@owner_only
+async def cmd_debug(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/debug — память процесса; /debug snap — запомнить снимок; /debug diff — сравнить с ним;
+    /debug trace on|off — tracemalloc (заметно замедляет бота, включать на время)."""
+    args = context.args or []
+    action = args[0] if args else ""
+    bot_data = context.application.bot_data
+
+    if action == "trace":
+        if args[1:] == ["on"]:
+            changed = memdebug.start_tracing()
+            text = "tracemalloc включён" if changed else "tracemalloc уже включён"
+        else:
+            changed = memdebug.stop_tracing()
+            text = "tracemalloc выключен" if changed else "tracemalloc не был включён"
+        await update.message.reply_text(f"🧠 {text}.")
+        return
+
+    snap = memdebug.take_snapshot(context.application)
+    if action == "snap":
+        bot_data["memdebug_snapshot"] = snap
+        await update.message.reply_text(
+            f"🧠 Снимок сохранён (RSS {snap.rss / 1024 / 1024:.1f} MB). /debug diff — сравнить."
+        )
+        return
+    if action == "diff":
+        base = bot_data.get("memdebug_snapshot")
+        if base is None:
+            await update.message.reply_text("🧠 Сначала сохраните снимок: /debug snap")
+            return
+        title, body = "🧠 Память: изменения", memdebug.format_diff(base, snap)
+    else:
+        title, body = "🧠 Память", memdebug.format_snapshot(snap)
+    await update.message.reply_text(f"<b>{title}</b>\n<pre>{html.escape(body[:REPLY_PRE_MAX])}</pre>", parse_mode="HTML")
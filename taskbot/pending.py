@@ -0,0 +1,204 @@
+"""Состояние диалога (ожидание ввода) в памяти с TTL и отложенной записью в БД."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from telegram import Message
+from telegram.ext import Application, ContextTypes, filters
+
+from .config import TZ, PENDING_TTL_SECONDS, PENDING_FLUSH_SECONDS
+from . import db
+
+logger = logging.getLogger(__name__)
+
+PendingKey = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class PendingState:
+    chat_id: int
+    user_id: int
+    action: str
+    task_id: Optional[int]
+    meta: Optional[str]
+    created_at: datetime
+
+    def as_db_row(self) -> tuple:
+        return (self.chat_id, self.user_id, self.action, self.task_id, self.meta, self.created_at.isoformat())
+
+
+class PendingStore:
+    """Pending-состояния по (chat_id, user_id).
+
+    Чтение и запись идут в память; изменения копятся в dirty и раз в
+    PENDING_FLUSH_SECONDS пишутся в таблицу pending одной транзакцией, чтобы
+    состояние пережило перезапуск. По ключу в dirty хранится только последнее
+    изменение, а очистка отсутствующего состояния ничего не пишет.
+    Состояние старше ttl (по created_at) считается истёкшим.
+    """
+
+    def __init__(self, ttl: float = PENDING_TTL_SECONDS):
+        self._ttl = timedelta(seconds=ttl)
+        self._states: dict[PendingKey, PendingState] = {}
+        # None — строку нужно удалить из БД
+        self._dirty: dict[PendingKey, Optional[PendingState]] = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _expired(self, state: PendingState, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.now(TZ)) - state.created_at > self._ttl
+
+    def load(self) -> int:
+        """Подтягивает сохранённые состояния из БД (при старте); истёкшие удаляет."""
+        self._states.clear()
+        self._dirty.clear()
+        now = datetime.now(TZ)
+        for row in db.pending_fetch_all():
+            key = (int(row["chat_id"]), int(row["user_id"]))
+            try:
+                created_at = datetime.fromisoformat(row["created_at"])
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=TZ)
+            except Exception:
+                logger.warning("pending load: invalid created_at chat_id=%s user_id=%s", *key, exc_info=True)
+                self._dirty[key] = None
+                continue
+            state = PendingState(key[0], key[1], row["action"], row["task_id"], row["meta"], created_at)
+            if self._expired(state, now):
+                self._dirty[key] = None
+                continue
+            self._states[key] = state
+        return len(self._states)
+
+    def get(self, chat_id: int, user_id: int) -> Optional[PendingState]:
+        key = (chat_id, user_id)
+        state = self._states.get(key)
+        if state is None:
+            return None
+        if self._expired(state):
+            del self._states[key]
+            self._dirty[key] = None
+            return None
+        return state
+
+    def has(self, chat_id: int, user_id: int) -> bool:
+        return self.get(chat_id, user_id) is not None
+
+    def set(
+        self,
+        chat_id: int,
+        user_id: int,
+        action: str,
+        task_id: Optional[int] = None,
+        meta: Optional[str] = None,
+    ) -> None:
+        key = (chat_id, user_id)
+        # и повторная запись того же состояния идёт в dirty: новый created_at продлевает
+        # TTL и после перезапуска; записи одного ключа между flush сливаются в одну
+        state = PendingState(chat_id, user_id, action, task_id, meta, datetime.now(TZ))
+        self._states[key] = state
+        self._dirty[key] = state
+
+    def clear(self, chat_id: int, user_id: int) -> None:
+        key = (chat_id, user_id)
+        if self._states.pop(key, None) is None:
+            return
+        self._dirty[key] = None
+
+    def sweep(self) -> int:
+        """Удаляет истёкшие состояния (для фоновой джобы)."""
+        now = datetime.now(TZ)
+        expired = [key for key, state in self._states.items() if self._expired(state, now)]
+        for key in expired:
+            del self._states[key]
+            self._dirty[key] = None
+        return len(expired)
+
+    def take_dirty(self) -> tuple[list[tuple], list[PendingKey]]:
+        dirty, self._dirty = self._dirty, {}
+        upserts = [state.as_db_row() for state in dirty.values() if state is not None]
+        deletes = [key for key, state in dirty.items() if state is None]
+        return upserts, deletes
+
+    def restore_dirty(self, upserts: list[tuple], deletes: list[PendingKey]) -> None:
+        """Возвращает не записанные изменения, не затирая более свежие."""
+        for key in deletes:
+            self._dirty.setdefault(key, None)
+        for row in upserts:
+            key = (row[0], row[1])
+            if key not in self._dirty and key in self._states:
+                self._dirty[key] = self._states[key]
+
+    def flush(self) -> int:
+        upserts, deletes = self.take_dirty()
+        if not upserts and not deletes:
+            return 0
+        try:
+            db.pending_apply(upserts, deletes)
+        except Exception:
+            self.restore_dirty(upserts, deletes)
+            raise
+        return len(upserts) + len(deletes)
+
+    async def flush_async(self) -> int:
+        upserts, deletes = self.take_dirty()
+        if not upserts and not deletes:
+            return 0
+        try:
+            await asyncio.to_thread(db.pending_apply, upserts, deletes)
+        except Exception:
+            self.restore_dirty(upserts, deletes)
+            raise
+        return len(upserts) + len(deletes)
+
+
+pending_store = PendingStore()
+
+
+class HasPendingInput(filters.MessageFilter):
+    """Пропускает только сообщения тех, кто сейчас вводит данные для бота.
+
+    Проверка — поиск (chat_id, user_id) в памяти PendingStore, поэтому обычная
+    переписка в группе отбрасывается до хэндлеров и без обращения к БД.
+    """
+
+    def __init__(self, store: PendingStore = pending_store):
+        super().__init__(name="HasPendingInput")
+        self._store = store
+
+    def filter(self, message: Message) -> bool:
+        user = message.from_user
+        if user is None or message.chat is None:
+            return False
+        return self._store.has(message.chat.id, user.id)
+
+
+has_pending_input = HasPendingInput()
+
+
+async def _pending_flush_job(context: ContextTypes.DEFAULT_TYPE):
+    pending_store.sweep()
+    try:
+        await pending_store.flush_async()
+    except Exception:
+        logger.warning("pending flush failed, will retry", exc_info=True)
+
+
+def start_pending_flush_job(app: Application):
+    if app.job_queue is None:
+        return
+    app.job_queue.run_repeating(
+        _pending_flush_job,
+        interval=PENDING_FLUSH_SECONDS,
+        first=PENDING_FLUSH_SECONDS,
+        name="pending_flush",
+    )
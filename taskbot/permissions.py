@@ -1,20 +1,100 @@
 import logging
+import time
+from collections import OrderedDict
+from typing import Optional
 
 from telegram import Chat
 from telegram.ext import ContextTypes
 
+from .config import ADMIN_CACHE_TTL_SECONDS, ADMIN_CACHE_MAX_CHATS
+
 logger = logging.getLogger(__name__)
 
+ADMIN_STATUSES = ("administrator", "creator")
+
+
+class AdminCache:
+    """Множества администраторов по чатам с TTL.
+
+    Заполняется целиком из get_chat_administrators и точечно обновляется
+    событиями ChatMemberHandler, так что обычная проверка прав идёт из памяти.
+    """
+
+    def __init__(self, ttl: float = ADMIN_CACHE_TTL_SECONDS, max_chats: int = ADMIN_CACHE_MAX_CHATS):
+        self._ttl = ttl
+        self._max_chats = max_chats
+        self._chats: OrderedDict[int, tuple[float, set[int]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._chats)
+
+    def get(self, chat_id: int) -> Optional[set[int]]:
+        entry = self._chats.get(chat_id)
+        if entry is None:
+            return None
+        loaded_at, admins = entry
+        if time.monotonic() - loaded_at > self._ttl:
+            del self._chats[chat_id]
+            return None
+        self._chats.move_to_end(chat_id)
+        return admins
+
+    def put(self, chat_id: int, admin_ids) -> None:
+        self._chats[chat_id] = (time.monotonic(), set(admin_ids))
+        self._chats.move_to_end(chat_id)
+        while len(self._chats) > self._max_chats:
+            self._chats.popitem(last=False)
+
+    def apply_status(self, chat_id: int, user_id: int, status: str) -> None:
+        """Обновляет закэшированный набор по событию смены статуса участника."""
+        entry = self._chats.get(chat_id)
+        if entry is None:
+            return
+        admins = entry[1]
+        if status in ADMIN_STATUSES:
+            admins.add(user_id)
+        else:
+            admins.discard(user_id)
+
+    def invalidate(self, chat_id: int) -> None:
+        self._chats.pop(chat_id, None)
+
+    def clear(self) -> None:
+        self._chats.clear()
+
+
+admin_cache = AdminCache()
+
 
 def is_group(chat: Chat) -> bool:
     t = (chat.type or "").lower()
     return t in ("group", "supergroup")
 
 
+async def _load_admins(context: ContextTypes.DEFAULT_TYPE, chat_id: int) -> Optional[set[int]]:
+    try:
+        members = await context.bot.get_chat_administrators(chat_id)
+    except Exception:
+        logger.debug("get_chat_administrators failed chat_id=%s", chat_id, exc_info=True)
+        return None
+    if not isinstance(members, (list, tuple)):
+        return None
+    admins = {m.user.id for m in members if m.status in ADMIN_STATUSES}
+    admin_cache.put(chat_id, admins)
+    return admins
+
+
 async def is_admin(context: ContextTypes.DEFAULT_TYPE, chat_id: int, user_id: int) -> bool:
+    admins = admin_cache.get(chat_id)
+    if admins is None:
+        admins = await _load_admins(context, chat_id)
+    if admins is not None:
+        return user_id in admins
+
+    # список админов недоступен — спрашиваем про конкретного участника
     try:
         member = await context.bot.get_chat_member(chat_id, user_id)
-        return member.status in ("administrator", "creator")
+        return member.status in ADMIN_STATUSES
     except Exception:
         logger.warning("is_admin failed chat_id=%s user_id=%s", chat_id, user_id, exc_info=True)
         return False
@@ -43,4 +123,4 @@ async def can_action(
             return True
         return await is_admin(context, chat.id, actor_id)
 
-    return False
\ No newline at end of file
+    return False
@@ -0,0 +1,251 @@
+"""Профилирование по требованию: ограниченная по времени запись cProfile или сэмплов стека.
+
+Запускается сигналом (PROFILE_ON_SIGNAL=1, SIGUSR1) или командой владельца /profile.
+Пишется только то время, когда выполняется хотя бы одна функция, помеченная
+@profiled (on_panel_button, on_text, reminder_job, _recurring_tick). По окончании
+окна результат сохраняется в PROFILE_DIR и профилирование выключается само:
+
+- cprofile — файл .pstats (python -m pstats, snakeviz);
+- sample — файл .folded (свёрнутые стеки для flamegraph.pl / speedscope).
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import io
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+from .config import (
+    PROFILE_DIR, PROFILE_SECONDS, PROFILE_MAX_SECONDS, PROFILE_ON_SIGNAL, PROFILE_SAMPLE_INTERVAL,
+)
+
+if TYPE_CHECKING:
+    import cProfile
+
+logger = logging.getLogger(__name__)
+
+MODES = ("cprofile", "sample")
+SUMMARY_LINES = 15
+
+
+@dataclass
+class TargetStats:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ProfileResult:
+    mode: str
+    seconds: float
+    path: Path
+    targets: dict[str, TargetStats]
+    summary: str
+
+
+class _StackSampler(threading.Thread):
+    """Раз в interval снимает стек потока event loop, пока активна хотя бы одна цель."""
+
+    def __init__(self, session: "ProfileSession", thread_id: int, interval: float):
+        super().__init__(name="profile-sampler", daemon=True)
+        self._session = session
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.stacks: Counter[str] = Counter()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            if self._session.depth <= 0:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=1)
+
+
+@dataclass
+class ProfileSession:
+    mode: str
+    seconds: float
+    out_dir: Path
+    on_done: Optional[Callable[[ProfileResult], Any]] = None
+    depth: int = 0
+    targets: dict[str, TargetStats] = field(default_factory=dict)
+    started_at: datetime = field(default_factory=datetime.now)
+
+    def __post_init__(self):
+        self._profile: Optional[cProfile.Profile] = None
+        if self.mode == "cprofile":
+            # cProfile/pstats грузим только при записи: модуль импортируется на старте ради @profiled
+            import cProfile
+
+            self._profile = cProfile.Profile()
+        self._sampler: Optional[_StackSampler] = None
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def begin(self) -> None:
+        if self.mode == "sample":
+            self._sampler = _StackSampler(self, threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+            self._sampler.start()
+
+    def enter(self, name: str) -> float:
+        # cProfile включён, пока работает хотя бы одна цель (вложенные вызовы не перезапускают его)
+        self.depth += 1
+        if self.depth == 1 and self._profile is not None:
+            self._profile.enable()
+        return time.perf_counter()
+
+    def exit(self, name: str, started: float) -> None:
+        stats = self.targets.setdefault(name, TargetStats())
+        stats.calls += 1
+        stats.seconds += time.perf_counter() - started
+        self.depth -= 1
+        if self.depth == 0 and self._profile is not None:
+            self._profile.disable()
+
+    def finish(self) -> ProfileResult:
+        if self._handle is not None:
+            self._handle.cancel()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S")
+        if self._profile is not None:
+            if self.depth > 0:
+                self._profile.disable()
+            path = self.out_dir / f"profile-{stamp}.pstats"
+            self._profile.dump_stats(str(path))
+            summary = _pstats_summary(self._profile)
+        else:
+            stacks = self._sampler.stacks if self._sampler is not None else Counter()
+            if self._sampler is not None:
+                self._sampler.stop()
+            path = self.out_dir / f"profile-{stamp}.folded"
+            path.write_text("".join(f"{stack} {n}\n" for stack, n in stacks.most_common()), encoding="utf-8")
+            summary = _folded_summary(stacks)
+        return ProfileResult(self.mode, self.seconds, path, dict(self.targets), summary)
+
+
+def _pstats_summary(profile: cProfile.Profile) -> str:
+    import pstats
+
+    profile.create_stats()
+    if not profile.stats:
+        # ни одна цель не вызывалась — pstats.Stats на пустом профиле падает
+        return "no calls"
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).strip_dirs().sort_stats("cumulative").print_stats(SUMMARY_LINES)
+    # шапку pstats (число вызовов, «Ordered by») оставляем, пустые строки убираем
+    return "\n".join(line for line in out.getvalue().splitlines() if line.strip())
+
+
+def _folded_summary(stacks: Counter) -> str:
+    total = sum(stacks.values())
+    if not total:
+        return "no samples"
+    leaves: Counter[str] = Counter()
+    for stack, n in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += n
+    lines = [f"{total} samples, top frames:"]
+    lines += [f"{n * 100 / total:5.1f}%  {frame}" for frame, n in leaves.most_common(SUMMARY_LINES)]
+    return "\n".join(lines)
+
+
+class Profiler:
+    """Не больше одной записи за раз; по истечении окна запись завершается сама."""
+
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+
+    @property
+    def active(self) -> bool:
+        return self.session is not None
+
+    def start(
+        self,
+        seconds: float = PROFILE_SECONDS,
+        mode: str = "cprofile",
+        out_dir: Optional[Path] = None,
+        on_done: Optional[Callable[[ProfileResult], Any]] = None,
+    ) -> ProfileSession:
+        """Вызывать из event loop. RuntimeError — если запись уже идёт."""
+        if self.session is not None:
+            raise RuntimeError("profiling is already running")
+        if mode not in MODES:
+            raise ValueError(f"unknown profiling mode: {mode}")
+        seconds = min(max(seconds, 1.0), PROFILE_MAX_SECONDS)
+        session = ProfileSession(mode=mode, seconds=seconds, out_dir=Path(out_dir or PROFILE_DIR), on_done=on_done)
+        session.begin()
+        session._handle = asyncio.get_running_loop().call_later(seconds, self.stop)
+        self.session = session
+        logger.warning("profiling started: mode=%s seconds=%.0f", mode, seconds)
+        return session
+
+    def stop(self) -> Optional[ProfileResult]:
+        session, self.session = self.session, None
+        if session is None:
+            return None
+        result = session.finish()
+        logger.warning("profiling finished: %s\n%s", result.path, result.summary)
+        if session.on_done is not None:
+            try:
+                session.on_done(result)
+            except Exception:
+                logger.warning("profiling on_done failed", exc_info=True)
+        return result
+
+
+profiler = Profiler()
+
+
+def profiled(fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Отмечает корутину как цель профилирования; без активной записи — одна проверка атрибута."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        session = profiler.session
+        if session is None:
+            return await fn(*args, **kwargs)
+        started = session.enter(name)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            session.exit(name, started)
+
+    return wrapper
+
+
+def install_signal_handler(loop: Optional[asyncio.AbstractEventLoop] = None) -> bool:
+    """SIGUSR1 запускает запись cProfile на PROFILE_SECONDS (если PROFILE_ON_SIGNAL=1)."""
+    if not PROFILE_ON_SIGNAL or not hasattr(signal, "SIGUSR1"):
+        return False
+    loop = loop or asyncio.get_running_loop()
+
+    def on_signal():
+        try:
+            profiler.start()
+        except RuntimeError:
+            logger.warning("SIGUSR1 ignored: profiling is already running")
+
+    loop.add_signal_handler(signal.SIGUSR1, on_signal)
+    logger.info("Profiling on SIGUSR1 enabled (pid %s)", os.getpid())
+    return True
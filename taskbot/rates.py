@@ -1,11 +1,36 @@
-"""Получение курсов с биржи Bitkub через публичный API."""
+"""Получение курсов с биржи Bitkub через публичный API.
+
+Все запросы идут через один httpx.AsyncClient на процесс: соединение с биржей
+живёт в пуле (keep-alive) и переиспользуется между нажатиями RATES и повторами,
+поэтому DNS, TCP и TLS оплачиваются один раз. Клиент создаётся при первом запросе
+(HTTP/2 — если установлен пакет h2) и закрывается при остановке бота.
+
+Тикер биржи (все рынки) скачивается одним запросом и разбирается в dict по символу.
+Поверх запросов — RateCache: свежий тикер (моложе RATES_CACHE_TTL_SECONDS) отдаётся
+из памяти, одновременные промахи ждут один общий запрос, а если обновление
+не успело или не удалось — показывается прежнее значение с его возрастом. Пока
+курсы смотрят, джоба rates_refresh обновляет тикер заранее, раз в RATES_REFRESH_SECONDS.
+"""
 from __future__ import annotations
 
 import asyncio
+import importlib.util
 import logging
-from typing import Optional
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
 
 import httpx
+from telegram.ext import Application, ContextTypes
+
+from .config import (
+    RATES_CACHE_TTL_SECONDS,
+    RATES_EXTRA_SYMBOLS,
+    RATES_REFRESH_IDLE_SECONDS,
+    RATES_REFRESH_SECONDS,
+    RATES_STALE_WAIT_SECONDS,
+)
+from .metrics import RATE_FETCH_SECONDS, registry
 
 logger = logging.getLogger(__name__)
 
@@ -13,41 +38,296 @@ _BITKUB_V3_TICKER_URL = "https://api.bitkub.com/api/v3/market/ticker"
 _TIMEOUT = 8.0
 _RETRY_ATTEMPTS = 3
 _RETRY_BACKOFF = 1.5  # секунды между попытками
+# пул соединений к бирже: хост один, держим несколько соединений на случай одновременных нажатий
+_POOL_MAX_CONNECTIONS = 10
+_POOL_MAX_KEEPALIVE = 4
+_POOL_KEEPALIVE_EXPIRY = 60.0
 
+RATES_HTTP_REQUESTS = registry.counter(
+    "taskbot_rates_http_requests_total", "Requests to the exchange API by outcome (HTTP status or error).",
+    ("outcome",),
+)
+RATES_HTTP_CONNECTIONS = registry.counter(
+    "taskbot_rates_http_connections_total",
+    "Connection setups to the exchange API: tcp — new connection, tls — handshake.", ("stage",),
+)
+RATES_CACHE = registry.counter(
+    "taskbot_rates_cache_total",
+    "Rate lookups: hit — fresh from memory, shared — joined an in-flight fetch, "
+    "miss — started a fetch, stale — served an expired value.", ("result",),
+)
 
-async def fetch_bitkub_v3(sym: str) -> Optional[dict]:
-    """Возвращает dict для нужного символа из v3 API или None при ошибке.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Общий клиент с пулом соединений; создаётся при первом обращении в текущем event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        # соединения пула привязаны к своему event loop — в другом цикле нужен новый клиент
+        _client = httpx.AsyncClient(
+            timeout=_TIMEOUT,
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=_POOL_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client, _client_loop
+    client, _client, _client_loop = _client, None, None
+    if client is not None:
+        await client.aclose()
+
+
+async def _trace(event_name: str, info: dict) -> None:
+    # httpcore сообщает этапы запроса; новые соединения и TLS-рукопожатия считаем
+    if event_name == "connection.connect_tcp.complete":
+        RATES_HTTP_CONNECTIONS.inc("tcp")
+    elif event_name == "connection.start_tls.complete":
+        RATES_HTTP_CONNECTIONS.inc("tls")
+
+
+async def fetch_ticker() -> Optional[dict[str, dict]]:
+    """Весь тикер v3 одним запросом, разобранный в dict по символу; None при ошибке.
 
     При сетевых ошибках делает до _RETRY_ATTEMPTS попыток с экспоненциальным backoff.
     """
+    started = time.perf_counter()
+    ticker = await _fetch_ticker()
+    RATE_FETCH_SECONDS.observe(time.perf_counter() - started, "ok" if ticker is not None else "error")
+    return ticker
+
+
+async def fetch_bitkub_v3(sym: str) -> Optional[dict]:
+    """Возвращает dict для нужного символа из v3 API или None при ошибке."""
+    ticker = await fetch_ticker()
+    return ticker.get(sym) if ticker is not None else None
+
+
+async def _fetch_ticker() -> Optional[dict[str, dict]]:
+    client = get_http_client()
     last_exc: Optional[Exception] = None
     for attempt in range(_RETRY_ATTEMPTS):
+        outcome = "error"
         try:
-            async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
-                resp = await client.get(_BITKUB_V3_TICKER_URL)
-                resp.raise_for_status()
-                items = resp.json()
-                for item in items:
-                    if item.get("symbol") == sym:
-                        return item
-            return None
+            resp = await client.get(_BITKUB_V3_TICKER_URL, extensions={"trace": _trace})
+            outcome = str(resp.status_code)
+            resp.raise_for_status()
+            return {item["symbol"]: item for item in resp.json() if item.get("symbol")}
         except (httpx.TimeoutException, httpx.NetworkError) as exc:
             last_exc = exc
             wait = _RETRY_BACKOFF * (2 ** attempt)
-            logger.warning("fetch_bitkub_v3 attempt %d/%d failed, retry in %.1fs", attempt + 1, _RETRY_ATTEMPTS, wait)
+            logger.warning("fetch_ticker attempt %d/%d failed, retry in %.1fs", attempt + 1, _RETRY_ATTEMPTS, wait)
             if attempt < _RETRY_ATTEMPTS - 1:
                 await asyncio.sleep(wait)
-        except Exception as exc:
-            logger.warning("fetch_bitkub_v3 failed sym=%s", sym, exc_info=True)
+        except Exception:
+            logger.warning("fetch_ticker failed", exc_info=True)
             return None
+        finally:
+            RATES_HTTP_REQUESTS.inc(outcome)
 
-    logger.warning("fetch_bitkub_v3 all retries exhausted sym=%s: %s", sym, last_exc)
+    logger.warning("fetch_ticker all retries exhausted: %s", last_exc)
     return None
 
 
+@dataclass
+class RateLookup:
+    data: Optional[dict]
+    age: float = 0.0
+    stale: bool = False
+
+
+class RateCache:
+    """TTL-кэш тикера Bitkub с single-flight и stale-while-revalidate.
+
+    Хранится весь тикер одним снимком, разобранным в dict по символу: один запрос
+    к бирже обновляет все пары сразу, а курс любой пары берётся из dict за O(1).
+    Свежий снимок отдаётся сразу. Протухший запускает обновление (одно на весь кэш,
+    сколько бы чатов ни нажали RATES одновременно) и ждёт его не дольше stale_wait,
+    после чего отдаёт старое значение; обновление при этом продолжается в фоне.
+    Без снимка в кэше ждём запрос целиком.
+    """
+
+    def __init__(
+        self,
+        ttl: float = RATES_CACHE_TTL_SECONDS,
+        stale_wait: float = RATES_STALE_WAIT_SECONDS,
+        fetch: Optional[Callable[[], Awaitable[Optional[dict[str, dict]]]]] = None,
+    ):
+        self.ttl = ttl
+        self.stale_wait = stale_wait
+        self._fetch = fetch
+        self._ticker: dict[str, dict] = {}
+        self._fetched_at: Optional[float] = None  # time.monotonic()
+        self._inflight: Optional[asyncio.Task] = None
+        self.last_used: Optional[float] = None  # time.monotonic() последнего get
+        self._listeners: list[Callable[[dict[str, dict]], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._ticker)
+
+    def clear(self) -> None:
+        self._ticker = {}
+        self._fetched_at = None
+        self.last_used = None
+
+    @property
+    def age(self) -> Optional[float]:
+        return None if self._fetched_at is None else time.monotonic() - self._fetched_at
+
+    @property
+    def refreshing(self) -> bool:
+        """Идёт ли сейчас запрос тикера."""
+        return self._inflight is not None
+
+    def peek(self, sym: str) -> Optional[dict]:
+        return self._ticker.get(sym)
+
+    def is_fresh(self) -> bool:
+        age = self.age
+        return age is not None and age < self.ttl
+
+    def idle_for(self) -> float:
+        """Сколько секунд курс никто не спрашивал (inf — ни разу)."""
+        return float("inf") if self.last_used is None else time.monotonic() - self.last_used
+
+    def subscribe(self, listener: Callable[[dict[str, dict]], None]) -> None:
+        """listener(ticker) вызывается после каждого обновления тикера (например, алерты)."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def put(self, ticker: dict[str, dict], fetched_at: Optional[float] = None) -> None:
+        # снимок заменяется целиком — читатели никогда не видят полуобновлённый dict
+        self._ticker = ticker
+        self._fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        for listener in self._listeners:
+            try:
+                listener(ticker)
+            except Exception:
+                logger.warning("ticker listener %r failed", listener, exc_info=True)
+
+    async def get(self, sym: str) -> RateLookup:
+        self.last_used = time.monotonic()
+        if self.is_fresh():
+            RATES_CACHE.inc("hit")
+            return RateLookup(self._ticker.get(sym), self.age)
+
+        had_value = self._fetched_at is not None
+        RATES_CACHE.inc("shared" if self._inflight is not None else "miss")
+        task = self.refresh()
+        # shield: отменённый вызывающий не отменяет общий для всех запрос
+        if not had_value:
+            updated = await asyncio.shield(task)
+        else:
+            try:
+                updated = await asyncio.wait_for(asyncio.shield(task), self.stale_wait)
+            except asyncio.TimeoutError:
+                updated = False
+        if updated:
+            return RateLookup(self._ticker.get(sym), self.age)
+        if had_value:
+            RATES_CACHE.inc("stale")
+            return RateLookup(self._ticker.get(sym), self.age, stale=True)
+        return RateLookup(None)
+
+    def refresh(self) -> asyncio.Task:
+        """Запускает обновление тикера или возвращает уже идущее; результат — удалось ли."""
+        task = self._inflight
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(), name="rates:ticker")
+            self._inflight = task
+            task.add_done_callback(self._inflight_done)
+        return task
+
+    def _inflight_done(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+
+    async def _load(self) -> bool:
+        # fetch_ticker ищется при вызове, а не при создании кэша (подменяется в тестах)
+        try:
+            ticker = await (self._fetch or fetch_ticker)()
+        except Exception:
+            # запрос может доигрывать в фоне, когда его уже никто не ждёт
+            logger.warning("ticker refresh failed", exc_info=True)
+            return False
+        if ticker is None:
+            return False
+        self.put(ticker)
+        return True
+
+
+rate_cache = RateCache()
+
+
+async def _rates_refresh_job(context: ContextTypes.DEFAULT_TYPE):
+    # пока курсы смотрят, тикер обновляется заранее и RATES открывается из памяти;
+    # без спроса биржу не опрашиваем
+    if rate_cache.idle_for() > RATES_REFRESH_IDLE_SECONDS:
+        return
+    # при недоступной бирже запрос с повторами длиннее интервала: не ждём его, чтобы
+    # джобы не копились в APScheduler (max_instances)
+    if rate_cache.refreshing:
+        return
+    await rate_cache.refresh()
+
+
+def start_rates_refresh_job(app: Application):
+    if app.job_queue is None or RATES_REFRESH_SECONDS <= 0:
+        return
+    app.job_queue.run_repeating(
+        _rates_refresh_job,
+        interval=RATES_REFRESH_SECONDS,
+        first=RATES_REFRESH_SECONDS,
+        name="rates_refresh",
+    )
+
+
+def last_price(data: Optional[dict]) -> Optional[float]:
+    """Цена последней сделки из записи тикера; None — записи нет или цена не число."""
+    try:
+        return float(data["last"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{int(seconds)} с"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} мин"
+    return f"{int(seconds // 3600)} ч {int(seconds % 3600 // 60)} мин"
+
+
+def format_pair(sym: str, data: Optional[dict]) -> Optional[str]:
+    """Строка «BTC/THB  2,150,000 ฿  +1.25%» для дополнительной пары; None — пары нет в тикере."""
+    last = last_price(data)
+    if last is None:
+        return None
+    line = f"{sym.replace('_', '/'):<9} {last:,.2f} ฿"
+    try:
+        line += f"  {float(data['percent_change']):+.2f}%"
+    except (KeyError, TypeError, ValueError):
+        pass
+    return line
+
+
 async def format_usdt_thb() -> str:
-    """Возвращает готовую строку с курсом USDT/THB для отображения в панели."""
-    data = await fetch_bitkub_v3("USDT_THB")
+    """Возвращает готовую строку с курсом USDT/THB (и RATES_EXTRA_SYMBOLS) для отображения в панели."""
+    lookup = await rate_cache.get("USDT_THB")
+    data = lookup.data
     if data is None:
         return "💱 USDT/THB\n⚠️ Не удалось получить данные. Попробуй позже."
 
@@ -67,4 +347,11 @@ async def format_usdt_thb() -> str:
         f"-2%     {p20} ฿",
         f"-5%     {p50} ฿",
     ]
+    extra = [line for line in (format_pair(sym, rate_cache.peek(sym)) for sym in RATES_EXTRA_SYMBOLS) if line]
+    if extra:
+        lines += ["", *extra]
+    if lookup.stale:
+        lines += ["", f"⚠️ Bitkub не отвечает, курс {format_age(lookup.age)} назад"]
+    elif lookup.age >= 1:
+        lines += ["", f"🕒 обновлено {format_age(lookup.age)} назад"]
     return "\n".join(lines)
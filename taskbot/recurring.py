@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import datetime
 
 from telegram.ext import Application, ContextTypes
@@ -9,13 +10,24 @@ from telegram.ext import Application, ContextTypes
 from .config import TZ, RECURRING_DEFAULT_HOUR, RECURRING_DEFAULT_MINUTE
 from . import db
 from .recurring_logic import compute_next_run
+from .metrics import RECURRING_TICK_SECONDS
+from .profiling import profiled
 
 logger = logging.getLogger(__name__)
 
 RECURRING_JOB_INTERVAL_SEC = 60
 
 
+@profiled
 async def _recurring_tick(context: ContextTypes.DEFAULT_TYPE):
+    started = time.perf_counter()
+    try:
+        await _send_due_recurring(context)
+    finally:
+        RECURRING_TICK_SECONDS.observe(time.perf_counter() - started)
+
+
+async def _send_due_recurring(context: ContextTypes.DEFAULT_TYPE):
     now = datetime.now(TZ)  # UTC-сравнимое время для выборки due
     now_iso = now.isoformat()
     rows = db.recurring_fetch_due(now_iso)
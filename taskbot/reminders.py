@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime, timedelta
+from typing import Iterable
 
+from apscheduler.jobstores.base import JobLookupError
 from telegram.error import BadRequest
 from telegram.ext import Application, ContextTypes
 
@@ -10,10 +12,28 @@ from .config import TZ, REPEAT_INTERVAL_SEC
 from . import db
 from .ui import reminder_action_keyboard
 from .models import Task
+from .profiling import profiled
 
 logger = logging.getLogger(__name__)
 
 
+def named_job_kwargs(name: str) -> dict:
+    """job_kwargs для run_once/run_repeating: id джобы в APScheduler = её имя.
+
+    Тогда одноимённая джоба заменяется при добавлении, а снимается по id через индекс
+    планировщика — без get_jobs_by_name, который просматривает всю очередь.
+    """
+    return {"id": name, "replace_existing": True}
+
+
+def _remove_job(app: Application, name: str) -> bool:
+    try:
+        app.job_queue.scheduler.remove_job(name)
+    except JobLookupError:
+        return False
+    return True
+
+
 async def _send_or_edit_reminder(
     context: ContextTypes.DEFAULT_TYPE,
     chat_id: int,
@@ -64,6 +84,7 @@ async def _send_or_edit_reminder(
     db.set_task_reminder_message_id(chat_id, task_id, msg.message_id)
 
 
+@profiled
 async def reminder_job(context: ContextTypes.DEFAULT_TYPE):
     chat_id = context.job.data["chat_id"]
     task_id = context.job.data["task_id"]
@@ -88,28 +109,44 @@ def schedule_reminder(app: Application, chat_id: int, task_id: int, remind_at_lo
         return
 
     name = f"remind:{chat_id}:{task_id}"
-    for j in app.job_queue.get_jobs_by_name(name):
-        j.schedule_removal()
-
     now = datetime.now(db.get_chat_tz(chat_id))
     delay = (remind_at_local - now).total_seconds()
     if delay <= 0:
         delay = 1
 
+    # прежнее напоминание задачи заменяется (id = имя)
     app.job_queue.run_once(
         reminder_job,
         when=delay,
         name=name,
         data={"chat_id": chat_id, "task_id": task_id},
+        job_kwargs=named_job_kwargs(name),
     )
 
 
+def schedule_new_reminders(app: Application, reminders: Iterable[tuple[int, int, datetime]]):
+    """Как schedule_reminder для (chat_id, task_id, remind_at) только что созданных задач.
+
+    Часовой пояс чата для расчёта задержки не нужен: remind_at уже с зоной.
+    """
+    if app.job_queue is None:
+        return
+    now = datetime.now(TZ)
+    for chat_id, task_id, remind_at in reminders:
+        name = f"remind:{chat_id}:{task_id}"
+        app.job_queue.run_once(
+            reminder_job,
+            when=max((remind_at - now).total_seconds(), 1),
+            name=name,
+            data={"chat_id": chat_id, "task_id": task_id},
+            job_kwargs=named_job_kwargs(name),
+        )
+
+
 def cancel_reminder(app: Application, chat_id: int, task_id: int):
     if app.job_queue is None:
         return
-    name = f"remind:{chat_id}:{task_id}"
-    for j in app.job_queue.get_jobs_by_name(name):
-        j.schedule_removal()
+    _remove_job(app, f"remind:{chat_id}:{task_id}")
 
 
 # --- repeating reminders every 3 minutes until user reacts ---
@@ -147,24 +184,31 @@ def start_reminder_repeat(app: Application, chat_id: int, task_id: int):
         return
 
     name = f"repeat:{chat_id}:{task_id}"
-    for j in app.job_queue.get_jobs_by_name(name):
-        j.schedule_removal()
-
     app.job_queue.run_repeating(
         reminder_repeat_job,
         interval=REPEAT_INTERVAL_SEC,
         first=REPEAT_INTERVAL_SEC,
         name=name,
         data={"chat_id": chat_id, "task_id": task_id, "attempt": 1},
+        job_kwargs=named_job_kwargs(name),
     )
 
 
 def cancel_reminder_repeat(app: Application, chat_id: int, task_id: int):
     if app.job_queue is None:
         return
-    name = f"repeat:{chat_id}:{task_id}"
-    for j in app.job_queue.get_jobs_by_name(name):
-        j.schedule_removal()
+    _remove_job(app, f"repeat:{chat_id}:{task_id}")
+
+
+def cancel_reminders(app: Application, chat_id: int, task_ids) -> int:
+    """Снимает первичные и повторные напоминания многих задач: по id, O(len(task_ids))."""
+    if app.job_queue is None:
+        return 0
+    removed = 0
+    for task_id in task_ids:
+        removed += _remove_job(app, f"remind:{chat_id}:{task_id}")
+        removed += _remove_job(app, f"repeat:{chat_id}:{task_id}")
+    return removed
 
 
 def restore_reminders(app: Application):
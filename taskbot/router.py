@@ -0,0 +1,130 @@
+"""Декларативная маршрутизация callback-кнопок с метриками по маршрутам."""
+from __future__ import annotations
+
+import bisect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from .callbacks import ParsedCallback, callback_prefix, parse_callback, parser_for
+
+logger = logging.getLogger(__name__)
+
+# Границы бакетов гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class LatencyHistogram:
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self):
+        if not self.counts:
+            # последний бакет — +Inf
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """[(верхняя граница, накопленное число)], последняя граница — inf."""
+        out = []
+        acc = 0
+        for bound, n in zip((*self.buckets, float("inf")), self.counts):
+            acc += n
+            out.append((bound, acc))
+        return out
+
+
+Handler = Callable[[Any, ParsedCallback], Awaitable[None]]
+
+
+@dataclass
+class Route:
+    key: str
+    handler: Handler
+    # разборщик callback_data этого маршрута, выбирается при регистрации
+    parse: Callable[[str], ParsedCallback] = parse_callback
+    calls: int = 0
+    errors: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def name(self) -> str:
+        return self.handler.__name__
+
+
+class CallbackRouter:
+    """Маршрутизатор callback_data.
+
+    Хэндлер регистрируется декоратором на точное значение callback_data
+    (например, CB.LIST == "A:LIST") или на префикс до первого ":" (CB.DONE_PICK ==
+    "DONE" для "DONE:123"). Разрешение — поиск точного значения, затем префикса,
+    оба по dict. Маршрут хранит разборщик своего ключа из callbacks, поэтому
+    один поиск даёт и хэндлер, и разбор, а старые форматы callback_data
+    продолжают работать.
+    """
+
+    def __init__(self):
+        # ключ с ":" — точное значение callback_data, без ":" — префикс
+        self._exact: dict[str, Route] = {}
+        self._prefix: dict[str, Route] = {}
+        self.unmatched = 0
+
+    def route(self, *keys: str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            for key in keys:
+                table = self._exact if ":" in key else self._prefix
+                if key in table:
+                    raise ValueError(f"Callback route already registered: {key!r}")
+                table[key] = Route(key=key, handler=handler, parse=parser_for(key))
+            return handler
+
+        return decorator
+
+    def resolve(self, data: str) -> Optional[Route]:
+        route = self._exact.get(data)
+        if route is None:
+            prefix = callback_prefix(data)
+            if prefix is not None:
+                route = self._prefix.get(prefix)
+        return route
+
+    async def dispatch(self, data: str, call: Any) -> bool:
+        """Вызывает хэндлер для data; False — если маршрут не найден или формат не распознан."""
+        route = self.resolve(data)
+        parsed = route.parse(data) if route is not None else None
+        if parsed is None or parsed.type == "UNKNOWN":
+            self.unmatched += 1
+            return False
+
+        started = time.perf_counter()
+        try:
+            await route.handler(call, parsed)
+        except Exception:
+            route.errors += 1
+            raise
+        finally:
+            route.calls += 1
+            route.latency.observe(time.perf_counter() - started)
+        return True
+
+    def routes(self) -> list[Route]:
+        return [*self._exact.values(), *self._prefix.values()]
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            route.key: {
+                "handler": route.name,
+                "calls": route.calls,
+                "errors": route.errors,
+                "avg_ms": round(route.latency.total / route.latency.count * 1000, 2) if route.latency.count else 0.0,
+            }
+            for route in self.routes()
+        }
@@ -7,22 +7,43 @@ from telegram.ext import Application
 
 from .config import TZ
 from . import db
-from .audit import log_action
+from .audit import log_action, log_actions, log_entries
 from .models import Task
+from .ui import invalidate_tasks_text
 from .reminders import (
     schedule_reminder,
+    schedule_new_reminders,
     cancel_reminder,
     start_reminder_repeat,
     cancel_reminder_repeat,
+    cancel_reminders,
 )
 
 
 def add_task(*, chat_id: int, owner_id: int, owner_name: str, text: str) -> int:
     tid = db.insert_task(chat_id, owner_id=owner_id, owner_name=owner_name, text=text)
+    invalidate_tasks_text(chat_id)
     log_action(chat_id, owner_id, owner_name, "ADD", tid)
     return tid
 
 
+def add_tasks(
+    *,
+    chat_id: int,
+    owner_id: int,
+    owner_name: str,
+    texts: list[str],
+    max_open: int = 0,
+) -> list[int] | None:
+    """Пакетное добавление: одна транзакция, одна запись в аудите. None — не влезло в лимит."""
+    tids = db.insert_tasks(chat_id, owner_id, owner_name, texts, max_open=max_open)
+    if not tids:
+        return tids
+    invalidate_tasks_text(chat_id)
+    log_action(chat_id, owner_id, owner_name, "ADD_BULK", None, meta={"task_ids": tids, "count": len(tids)})
+    return tids
+
+
 def set_reminder(
     *,
     app: Application,
@@ -33,6 +54,7 @@ def set_reminder(
     remind_at: datetime,
 ) -> None:
     db.set_task_remind(chat_id, task_id, remind_at.isoformat())
+    invalidate_tasks_text(chat_id)
     schedule_reminder(app, chat_id, task_id, remind_at)
 
     # сбросить повтор (чтобы начинался заново)
@@ -41,6 +63,22 @@ def set_reminder(
     log_action(chat_id, actor_id, actor_name, "REM_SET", task_id, meta={"remind_at": remind_at.isoformat()})
 
 
+def register_reminded_tasks(*, app: Application, tasks: list[tuple[int, int, str, int, datetime]]) -> None:
+    """Остаток add_task + set_reminder для задач, уже записанных в БД с remind_at.
+
+    tasks: (chat_id, owner_id, owner_name, task_id, remind_at). Кэш списка, джобы и аудит —
+    пачкой; старые джобы не ищутся: задачи новые, ни напоминаний, ни повторов у них нет.
+    """
+    for chat_id in {task[0] for task in tasks}:
+        invalidate_tasks_text(chat_id)
+    schedule_new_reminders(app, [(chat_id, tid, remind_at) for chat_id, _, _, tid, remind_at in tasks])
+    entries = []
+    for chat_id, owner_id, owner_name, tid, remind_at in tasks:
+        entries.append((chat_id, owner_id, owner_name, "ADD", tid, None))
+        entries.append((chat_id, owner_id, owner_name, "REM_SET", tid, {"remind_at": remind_at.isoformat()}))
+    log_entries(entries)
+
+
 def clear_reminder(
     *,
     app: Application,
@@ -54,6 +92,7 @@ def clear_reminder(
     had_reminder = bool(task and task.remind_at is not None)
 
     db.set_task_remind(chat_id, task_id, None)
+    invalidate_tasks_text(chat_id)
     cancel_reminder(app, chat_id, task_id)
     cancel_reminder_repeat(app, chat_id, task_id)
     db.set_task_reminder_message_id(chat_id, task_id, None)
@@ -76,6 +115,7 @@ def snooze_30m(
 
     dt = datetime.now(TZ) + timedelta(minutes=30)
     db.set_task_remind(chat_id, task_id, dt.isoformat())
+    invalidate_tasks_text(chat_id)
     schedule_reminder(app, chat_id, task_id, dt)
 
     log_action(chat_id, actor_id, actor_name, "SNOOZE_30M", task_id, meta={"remind_at": dt.isoformat()})
@@ -91,13 +131,12 @@ def mark_done(
     task_id: int,
 ) -> bool:
     ok = db.mark_done(chat_id, task_id, done_by_id=actor_id, done_by_name=actor_name)
+    invalidate_tasks_text(chat_id)
     log_action(chat_id, actor_id, actor_name, "DONE", task_id)
 
+    # напоминание с задачи снимает сам db.mark_done
     cancel_reminder(app, chat_id, task_id)
     cancel_reminder_repeat(app, chat_id, task_id)
-    db.set_task_remind(chat_id, task_id, None)
-    db.mark_reminded(chat_id, task_id)
-    db.set_task_reminder_message_id(chat_id, task_id, None)
     return ok
 
 
@@ -110,9 +149,45 @@ def delete_task(
     task_id: int,
 ) -> bool:
     ok = db.soft_delete(chat_id, task_id)
+    invalidate_tasks_text(chat_id)
     log_action(chat_id, actor_id, actor_name, "DELETE", task_id)
 
     cancel_reminder(app, chat_id, task_id)
     cancel_reminder_repeat(app, chat_id, task_id)
-    db.set_task_reminder_message_id(chat_id, task_id, None)
-    return ok
\ No newline at end of file
+    return ok
+
+
+def mark_done_many(
+    *,
+    app: Application,
+    chat_id: int,
+    actor_id: int,
+    actor_name: str,
+    task_ids: list[int],
+) -> list[int]:
+    """Пакетный mark_done: один UPDATE, одна пачка аудита, один проход по джобам."""
+    done = db.mark_done_many(chat_id, task_ids, done_by_id=actor_id, done_by_name=actor_name)
+    if not done:
+        return done
+    invalidate_tasks_text(chat_id)
+    log_actions(chat_id, actor_id, actor_name, "DONE", done)
+    cancel_reminders(app, chat_id, done)
+    return done
+
+
+def delete_tasks(
+    *,
+    app: Application,
+    chat_id: int,
+    actor_id: int,
+    actor_name: str,
+    task_ids: list[int],
+) -> list[int]:
+    """Пакетный delete_task: один UPDATE, одна пачка аудита, один проход по джобам."""
+    deleted = db.soft_delete_many(chat_id, task_ids)
+    if not deleted:
+        return deleted
+    invalidate_tasks_text(chat_id)
+    log_actions(chat_id, actor_id, actor_name, "DELETE", deleted)
+    cancel_reminders(app, chat_id, deleted)
+    return deleted
@@ -0,0 +1,95 @@
+"""Замер холодного старта: сколько занимает каждая фаза от запуска до первого апдейта.
+
+main.py отмечает фазы по мере прохождения (imports, db_init, build, restore_reminders,
+initialize, ...); первый getUpdates и первый обработанный апдейт отмечаются сами —
+GetUpdatesProbe и ChatOrderedUpdateProcessor. Когда обработан первый апдейт, сводка
+пишется в лог; фазы отдаются в /metrics как taskbot_startup_phase_seconds.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+from telegram.request import BaseRequest, RequestData
+
+from .metrics import DelegatingRequest, registry
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimeline:
+    """Последовательные фазы: mark(name) записывает время с предыдущей отметки."""
+
+    def __init__(self, origin: Optional[float] = None):
+        self.reset(origin)
+
+    def reset(self, origin: Optional[float] = None) -> None:
+        self.origin = time.perf_counter() if origin is None else origin
+        self._last = self.origin
+        self.phases: dict[str, float] = {}
+
+    def mark(self, name: str) -> float:
+        now = time.perf_counter()
+        self.phases[name] = now - self._last
+        self._last = now
+        return self.phases[name]
+
+    def mark_once(self, name: str) -> bool:
+        """Отметка события, которое важно только в первый раз (первый getUpdates, первый апдейт)."""
+        if name in self.phases:
+            return False
+        self.mark(name)
+        return True
+
+    @property
+    def total(self) -> float:
+        return self._last - self.origin
+
+    def summary(self) -> str:
+        parts = [f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items()]
+        return f"{', '.join(parts)}; total {self.total * 1000:.0f} ms"
+
+    def first_update(self) -> None:
+        if self.mark_once("first_update"):
+            logger.info("startup: %s", self.summary())
+
+
+startup = StartupTimeline()
+
+registry.collected(
+    "taskbot_startup_phase_seconds", "Duration of startup phases up to the first handled update.", ("phase",),
+    lambda: [((name,), seconds) for name, seconds in startup.phases.items()],
+)
+
+
+class GetUpdatesProbe(DelegatingRequest):
+    """Отмечает момент первого запроса getUpdates: бот начал принимать апдейты."""
+
+    def __init__(self, inner: BaseRequest, timeline: StartupTimeline = startup):
+        super().__init__(inner)
+        self._timeline = timeline
+        self._seen = False
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: Optional[RequestData] = None,
+        read_timeout=BaseRequest.DEFAULT_NONE,
+        write_timeout=BaseRequest.DEFAULT_NONE,
+        connect_timeout=BaseRequest.DEFAULT_NONE,
+        pool_timeout=BaseRequest.DEFAULT_NONE,
+    ) -> tuple[int, bytes]:
+        if not self._seen and url.endswith("/getUpdates"):
+            self._seen = True
+            self._timeline.mark_once("first_get_updates")
+        return await super().do_request(
+            url,
+            method,
+            request_data=request_data,
+            read_timeout=read_timeout,
+            write_timeout=write_timeout,
+            connect_timeout=connect_timeout,
+            pool_timeout=pool_timeout,
+        )
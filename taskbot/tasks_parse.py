@@ -0,0 +1,27 @@
+"""Разбор сообщения со списком задач (по одной на строку)."""
+from __future__ import annotations
+
+import re
+
+# маркеры списков: "- ", "* ", "• ", "— ", "1. ", "1) ", "[ ] ", "☐ ". После маркера обязателен
+# пробел: "1.5 л молока", "-5 градусов" и "*важно*" — это текст задачи, а не маркер
+_LIST_MARKER_RE = re.compile(r"^\s*(?:[-*•—–·]|\d{1,3}[.)]|\[\s?[xX]?\s?\]|☐|☑️?|✅)(?:\s+|$)")
+
+
+def split_task_lines(text: str) -> list[str]:
+    """Возвращает тексты задач из сообщения.
+
+    Одна строка — одна задача как есть (маркер не срезается, чтобы не менять
+    привычное поведение). Несколько строк — список: пустые строки пропускаются,
+    маркеры списков в начале строк убираются. Строка из одного маркера («10)»)
+    остаётся как есть.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    if len(lines) <= 1:
+        return lines
+
+    items = []
+    for line in lines:
+        items.append(_LIST_MARKER_RE.sub("", line, count=1).strip() or line)
+    return items
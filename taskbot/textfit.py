@@ -0,0 +1,85 @@
+"""Укладка текста в лимиты Telegram: длина в UTF-16, разбиение на страницы."""
+from __future__ import annotations
+
+# Лимит Bot API для текста сообщения (считается в UTF-16 code units)
+TELEGRAM_TEXT_LIMIT = 4096
+
+ELLIPSIS = "…"
+
+
+def tg_len(text: str) -> int:
+    """Длина строки так, как её считает Telegram (UTF-16 code units)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def truncate(text: str, limit: int) -> str:
+    """Обрезает текст до limit UTF-16 единиц (с учётом «…»)."""
+    if tg_len(text) <= limit:
+        return text
+    budget = limit - tg_len(ELLIPSIS)
+    used = 0
+    for i, ch in enumerate(text):
+        used += 2 if ord(ch) > 0xFFFF else 1
+        if used > budget:
+            return text[:i] + ELLIPSIS
+    return text
+
+
+def fit_text(text: str, limit: int = TELEGRAM_TEXT_LIMIT) -> str:
+    """Последний рубеж: гарантирует, что текст пройдёт лимит длины сообщения."""
+    return truncate(text, limit)
+
+
+class PageBuilder:
+    """Потоковая сборка строк в страницы, каждая из которых укладывается в бюджет.
+
+    Строки добавляются по одной; если очередная строка не помещается в текущую
+    страницу, начинается новая страница (с тем же заголовком). Строка, которая не влезает даже в пустую страницу, обрезается.
+    `reserve` — сколько символов первой страницы оставить под префикс (flash-строку).
+    """
+
+    def __init__(self, header: str = "", limit: int = TELEGRAM_TEXT_LIMIT, reserve: int = 0):
+        self._header = header
+        self._header_len = tg_len(header)
+        self._limit = limit
+        self._pages: list[str] = []
+        self._lines: list[str] = []
+        self._used = 0
+        self._budget = limit - reserve
+        self._start_page()
+
+    def _start_page(self) -> None:
+        if self._lines:
+            self._pages.append("\n".join(self._lines))
+            self._budget = self._limit
+        self._lines = [self._header] if self._header else []
+        self._used = self._header_len
+
+    def _has_content(self) -> bool:
+        return len(self._lines) > (1 if self._header else 0)
+
+    def add(self, line: str) -> None:
+        sep = 1 if self._lines else 0
+        size = tg_len(line)
+        if self._used + sep + size > self._budget and self._has_content():
+            self._start_page()
+            sep = 1 if self._lines else 0
+        room = self._budget - self._used - sep
+        if size > room:
+            line = truncate(line, max(room, 0))
+            size = tg_len(line)
+        self._lines.append(line)
+        self._used += sep + size
+
+    def pages(self) -> list[str]:
+        pages = list(self._pages)
+        if self._lines:
+            pages.append("\n".join(self._lines))
+        return pages or [""]
+
+    def page(self, index: int) -> tuple[str, int, int]:
+        """(текст, номер страницы с поправкой на границы, всего страниц)."""
+        pages = self.pages()
+        index = min(max(index, 0), len(pages) - 1)
+        return pages[index], index, len(pages)
+
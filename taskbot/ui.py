@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import json
 import logging
+from collections import OrderedDict
 from datetime import datetime
 from typing import Iterable, Tuple
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-from .config import TZ
+from .config import TZ, RENDER_CACHE_MAX, TASK_LINE_MAX_LEN
 from . import db
-from .callbacks import CB, cb_done, cb_del, cb_rem, cb_rset, cb_rm_ack, cb_rm_snooze30, cb_recur_del, cb_recur_sched
+from .callbacks import CB, cb_done, cb_del, cb_rem, cb_sel, cb_apply, cb_rset, cb_rm_ack, cb_rm_snooze30, cb_recur_del, cb_recur_sched, cb_page
 from .models import Task
 from .recurring_parse import MONTHS_SHORT
+from .textfit import PageBuilder, fit_text, tg_len, truncate
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +36,17 @@ class Screen:
     RATES = "RATES"
 
 
-def panel_keyboard() -> InlineKeyboardMarkup:
+def _page_nav_row(page: int, pages: int) -> list[InlineKeyboardButton]:
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton("◀️", callback_data=cb_page(page - 1)))
+    row.append(InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=cb_page(page)))
+    if page < pages - 1:
+        row.append(InlineKeyboardButton("▶️", callback_data=cb_page(page + 1)))
+    return row
+
+
+def panel_keyboard(page: int = 0, pages: int = 1) -> InlineKeyboardMarkup:
     buttons = [
         [
             InlineKeyboardButton("➕ Добавить", callback_data=CB.ADD),
@@ -53,6 +66,8 @@ def panel_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton("🕘 История", callback_data=CB.HIST),
         ],
     ]
+    if pages > 1:
+        buttons.insert(0, _page_nav_row(page, pages))
     return InlineKeyboardMarkup(buttons)
 
 
@@ -88,7 +103,7 @@ def reminder_action_keyboard(task_id: int) -> InlineKeyboardMarkup:
 def _format_task_line(idx: int, task: Task, tz) -> str:
     prefix = f"{idx}. "
     status = "✅" if task.done else "🔹"
-    text = task.text
+    text = truncate(task.text, TASK_LINE_MAX_LEN)
     remind_at = task.remind_at
 
     if remind_at:
@@ -105,23 +120,77 @@ def _format_task_line(idx: int, task: Task, tz) -> str:
     return f"{prefix}{status} {text}{remind_str}"
 
 
-def format_tasks_text(chat_id: int) -> str:
+_TASKS_HEADER = "Твои задачи:"
+_NO_TASKS_TEXT = "Пока нет задач.\nНажми «➕ Добавить», чтобы создать первую."
+
+
+def _tasks_lines(chat_id: int) -> list[str]:
     rows = db.fetch_tasks(chat_id, limit=20)
     if not rows:
-        return "Пока нет задач.\nНажми «➕ Добавить», чтобы создать первую."
+        return []
 
     tz = db.get_chat_tz(chat_id)
     tasks = [Task.from_row(chat_id, row) for row in rows]
+    return [_format_task_line(idx, task, tz) for idx, task in enumerate(tasks, start=1)]
+
+
+def paginate_tasks(lines: list[str], page: int = 0, reserve: int = 0) -> Tuple[str, int, int]:
+    """Раскладывает строки задач по страницам в лимите Telegram: (текст, страница, всего)."""
+    if not lines:
+        return _NO_TASKS_TEXT, 0, 1
+    builder = PageBuilder(header=_TASKS_HEADER, reserve=reserve)
+    for line in lines:
+        builder.add(line)
+    return builder.page(page)
+
+
+def format_tasks_text(chat_id: int, page: int = 0) -> str:
+    return paginate_tasks(_tasks_lines(chat_id), page)[0]
+
+
+# ---------- render cache ----------
+# Последние отрендеренные строки LIST по чатам. Restore после flash берёт их отсюда,
+# а не из БД; services сбрасывают запись при любом изменении задач чата.
+_tasks_lines_cache: OrderedDict[int, list[str]] = OrderedDict()
+
+
+def _remember_tasks_lines(chat_id: int, lines: list[str]) -> list[str]:
+    _tasks_lines_cache[chat_id] = lines
+    _tasks_lines_cache.move_to_end(chat_id)
+    while len(_tasks_lines_cache) > RENDER_CACHE_MAX:
+        _tasks_lines_cache.popitem(last=False)
+    return lines
 
-    lines = ["Твои задачи:"]
-    for idx, task in enumerate(tasks, start=1):
-        lines.append(_format_task_line(idx, task, tz))
-    return "\n".join(lines)
+
+def cached_tasks_lines(chat_id: int) -> list[str]:
+    lines = _tasks_lines_cache.get(chat_id)
+    if lines is not None:
+        _tasks_lines_cache.move_to_end(chat_id)
+        return lines
+    return _remember_tasks_lines(chat_id, _tasks_lines(chat_id))
+
+
+def invalidate_tasks_text(chat_id: int) -> None:
+    _tasks_lines_cache.pop(chat_id, None)
+
+
+def tasks_panel(
+    chat_id: int,
+    page: int = 0,
+    *,
+    reserve: int = 0,
+    cached: bool = False,
+) -> Tuple[str, InlineKeyboardMarkup]:
+    """Текст и клавиатура LIST. cached=True — без запроса в БД, если строки уже в кэше."""
+    lines = cached_tasks_lines(chat_id) if cached else _remember_tasks_lines(chat_id, _tasks_lines(chat_id))
+    text, page, pages = paginate_tasks(lines, page, reserve)
+    return text, panel_keyboard(page, pages)
 
 
 # Человекочитаемые подписи для действий в истории
 ACTION_LABELS = {
     "ADD": "добавил задачу",
+    "ADD_BULK": "добавил задачи",
     "DONE": "выполнил задачу",
     "DELETE": "удалил задачу",
     "REM_SET": "поставил напоминание",
@@ -171,6 +240,11 @@ def _format_history_text(chat_id: int) -> str:
 
         label = _action_label(action)
         part = f"  {ts}  {actor} {label}"
+        if action == "ADD_BULK" and row["meta"]:
+            try:
+                part += f" ({json.loads(row['meta'])['count']} шт.)"
+            except Exception:
+                logger.debug("_format_history_text: bad ADD_BULK meta", exc_info=True)
         if task_id is not None:
             part += f" #{task_id}"
             # Опционально: подставить текст задачи (первые 35 символов)
@@ -185,10 +259,18 @@ def _format_history_text(chat_id: int) -> str:
     return "\n".join(lines)
 
 
-def _tasks_pick_keyboard(rows: Iterable, kind: str) -> InlineKeyboardMarkup:
-    """rows: итерация по Task или по row-like (id, text)."""
+_APPLY_LABELS = {"DONE": "✅ Выполнить", "DEL": "🗑 Удалить"}
+
+
+def _tasks_pick_keyboard(rows: Iterable, kind: str, selected: set[int] | None = None) -> InlineKeyboardMarkup:
+    """rows: итерация по Task или по row-like (id, text).
+
+    selected != None (для DONE/DEL) — режим мультивыбора: кнопки переключают
+    отметку, действие выполняется кнопкой применения.
+    """
     buttons: list[list[InlineKeyboardButton]] = []
     MAX_LABEL = 40
+    multi = selected is not None and kind in _APPLY_LABELS
 
     for row in rows:
         tid = row.id if hasattr(row, "id") else row["id"]
@@ -201,7 +283,10 @@ def _tasks_pick_keyboard(rows: Iterable, kind: str) -> InlineKeyboardMarkup:
             label = f"{status} #{tid} {short}"
         else:
             label = f"#{tid} {short}"
-        if kind == "DONE":
+        if multi:
+            label = f"{'☑️' if tid in selected else '⬜'} {label}"
+            cb = cb_sel(kind, tid)
+        elif kind == "DONE":
             cb = cb_done(tid)
         elif kind == "DEL":
             cb = cb_del(tid)
@@ -209,7 +294,10 @@ def _tasks_pick_keyboard(rows: Iterable, kind: str) -> InlineKeyboardMarkup:
             cb = cb_rem(tid)
         buttons.append([InlineKeyboardButton(label, callback_data=cb)])
 
-    buttons.append([InlineKeyboardButton("⬅️ Назад", callback_data=CB.LIST)])
+    bottom = [InlineKeyboardButton("⬅️ Назад", callback_data=CB.LIST)]
+    if multi and selected:
+        bottom.insert(0, InlineKeyboardButton(f"{_APPLY_LABELS[kind]} ({len(selected)})", callback_data=cb_apply(kind)))
+    buttons.append(bottom)
     return InlineKeyboardMarkup(buttons)
 
 
@@ -286,8 +374,13 @@ def recur_schedule_keyboard() -> InlineKeyboardMarkup:
 
 
 def render_panel(chat_id: int, screen: str, payload: dict) -> Tuple[str, InlineKeyboardMarkup]:
+    text, markup = _render_screen(chat_id, screen, payload)
+    return fit_text(text), markup
+
+
+def _render_screen(chat_id: int, screen: str, payload: dict) -> Tuple[str, InlineKeyboardMarkup]:
     if screen == Screen.LIST:
-        return format_tasks_text(chat_id), panel_keyboard()
+        return tasks_panel(chat_id, payload.get("page", 0))
 
     if screen == Screen.HIST:
         kb = InlineKeyboardMarkup([
@@ -297,7 +390,7 @@ def render_panel(chat_id: int, screen: str, payload: dict) -> Tuple[str, InlineK
 
     if screen == Screen.ADD_PROMPT:
         hint = payload.get("hint", "")
-        text = "✏️ Отправь текст задачи одним сообщением."
+        text = "✏️ Отправь текст задачи одним сообщением.\nМожно списком — по задаче на строку."
         if hint:
             text = f"{hint}\n\n{text}"
         return text, panel_keyboard()
@@ -306,13 +399,21 @@ def render_panel(chat_id: int, screen: str, payload: dict) -> Tuple[str, InlineK
         rows = payload.get("rows") or []
         if not rows:
             return "Нет открытых задач для выполнения.", panel_keyboard()
-        return "Выбери задачу, которую нужно отметить выполненной:", _tasks_pick_keyboard(rows, "DONE")
+        selected = payload.get("selected") or set()
+        return (
+            "Отметь задачи, которые выполнены, и нажми «Выполнить»:",
+            _tasks_pick_keyboard(rows, "DONE", selected),
+        )
 
     if screen == Screen.PICK_DEL:
         rows = payload.get("rows") or []
         if not rows:
             return "Нет задач для удаления.", panel_keyboard()
-        return "Выбери задачу, которую нужно удалить:", _tasks_pick_keyboard(rows, "DEL")
+        selected = payload.get("selected") or set()
+        return (
+            "Отметь задачи, которые нужно удалить, и нажми «Удалить»:",
+            _tasks_pick_keyboard(rows, "DEL", selected),
+        )
 
     if screen == Screen.PICK_REM:
         rows = payload.get("rows") or []
@@ -337,9 +438,9 @@ def render_panel(chat_id: int, screen: str, payload: dict) -> Tuple[str, InlineK
         return text, panel_keyboard()
 
     if screen == Screen.FLASH:
-        line = payload.get("line", "")
-        base = format_tasks_text(chat_id)
-        return f"{line}\n\n{base}", panel_keyboard()
+        line = truncate(payload.get("line", ""), TASK_LINE_MAX_LEN)
+        base, markup = tasks_panel(chat_id, reserve=tg_len(line) + 2)
+        return f"{line}\n\n{base}", markup
 
     if screen == Screen.RECUR_LIST:
         rows = db.recurring_fetch_by_chat(chat_id)
@@ -396,4 +497,4 @@ def render_panel(chat_id: int, screen: str, payload: dict) -> Tuple[str, InlineK
         return text, InlineKeyboardMarkup([[InlineKeyboardButton("⬅️ Назад", callback_data=CB.RECUR)]])
 
     # fallback
-    return format_tasks_text(chat_id), panel_keyboard()
+    return tasks_panel(chat_id)
@@ -0,0 +1,92 @@
+"""Параллельная обработка апдейтов: порядок внутри чата, параллелизм между чатами."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from .config import UPDATE_WORKERS, UPDATE_MAX_PENDING
+from .metrics import UPDATES_TOTAL, UPDATE_SECONDS, update_type
+from .startup import startup
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_key(update: object) -> Optional[int]:
+    """chat_id, по которому апдейты выстраиваются в очередь; None — порядок не важен."""
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Апдейты одного чата выполняются строго по очереди, разных чатов — параллельно.
+
+    Каждый чат — цепочка: апдейт ждёт завершения предыдущего апдейта своего чата,
+    после чего занимает один из `workers` слотов общего пула. Ожидание очереди слот
+    не занимает, поэтому медленный чат не блокирует остальные. `max_pending`
+    ограничивает общее число принятых в обработку апдейтов (включая ожидающих).
+    """
+
+    def __init__(self, workers: int = UPDATE_WORKERS, max_pending: int = UPDATE_MAX_PENDING):
+        if workers < 1:
+            raise ValueError("workers must be a positive integer")
+        super().__init__(max_concurrent_updates=max(max_pending, workers))
+        self._workers_count = workers
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._tails: dict[int, asyncio.Future] = {}
+
+    @property
+    def workers(self) -> int:
+        return self._workers_count
+
+    @property
+    def active_chats(self) -> int:
+        """Сколько чатов сейчас имеют апдейты в обработке или в очереди."""
+        return len(self._tails)
+
+    async def initialize(self) -> None:
+        if self._workers is None:
+            self._workers = asyncio.Semaphore(self._workers_count)
+
+    async def shutdown(self) -> None:
+        self._tails.clear()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if self._workers is None:
+            await self.initialize()
+
+        key = update_chat_key(update)
+        if key is None:
+            async with self._workers:
+                await self._run(update, coroutine)
+            return
+
+        prev = self._tails.get(key)
+        done = asyncio.get_running_loop().create_future()
+        self._tails[key] = done
+        try:
+            if prev is not None and not prev.done():
+                # asyncio.wait не отменяет prev, если нас самих отменят при остановке
+                await asyncio.wait([prev])
+            async with self._workers:
+                await self._run(update, coroutine)
+        finally:
+            done.set_result(None)
+            if self._tails.get(key) is done:
+                del self._tails[key]
+
+    @staticmethod
+    async def _run(update: object, coroutine: Awaitable[Any]) -> None:
+        kind = update_type(update)
+        started = time.perf_counter()
+        try:
+            await coroutine
+        finally:
+            UPDATES_TOTAL.inc(kind)
+            UPDATE_SECONDS.observe(time.perf_counter() - started, kind)
+            startup.first_update()
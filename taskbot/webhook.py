@@ -0,0 +1,45 @@
+"""Приём апдейтов: какие типы апдейтов запрашивать и настройки webhook-сервера."""
+from __future__ import annotations
+
+import re
+from typing import Any
+
+from telegram import Update
+
+from . import config
+
+# Только то, что реально обрабатывают хэндлеры из main.py:
+# команды и текст, кнопки панели, изменения участников (кэш админов).
+ALLOWED_UPDATES = [
+    Update.MESSAGE,
+    Update.CALLBACK_QUERY,
+    Update.CHAT_MEMBER,
+    Update.MY_CHAT_MEMBER,
+]
+
+# Bot API: 1-256 символов A-Z, a-z, 0-9, _ и -
+_SECRET_RE = re.compile(r"^[A-Za-z0-9_-]{1,256}$")
+
+
+def webhook_enabled() -> bool:
+    return bool(config.WEBHOOK_URL)
+
+
+def webhook_options() -> dict[str, Any]:
+    """Аргументы Application.run_webhook из переменных окружения WEBHOOK_*."""
+    secret = config.WEBHOOK_SECRET or None
+    if secret is not None and not _SECRET_RE.match(secret):
+        raise ValueError("WEBHOOK_SECRET must be 1-256 characters: A-Z, a-z, 0-9, _ and -")
+    if not 1 <= config.WEBHOOK_MAX_CONNECTIONS <= 100:
+        raise ValueError("WEBHOOK_MAX_CONNECTIONS must be between 1 and 100")
+
+    path = config.WEBHOOK_PATH.strip("/")
+    return {
+        "listen": config.WEBHOOK_LISTEN,
+        "port": config.WEBHOOK_PORT,
+        "url_path": path,
+        "webhook_url": f"{config.WEBHOOK_URL.rstrip('/')}/{path}",
+        "secret_token": secret,
+        "max_connections": config.WEBHOOK_MAX_CONNECTIONS,
+        "allowed_updates": ALLOWED_UPDATES,
+    }
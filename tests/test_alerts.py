@@ -0,0 +1,310 @@
+"""Тесты ценовых алертов: разбор, индекс с bisect, доставка через напоминания, /alert."""
+import asyncio
+import os
+import random
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+import taskbot.db as db
+from taskbot import alerts, rates
+from taskbot.alerts import ABOVE, BELOW, Alert, AlertIndex, parse_alert
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "alerts.db"))
+    db.db_init()
+    monkeypatch.setattr(alerts, "alert_engine", alerts.AlertEngine())
+    rates.rate_cache.clear()
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("USDT < 33.5", ("USDT_THB", BELOW, 33.5)),
+    ("usdt/thb ниже 33,5", ("USDT_THB", BELOW, 33.5)),
+    ("BTC_THB above 2 500 000", ("BTC_THB", ABOVE, 2_500_000.0)),
+    ("eth>=120000", ("ETH_THB", ABOVE, 120_000.0)),
+])
+def test_parse_alert(text, expected):
+    assert parse_alert(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "USDT", "USDT 33.5", "USDT примерно 33", "USDT < 0", "< 33"])
+def test_parse_alert_rejects(text):
+    assert parse_alert(text) is None
+
+
+def test_label_and_trigger():
+    alert = Alert(1, 100, "BTC_THB", ABOVE, 2_500_000.0)
+    assert alert.label == "BTC/THB выше 2,500,000"
+    assert alert.triggered_by(2_500_000.0) and not alert.triggered_by(2_499_999.0)
+
+
+def test_index_pops_exactly_triggered_alerts():
+    rng = random.Random(1)
+    index = AlertIndex()
+    all_alerts = [
+        Alert(i, i % 50, "USDT_THB", rng.choice((BELOW, ABOVE)), round(rng.uniform(30, 36), 2))
+        for i in range(1, 5001)
+    ]
+    for alert in all_alerts:
+        index.add(alert)
+    for alert in all_alerts[:100]:
+        index.remove(alert.id)
+    alive = all_alerts[100:]
+
+    fired = index.pop_triggered("USDT_THB", 33.0)
+    assert {a.id for a in fired} == {a.id for a in alive if a.triggered_by(33.0)}
+    assert len(index) == len(alive) - len(fired)
+    # повторно те же алерты не срабатывают
+    assert index.pop_triggered("USDT_THB", 33.0) == []
+    assert index.pop_triggered("BTC_THB", 1.0) == []
+
+
+def test_index_drops_empty_books():
+    index = AlertIndex()
+    index.add(Alert(1, 100, "USDT_THB", BELOW, 33.5))
+    assert index.symbols() == {"USDT_THB"}
+    assert index.remove(1).id == 1
+    assert index.symbols() == set() and len(index) == 0
+    assert index.remove(1) is None
+
+
+def test_engine_loads_alerts_from_db_and_fires_on_ticker():
+    engine = alerts.AlertEngine()
+    engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+    kept = engine.add(100, 10, "Иван", "USDT_THB", ABOVE, 36.0)
+
+    app = MagicMock()
+    restored = alerts.AlertEngine()
+    restored.attach(app)
+    assert len(restored.index) == 2
+
+    restored.on_ticker({"USDT_THB": {"last": "33.42"}})
+    app.job_queue.run_once.assert_called_once()
+    fired = app.job_queue.run_once.call_args.kwargs["data"]
+    assert [(a.label, price) for a, price in fired] == [("USDT/THB ниже 33.5", 33.42)]
+    assert kept.id in restored.index and len(restored.index) == 1
+
+
+async def test_delivery_creates_task_with_reminder_and_removes_alert():
+    engine = alerts.AlertEngine()
+    alert = engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+
+    app = MagicMock()
+    context = MagicMock()
+    context.application = app
+    context.job.data = [(alert, 33.42)]
+    await alerts._deliver_alerts(context)
+
+    tasks = db.fetch_tasks(100)
+    assert len(tasks) == 1 and "USDT/THB ниже 33.5" in tasks[0]["text"]
+    assert db.fetch_pending_reminders()[0]["task_id"] == tasks[0]["id"]
+    reminder = app.job_queue.run_once.call_args
+    assert reminder.kwargs["name"] == f"remind:100:{tasks[0]['id']}"
+    assert db.alert_fetch_by_chat(100) == []
+
+
+def fire(engine, price):
+    """on_ticker с поддельным JobQueue; возвращает data поставленной джобы доставки."""
+    app = MagicMock()
+    engine._app = app
+    engine.on_ticker({"USDT_THB": {"last": price}})
+    return app.job_queue.run_once.call_args.kwargs["data"]
+
+
+def delivery_context(fired):
+    context = MagicMock()
+    context.job.data = fired
+    return context
+
+
+async def test_failed_delivery_keeps_alerts_except_deleted(monkeypatch):
+    engine = alerts.alert_engine
+    first = engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+    second = engine.add(200, 20, "Пётр", "USDT_THB", BELOW, 34.0)
+    fired = fire(engine, "33.0")
+    assert len(engine.index) == 0 and set(engine.firing) == {first.id, second.id}
+    # удалили, пока алерт ждал доставки
+    assert engine.remove(200, second.id) is True
+
+    def locked(rows):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(db, "alert_fire_many", locked)
+    await alerts._deliver_alerts(delivery_context(fired))
+
+    assert len(db.alert_fetch_by_chat(100)) == 1
+    assert first.id in engine.index and second.id not in engine.index
+    assert engine.firing == {}
+
+
+async def test_alert_deleted_while_queued_creates_no_task():
+    engine = alerts.alert_engine
+    alert = engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+    fired = fire(engine, "33.0")
+    assert engine.remove(100, alert.id) is True
+
+    await alerts._deliver_alerts(delivery_context(fired))
+    assert db.fetch_tasks(100) == [] and engine.firing == {}
+
+
+async def test_scheduling_failure_after_commit_does_not_duplicate(monkeypatch):
+    engine = alerts.alert_engine
+    alert = engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+    fired = fire(engine, "33.0")
+
+    def broken(app, reminders):
+        raise RuntimeError("scheduler is shut down")
+
+    monkeypatch.setattr(alerts.services, "schedule_new_reminders", broken)
+    context = delivery_context(fired)
+    await alerts._deliver_alerts(context)
+    await alerts._deliver_alerts(context)
+
+    # задача одна, с напоминанием в БД (его поднимет restore_reminders); алерт доставлен
+    assert len(db.fetch_tasks(100)) == 1
+    assert len(db.fetch_pending_reminders()) == 1
+    assert db.alert_fetch_by_chat(100) == [] and alert.id not in engine.index
+
+
+async def test_mass_delivery_is_batched():
+    with db.db_session() as conn:
+        conn.executemany(
+            "INSERT INTO price_alerts (chat_id, symbol, direction, threshold, created_at, owner_id, owner_name)"
+            " VALUES (?, 'USDT_THB', ?, ?, '', ?, 'Иван')",
+            [(1000 + i % 300, BELOW, 33.0 + i / 10000, i % 300) for i in range(3000)],
+        )
+    engine = alerts.alert_engine
+    app = MagicMock()
+    engine.attach(app)
+    engine.on_ticker({"USDT_THB": {"last": "32.0"}})
+    jobs = [c.kwargs["data"] for c in app.job_queue.run_once.call_args_list]
+    assert [len(batch) for batch in jobs] == [500] * 6
+    app.job_queue.reset_mock()
+
+    db.session_stats.reset()
+    for batch in jobs:
+        context = MagicMock()
+        context.application = app
+        context.job.data = batch
+        await alerts._deliver_alerts(context)
+
+    # на пачку: задачи вместе с удалением алертов и аудит — не по транзакции на алерт
+    assert db.session_stats.calls == 2 * len(jobs)
+    app.job_queue.get_jobs_by_name.assert_not_called()
+    assert app.job_queue.run_once.call_count == 3000
+    assert len(db.fetch_pending_reminders()) == 3000
+    assert sum(len(db.alert_fetch_by_chat(1000 + c)) for c in range(300)) == 0
+    audit = db.audit_fetch(1000, limit=100)
+    assert sorted(r["action"] for r in audit) == ["ADD"] * 10 + ["REM_SET"] * 10
+
+
+async def test_tick_refreshes_only_with_alerts_and_stale_ticker(monkeypatch):
+    refresh = AsyncMock()
+    monkeypatch.setattr(rates.rate_cache, "refresh", refresh)
+    await alerts._alerts_tick(None)
+    refresh.assert_not_awaited()
+
+    alerts.alert_engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+    await alerts._alerts_tick(None)
+    refresh.assert_awaited_once()
+
+    rates.rate_cache.put({})
+    await alerts._alerts_tick(None)
+    refresh.assert_awaited_once()
+
+
+async def test_tick_skips_while_refresh_in_flight(monkeypatch):
+    refresh = AsyncMock()
+    monkeypatch.setattr(rates.rate_cache, "refresh", refresh)
+    monkeypatch.setattr(rates.rate_cache, "_inflight", MagicMock())
+    alerts.alert_engine.add(100, 10, "Иван", "USDT_THB", BELOW, 33.5)
+    await alerts._alerts_tick(None)
+    refresh.assert_not_awaited()
+
+
+def make_update(chat_id=100, user_id=10):
+    update = MagicMock()
+    update.effective_chat.id = chat_id
+    update.effective_user.id = user_id
+    update.effective_user.full_name = "Иван"
+    update.message.reply_text = AsyncMock()
+    return update
+
+
+def make_context(*args):
+    context = MagicMock()
+    context.args = list(args)
+    return context
+
+
+async def test_cmd_alert_add_list_delete(monkeypatch):
+    from taskbot import handlers
+
+    monkeypatch.setattr(handlers, "alert_engine", alerts.alert_engine)
+    rates.rate_cache.put({"USDT_THB": {"last": "34.10"}})
+
+    update = make_update()
+    await handlers.cmd_alert(update, make_context("USDT", "ниже", "33.5"))
+    text = update.message.reply_text.call_args.args[0]
+    assert "USDT/THB ниже 33.5" in text and "34.1" in text
+    (row,) = db.alert_fetch_by_chat(100)
+    assert row["threshold"] == 33.5 and len(alerts.alert_engine.index) == 1
+    # добавление алерта не считается просмотром курсов
+    assert rates.rate_cache.last_used is None
+
+    update = make_update()
+    await handlers.cmd_alert(update, make_context())
+    assert f"#{row['id']}" in update.message.reply_text.call_args.args[0]
+
+    update = make_update()
+    await handlers.cmd_alert(update, make_context("del", str(row["id"])))
+    assert "удалён" in update.message.reply_text.call_args.args[0]
+    assert db.alert_fetch_by_chat(100) == [] and len(alerts.alert_engine.index) == 0
+
+
+async def test_cmd_alert_refreshes_stale_ticker(monkeypatch):
+    from taskbot import handlers
+
+    monkeypatch.setattr(handlers, "alert_engine", alerts.alert_engine)
+
+    async def refresh():
+        rates.rate_cache.put({"USDT_THB": {"last": "34.10"}})
+        return True
+
+    monkeypatch.setattr(rates.rate_cache, "refresh", lambda: asyncio.ensure_future(refresh()))
+    update = make_update()
+    await handlers.cmd_alert(update, make_context("USDT", ">", "35"))
+    assert "Сейчас: 34.1" in update.message.reply_text.call_args.args[0]
+    assert rates.rate_cache.last_used is None
+
+
+async def test_cmd_alert_does_not_wait_for_slow_exchange(monkeypatch):
+    from taskbot import handlers
+
+    monkeypatch.setattr(handlers, "alert_engine", alerts.alert_engine)
+    monkeypatch.setattr(handlers, "RATES_STALE_WAIT_SECONDS", 0.05)
+    rates.rate_cache.put({"USDT_THB": {"last": "34.10"}}, fetched_at=0.0)
+    slow = asyncio.get_running_loop().create_future()
+    monkeypatch.setattr(rates.rate_cache, "refresh", lambda: slow)
+
+    update = make_update()
+    await asyncio.wait_for(handlers.cmd_alert(update, make_context("USDT", ">", "35")), 1)
+    # протухший, но известный курс
+    assert "Сейчас: 34.1" in update.message.reply_text.call_args.args[0]
+    assert not slow.cancelled()
+    slow.cancel()
+
+
+async def test_cmd_alert_unknown_pair(monkeypatch):
+    from taskbot import handlers
+
+    monkeypatch.setattr(handlers, "alert_engine", alerts.alert_engine)
+    rates.rate_cache.put({"USDT_THB": {"last": "34.10"}})
+    update = make_update()
+    await handlers.cmd_alert(update, make_context("DOGE", "<", "1"))
+    assert "Нет курса DOGE/THB" in update.message.reply_text.call_args.args[0]
+    assert db.alert_fetch_by_chat(100) == []
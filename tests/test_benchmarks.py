@@ -0,0 +1,61 @@
+"""Тесты обвязки бенчмарков (перцентили, baseline) и быстрый прогон bench_db."""
+import json
+
+from benchmarks import bench_db
+from benchmarks.common import BenchResult, compare, percentile
+
+
+def test_percentile_interpolates():
+    samples = [float(i) for i in range(1, 101)]
+    assert percentile(samples, 50) == 50.5
+    assert percentile(samples, 100) == 100.0
+    assert percentile([], 99) == 0.0
+
+
+def test_compare_reports_only_regressions():
+    results = [
+        BenchResult.from_samples("fast", [0.001] * 10),
+        BenchResult.from_samples("slow", [0.004] * 10),
+    ]
+    baseline = {"fast": {"p50_ms": 1.0}, "slow": {"p50_ms": 2.0}, "gone": {"p50_ms": 1.0}}
+    assert compare(results, baseline, threshold=1.25) == [("slow", 2.0, 4.0)]
+
+
+def test_bench_db_smoke(tmp_path, monkeypatch, capsys):
+    import taskbot.db as db
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+    baseline = tmp_path / "db.json"
+    code = bench_db.main([
+        "--db", str(tmp_path / "bench.db"),
+        "--chats", "5", "--tasks", "200", "--audit", "200", "--recurring", "20",
+        "--iterations", "3",
+        "--save-baseline", str(baseline),
+    ])
+    assert code == 0
+    names = {r["name"] for r in json.loads(baseline.read_text())["results"]}
+    assert {"fetch_tasks", "fetch_pending_reminders", "mark_done_many[10]", "recurring_fetch_due"} <= names
+
+
+def test_bench_startup_reaches_first_update(tmp_path):
+    from benchmarks import bench_startup
+
+    results = {r.name: r for r in bench_startup.run_benchmarks(1, tmp_path / "startup.db", warmup=0)}
+    assert results["time_to_first_update"].n == 1
+    for phase in ("imports", "db_init", "restore_reminders", "first_get_updates", "first_update"):
+        assert f"phase:{phase}" in results
+    assert results["time_to_first_update"].p50_ms >= results["phase:imports"].p50_ms
+
+
+async def test_bench_scheduler_fires_every_reminder(tmp_path, monkeypatch):
+    import taskbot.db as db
+    from benchmarks import bench_scheduler
+
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "scheduler.db"))
+    db.db_init()
+    results, meta = await bench_scheduler.run_size(300, chats=10, horizon=10, step=0.5, sample=10, seed=1)
+    names = {r.name for r in results}
+    assert {"schedule_new@300", "reschedule@300", "cancel@300", "start_repeat@300", "cancel_repeat@300"} <= names
+    # 300 + 10 новых - 10 снятых; повторы сняты тоже
+    assert meta["scheduled"] == 300 and meta["fired"] == 300 and meta["missed"] == 0
+    assert 0 <= meta["max_lateness_s"] <= 0.5 + 0.1
+    assert meta["bytes_per_reminder"] > 0
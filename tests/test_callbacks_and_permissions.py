@@ -130,3 +130,95 @@ async def test_can_action_group_rem_not_author_not_admin():
     context = AsyncMock()
     context.bot.get_chat_member = AsyncMock(return_value=MagicMock(status="member"))
     assert await can_action(context=context, chat=chat, actor_id=200, action="REM", task_owner_id=100) is False
+
+
+# --- admin cache ---
+
+from taskbot.permissions import AdminCache, admin_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_admin_cache():
+    admin_cache.clear()
+    yield
+    admin_cache.clear()
+
+
+def make_member(user_id, status):
+    return MagicMock(user=MagicMock(id=user_id), status=status)
+
+
+def make_group_chat(chat_id=1):
+    chat = MagicMock()
+    chat.type = "supergroup"
+    chat.id = chat_id
+    return chat
+
+
+@pytest.mark.asyncio
+async def test_can_action_uses_cached_admin_list():
+    context = AsyncMock()
+    context.bot.get_chat_administrators = AsyncMock(return_value=(make_member(200, "administrator"), make_member(1, "creator")))
+    chat = make_group_chat()
+    assert await can_action(context=context, chat=chat, actor_id=200, action="DELETE", task_owner_id=100) is True
+    assert await can_action(context=context, chat=chat, actor_id=300, action="DELETE", task_owner_id=100) is False
+    assert await can_action(context=context, chat=chat, actor_id=200, action="REM", task_owner_id=100) is True
+    context.bot.get_chat_administrators.assert_called_once_with(1)
+    context.bot.get_chat_member.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_admin_list_failure_falls_back_to_get_chat_member():
+    context = AsyncMock()
+    context.bot.get_chat_administrators = AsyncMock(side_effect=RuntimeError("boom"))
+    context.bot.get_chat_member = AsyncMock(return_value=MagicMock(status="creator"))
+    assert await can_action(context=context, chat=make_group_chat(), actor_id=200, action="REM", task_owner_id=100) is True
+    context.bot.get_chat_member.assert_called_once_with(1, 200)
+
+
+def test_admin_cache_ttl(monkeypatch):
+    import taskbot.permissions as perms
+    now = [1000.0]
+    monkeypatch.setattr(perms.time, "monotonic", lambda: now[0])
+    cache = AdminCache(ttl=60)
+    cache.put(1, {10})
+    assert cache.get(1) == {10}
+    now[0] += 61
+    assert cache.get(1) is None
+
+
+def test_admin_cache_apply_status():
+    cache = AdminCache()
+    cache.apply_status(1, 10, "administrator")
+    assert cache.get(1) is None  # не выдумываем список, которого не загружали
+
+    cache.put(1, {10})
+    cache.apply_status(1, 20, "administrator")
+    cache.apply_status(1, 10, "member")
+    assert cache.get(1) == {20}
+
+
+def test_admin_cache_bounded():
+    cache = AdminCache(max_chats=2)
+    for chat_id in range(3):
+        cache.put(chat_id, set())
+    assert len(cache) == 2
+    assert cache.get(0) is None
+
+
+@pytest.mark.asyncio
+async def test_on_chat_member_updates_cache():
+    from taskbot.handlers import on_chat_member
+    admin_cache.put(1, {10})
+
+    update = MagicMock()
+    update.my_chat_member = None
+    update.chat_member.chat.id = 1
+    update.chat_member.new_chat_member = make_member(20, "administrator")
+    await on_chat_member(update, MagicMock())
+    assert admin_cache.get(1) == {10, 20}
+
+    update.my_chat_member = MagicMock()
+    update.my_chat_member.chat.id = 1
+    await on_chat_member(update, MagicMock())
+    assert admin_cache.get(1) is None
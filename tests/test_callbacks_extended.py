@@ -56,3 +56,35 @@ def test_unknown_callback():
 def test_empty_callback():
     p = parse_callback("")
     assert p.type == "UNKNOWN"
+
+
+def test_list_page_parse():
+    from taskbot.callbacks import cb_page
+    cb = cb_page(2)
+    assert cb == "PAGE:2"
+    p = parse_callback(cb)
+    assert p.type == "LIST_PAGE"
+    assert p.task_id == 2
+
+
+def test_list_page_invalid():
+    p = parse_callback("PAGE:x")
+    assert p.type == "LIST_PAGE"
+    assert p.task_id is None
+
+
+def test_pick_toggle_and_apply_parse():
+    from taskbot.callbacks import cb_sel, cb_apply
+    p = parse_callback(cb_sel("DONE", 7))
+    assert p.type == "PICK_TOGGLE"
+    assert p.action == "DONE"
+    assert p.task_id == 7
+
+    p = parse_callback(cb_apply("DEL"))
+    assert p.type == "PICK_APPLY"
+    assert p.action == "DEL"
+
+
+def test_pick_toggle_unknown_kind():
+    assert parse_callback("SEL:REM:7").type == "UNKNOWN"
+    assert parse_callback("APPLY:REM").type == "UNKNOWN"
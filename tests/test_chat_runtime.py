@@ -0,0 +1,196 @@
+"""Тесты реестра runtime-состояния чатов (lock панели, таймеры flash) и кэша рендера LIST."""
+import asyncio
+import os
+import pytest
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+import taskbot.db as db
+from taskbot.chat_runtime import ChatRuntimeRegistry, PickSelection
+from taskbot import ui
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "runtime.db")
+    monkeypatch.setattr(db, "DB_PATH", db_file)
+    import taskbot.config as cfg
+    monkeypatch.setattr(cfg, "DB_PATH", db_file)
+    db.db_init()
+    ui._tasks_lines_cache.clear()
+    yield
+
+
+# --- flash timers ---
+
+@pytest.mark.asyncio
+async def test_flash_timer_fires_and_clears_handle():
+    rt = ChatRuntimeRegistry().get(1)
+    fired = []
+    rt.schedule_flash(0.01, lambda: fired.append(1))
+    assert rt.busy
+    await asyncio.sleep(0.05)
+    assert fired == [1]
+    assert rt.flash_handle is None
+    assert not rt.busy
+
+
+@pytest.mark.asyncio
+async def test_flash_timer_replace_cancels_previous():
+    rt = ChatRuntimeRegistry().get(1)
+    fired = []
+    rt.schedule_flash(0.01, lambda: fired.append("old"))
+    rt.schedule_flash(0.01, lambda: fired.append("new"))
+    await asyncio.sleep(0.05)
+    assert fired == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_flash_timer_cancel():
+    rt = ChatRuntimeRegistry().get(1)
+    fired = []
+    rt.schedule_flash(0.01, lambda: fired.append(1))
+    assert rt.cancel_flash() is True
+    assert rt.cancel_flash() is False
+    await asyncio.sleep(0.05)
+    assert fired == []
+
+
+# --- registry ---
+
+def test_registry_returns_same_runtime():
+    reg = ChatRuntimeRegistry()
+    assert reg.get(1) is reg.get(1)
+    assert reg.get(1).panel_lock is reg.get(1).panel_lock
+    assert len(reg) == 1
+
+
+def test_registry_lru_bound():
+    reg = ChatRuntimeRegistry(max_chats=3)
+    for chat_id in range(5):
+        reg.get(chat_id)
+    assert len(reg) == 3
+    assert 0 not in reg and 1 not in reg
+    assert reg.stats()["evicted"] == 2
+
+
+def test_registry_evicts_idle(monkeypatch):
+    import taskbot.chat_runtime as cr
+    now = [1000.0]
+    monkeypatch.setattr(cr.time, "monotonic", lambda: now[0])
+    reg = ChatRuntimeRegistry(idle_seconds=60)
+    reg.get(1)
+    reg.get(2)
+    now[0] += 120
+    reg.get(3)
+    assert len(reg) == 1
+    assert 3 in reg
+
+
+@pytest.mark.asyncio
+async def test_registry_keeps_held_lock():
+    reg = ChatRuntimeRegistry(max_chats=1)
+    lock = reg.get(1).panel_lock
+    async with lock:
+        reg.get(2)
+        reg.get(3)
+        assert 1 in reg
+        assert reg.get(1).panel_lock is lock
+    assert reg.discard(1) is True
+    assert 1 not in reg
+
+
+@pytest.mark.asyncio
+async def test_registry_keeps_lock_with_waiter_between_release_and_acquire():
+    reg = ChatRuntimeRegistry(max_chats=1)
+    rt = reg.get(1)
+    inside = []
+
+    async def waiter():
+        async with reg.get(1).hold_panel():
+            inside.append(reg.get(1))
+
+    async with rt.hold_panel():
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+    # lock отпущен, а разбуженный ожидающий ещё не взял его — запись всё равно занята
+    assert not rt.panel_lock.locked() and rt.busy
+    reg.get(2)
+    assert 1 in reg
+    await task
+    assert inside == [rt] and not rt.busy
+
+
+@pytest.mark.asyncio
+async def test_registry_keeps_pending_flash():
+    reg = ChatRuntimeRegistry(max_chats=1)
+    reg.get(1).schedule_flash(10, lambda: None)
+    reg.get(2)
+    assert 1 in reg
+    assert reg.discard(1) is False
+    reg.close()
+    assert len(reg) == 0
+
+
+# --- render cache ---
+
+def test_cached_tasks_panel_does_not_requery(monkeypatch):
+    db.insert_task(1, 10, "Иван", "задача")
+    text, _ = ui.tasks_panel(1, cached=True)
+    assert "задача" in text
+
+    def fail(*args, **kwargs):
+        raise AssertionError("fetch_tasks should not be called")
+
+    monkeypatch.setattr(db, "fetch_tasks", fail)
+    assert ui.tasks_panel(1, cached=True)[0] == text
+
+
+def test_flash_render_fills_cache_and_invalidate_drops_it():
+    db.insert_task(1, 10, "Иван", "первая")
+    ui.render_panel(1, ui.Screen.FLASH, {"line": "✅ Готово."})
+    assert "первая" in ui.tasks_panel(1, cached=True)[0]
+
+    db.insert_task(1, 10, "Иван", "вторая")
+    assert "вторая" not in ui.tasks_panel(1, cached=True)[0]
+    ui.invalidate_tasks_text(1)
+    assert "вторая" in ui.tasks_panel(1, cached=True)[0]
+
+
+def test_pick_selection_toggle():
+    from taskbot.models import Task
+    rows = [Task(id=i, chat_id=1, text=str(i), done=False, remind_at=None, reminded=False, deleted=False,
+                 owner_id=10, owner_name="Иван", reminder_message_id=None) for i in (1, 2)]
+    pick = PickSelection(kind="DONE", rows=rows)
+    assert pick.toggle(2) is True
+    assert pick.toggle(99) is False
+    assert [r.id for r in pick.selected_rows()] == [2]
+    pick.toggle(2)
+    assert pick.selected == set()
+
+
+@pytest.mark.asyncio
+async def test_picks_are_per_user(monkeypatch):
+    from unittest.mock import AsyncMock, MagicMock
+    from taskbot import handlers
+    from taskbot.callbacks import parse_callback, cb_apply, cb_sel
+
+    monkeypatch.setattr(handlers, "show_screen", AsyncMock())
+    monkeypatch.setattr(handlers, "flash_panel", AsyncMock())
+    monkeypatch.setattr(handlers, "can_action", AsyncMock(return_value=True))
+    first, second = (db.insert_task(1, 10, "Иван", t) for t in ("первая", "вторая"))
+    context = MagicMock()
+    context.application.bot_data = {}
+    context.application.job_queue = None
+
+    def call(user_id):
+        return handlers.CallbackCall(context, MagicMock(), MagicMock(), 1, user_id, f"user{user_id}")
+
+    await handlers._route_pick_toggle(call(10), parse_callback(cb_sel("DONE", first)))
+    await handlers._route_pick_toggle(call(20), parse_callback(cb_sel("DONE", second)))
+    await handlers._route_pick_apply(call(20), parse_callback(cb_apply("DONE")))
+
+    # чужой APPLY применил только свой выбор и не сбросил пикер первого
+    assert [r["id"] for r in db.fetch_open_tasks(1)] == [first]
+    picks = handlers.get_chat_runtime(context.application, 1).picks
+    assert set(picks) == {10} and picks[10].selected == {first}
@@ -185,3 +185,123 @@ def test_panel_message_id():
     assert db.get_panel_message_id(1) == 999
     db.set_panel_message_id(1, None)
     assert db.get_panel_message_id(1) is None
+
+
+# --- insert_tasks (пакетное добавление) ---
+
+def test_insert_tasks_returns_ids_in_order():
+    db.insert_task(2, 10, "Иван", "чужой чат")
+    tids = db.insert_tasks(1, 10, "Иван", ["молоко", "хлеб", "яйца"])
+    assert len(tids) == 3
+    assert [db.fetch_task(1, tid)["text"] for tid in tids] == ["молоко", "хлеб", "яйца"]
+
+
+def test_insert_tasks_empty():
+    assert db.insert_tasks(1, 10, "Иван", []) == []
+
+
+def test_insert_tasks_limit_is_all_or_nothing():
+    db.insert_task(1, 10, "Иван", "уже есть")
+    assert db.insert_tasks(1, 10, "Иван", ["a", "b", "c"], max_open=3) is None
+    assert db.count_open_tasks(1) == 1
+    assert len(db.insert_tasks(1, 10, "Иван", ["a", "b"], max_open=3)) == 2
+    assert db.count_open_tasks(1) == 3
+
+
+def test_mark_done_many_skips_closed_and_clears_reminders():
+    t1 = db.insert_task(1, 10, "Иван", "a")
+    t2 = db.insert_task(1, 10, "Иван", "b")
+    t3 = db.insert_task(1, 10, "Иван", "c")
+    other_chat = db.insert_task(2, 10, "Иван", "d")
+    db.set_task_remind(1, t1, "2030-01-01T10:00:00+07:00")
+    db.mark_done(1, t2, 10, "Иван")
+
+    done = db.mark_done_many(1, [t1, t2, t3, other_chat], 11, "Пётр")
+    assert done == [t1, t3]
+    row = db.fetch_task(1, t1)
+    assert row["done"] == 1
+    assert row["done_by_name"] == "Пётр"
+    assert row["remind_at"] is None
+    assert db.fetch_task(2, other_chat)["done"] == 0
+    assert db.mark_done_many(1, [], 11, "Пётр") == []
+
+
+def test_soft_delete_many():
+    t1 = db.insert_task(1, 10, "Иван", "a")
+    t2 = db.insert_task(1, 10, "Иван", "b")
+    db.soft_delete(1, t2)
+    assert db.soft_delete_many(1, [t1, t2]) == [t1]
+    assert db.fetch_task(1, t1)["deleted"] == 1
+
+
+def test_audit_insert_many():
+    db.audit_insert_many([(1, 10, "Иван", "DONE", 1, None), (1, 10, "Иван", "DONE", 2, None)])
+    rows = db.audit_fetch(1)
+    assert sorted(r["task_id"] for r in rows) == [1, 2]
+
+
+# --- instrumentation ---
+
+def test_query_stats_count_calls_and_rows():
+    db.reset_query_stats()
+    db.insert_task(1, 10, "Иван", "a")
+    db.insert_task(1, 10, "Иван", "b")
+    db.fetch_tasks(1)
+    stats = db.query_stats["fetch_tasks"]
+    assert stats.calls == 1
+    assert stats.rows == 2
+    assert stats.max >= stats.avg > 0
+    assert db.query_stats["insert_task"].calls == 2
+    assert db.session_stats.calls >= 3
+    assert db.top_queries(1, key="calls")[0].name == "insert_task"
+
+
+def test_slow_query_logged_with_plan(monkeypatch, caplog):
+    monkeypatch.setattr(db, "DB_SLOW_QUERY_MS", 1e-9)
+    db.insert_task(1, 10, "Иван", "a")
+    with caplog.at_level("WARNING", logger="taskbot.db"):
+        db.fetch_open_tasks(1)
+    text = caplog.text
+    assert "slow db call fetch_open_tasks" in text
+    assert "SQL: SELECT id, text" in text
+    assert "PLAN:" in text and "idx_tasks_chat_deleted_id" in text
+
+
+def test_slow_query_log_disabled(monkeypatch, caplog):
+    monkeypatch.setattr(db, "DB_SLOW_QUERY_MS", 0)
+    with caplog.at_level("WARNING", logger="taskbot.db"):
+        db.fetch_open_tasks(1)
+    assert "slow db call" not in caplog.text
+
+
+# --- price_alerts ---
+
+def test_alert_insert_fetch_count():
+    aid = db.alert_insert(1, 10, "Иван", "USDT_THB", "below", 33.5)
+    db.alert_insert(1, 10, "Иван", "BTC_THB", "above", 2_500_000)
+    db.alert_insert(2, 20, "Пётр", "USDT_THB", "above", 36)
+    rows = db.alert_fetch_by_chat(1)
+    assert [r["symbol"] for r in rows] == ["BTC_THB", "USDT_THB"]
+    assert rows[1]["id"] == aid and rows[1]["threshold"] == 33.5
+    assert db.alert_count_by_chat(1) == 2
+    assert len(db.alert_fetch_all()) == 3
+
+
+def test_alert_delete_checks_chat():
+    aid = db.alert_insert(1, 10, "Иван", "USDT_THB", "below", 33.5)
+    assert db.alert_delete(chat_id=2, alert_id=aid) is False
+    assert db.alert_delete(chat_id=1, alert_id=aid) is True
+    assert db.alert_fetch_by_chat(1) == []
+
+
+def test_alert_fire_many_skips_deleted_alerts_in_batches():
+    ids = [db.alert_insert(1, 10, "Иван", "USDT_THB", "below", 30 + i / 1000) for i in range(1200)]
+    db.alert_delete(1, ids[5])
+    rows = [(aid, 1, 10, "Иван", f"алерт {aid}", "2026-01-01T00:00:00+07:00") for aid in ids[:1100]]
+    task_ids = db.alert_fire_many(rows)
+    assert len(task_ids) == 1099 and ids[5] not in task_ids
+    assert db.alert_count_by_chat(1) == 100
+    assert db.alert_alive_ids(ids[1090:1110]) == set(ids[1100:1110])
+    # повторная доставка тех же алертов задач не создаёт
+    assert db.alert_fire_many(rows) == {}
+    assert db.alert_fire_many([]) == {}
@@ -0,0 +1,88 @@
+"""Тесты истории курсов: бакеты разных разрешений, очистка по сроку, статистика и спарклайны."""
+import os
+
+import pytest
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+import taskbot.db as db
+from taskbot import history, rates
+from taskbot.history import DAY, FIVE_MIN, HOUR, RAW
+
+NOW = 1_750_000_000
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "history.db"))
+    db.db_init()
+    rates.rate_cache.clear()
+    yield
+    history.history_recorder.stop()
+
+
+def record(prices, start=NOW, step=60, symbol="USDT_THB"):
+    db.history_record([(symbol, start + i * step, p) for i, p in enumerate(prices)], tuple(history.RETENTION))
+
+
+def test_record_aggregates_into_every_resolution():
+    record([33.0, 34.0, 35.0], start=NOW - NOW % HOUR, step=60)
+    raw = db.history_fetch("USDT_THB", RAW, 0)
+    (five,) = db.history_fetch("USDT_THB", FIVE_MIN, 0)
+    (hour,) = db.history_fetch("USDT_THB", HOUR, 0)
+    assert len(raw) == 3
+    assert (five["min"], five["max"], five["count"], five["last"]) == (33.0, 35.0, 3, 35.0)
+    assert hour["sum"] == pytest.approx(102.0)
+
+
+def test_prune_keeps_storage_bounded():
+    record([33.0], start=NOW - 2 * DAY)
+    record([34.0], start=NOW)
+    history.history_recorder.prune(NOW)
+    assert [r["min"] for r in db.history_fetch("USDT_THB", RAW, 0)] == [34.0]
+    assert len(db.history_fetch("USDT_THB", FIVE_MIN, 0)) == 2
+    assert len(db.history_fetch("USDT_THB", HOUR, 0)) == 2
+
+
+def test_recorder_writes_tracked_symbols_only_while_started(monkeypatch):
+    monkeypatch.setattr(history, "RATES_EXTRA_SYMBOLS", ("BTC_THB",))
+    ticker = {"USDT_THB": {"last": "33.1"}, "BTC_THB": {"last": "2150000"}, "DOGE_THB": {"last": "5"}}
+    rates.rate_cache.put(ticker)
+    assert db.history_fetch("USDT_THB", RAW, 0) == []
+
+    history.history_recorder.start()
+    rates.rate_cache.put(ticker)
+    assert len(db.history_fetch("USDT_THB", RAW, 0)) == 1
+    assert len(db.history_fetch("BTC_THB", HOUR, 0)) == 1
+    assert db.history_fetch("DOGE_THB", RAW, 0) == []
+
+
+def test_sparkline():
+    assert history.sparkline([1, 2, None, 8]) == "▁▂ █"
+    assert history.sparkline([5, 5]) == "▄▄"
+    assert history.sparkline([None]) == ""
+
+
+def test_window_stats_from_buckets():
+    # сутки 5-минутных бакетов: цена растёт от 30 до 35
+    prices = [30 + 5 * i / 287 for i in range(288)]
+    record(prices, start=NOW - DAY + FIVE_MIN, step=FIVE_MIN)
+    stats = history.window_stats("USDT_THB", FIVE_MIN, DAY, now=NOW)
+    assert stats.low == 30 and stats.high == pytest.approx(35)
+    assert stats.avg == pytest.approx(32.5)
+    assert len(stats.spark) == history.SPARK_WIDTH
+    assert stats.spark[0] == "▁" and stats.spark[-1] == "█"
+
+
+def test_window_reads_bounded_number_of_buckets():
+    # плотные тики не увеличивают число читаемых строк: окно 24 ч — не больше 288 бакетов
+    record([33.0 + (i % 7) / 10 for i in range(3 * 24 * 60)], start=NOW - DAY, step=20)
+    assert len(db.history_fetch("USDT_THB", FIVE_MIN, NOW - DAY)) <= 289
+    text = history.format_history("USDT_THB", now=NOW)
+    lines = text.splitlines()
+    assert lines[0].startswith("24 ч:") and "мин 33.00" in lines[0] and "макс 33.60" in lines[0]
+    assert lines[2].startswith("7 д:")
+
+
+def test_format_history_empty():
+    assert history.format_history("USDT_THB", now=NOW) == ""
@@ -0,0 +1,47 @@
+"""Быстрый прогон нагрузочного стенда на крошечном сценарии."""
+import pytest
+
+import taskbot.db as db
+from benchmarks.fakebot import RecordingRequest
+from benchmarks.load_harness import Scenario, run_load
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "load.db"))
+
+
+def test_scenario_keeps_order_within_chat():
+    scenario = Scenario(chats=3, users=2, actions=3, tasks_per_chat=5)
+    updates = scenario.updates({chat_id: [1, 2, 3, 4, 5] for chat_id in scenario.chat_ids})
+    for chat_id in scenario.chat_ids:
+        kinds = [u.kind for u in updates if u.chat_id == chat_id]
+        assert kinds[0] == "cmd_start"
+        for i, kind in enumerate(kinds):
+            if kind == "text_add":
+                assert kinds[i - 1] == "cb_add"
+    assert [u.payload["update_id"] for u in updates] == list(range(1, len(updates) + 1))
+
+
+async def test_fake_request_records_calls():
+    request = RecordingRequest()
+    code, body = await request.do_request("https://api.telegram.org/botX/sendMessage", "POST")
+    assert code == 200 and b'"ok": true' in body
+    assert request.calls == {"sendMessage": 1}
+
+
+async def test_run_load_through_real_application():
+    report = await run_load(Scenario(chats=3, users=2, actions=3, tasks_per_chat=5), drain=0)
+    assert report.errors == 0
+    assert report.updates == sum(len(v) for v in report.handler.values())
+    assert report.api_calls["editMessageText"] > 0
+    assert report.db_sessions > 0
+
+
+async def test_fake_request_serves_queued_updates():
+    request = RecordingRequest()
+    request.incoming.append({"update_id": 1})
+    _code, body = await request.do_request("https://api.telegram.org/botX/getUpdates", "POST")
+    assert b'"update_id": 1' in body
+    _code, body = await request.do_request("https://api.telegram.org/botX/getUpdates", "POST")
+    assert b'"result": []' in body
@@ -0,0 +1,64 @@
+"""Тесты монитора задержки event loop."""
+import asyncio
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+from taskbot.looplag import LOOP_STALLS_TOTAL, LoopLagMonitor
+from taskbot.metrics import registry
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+
+def blocking_db_write(seconds):
+    time.sleep(seconds)
+
+
+async def slow_handler():
+    await asyncio.sleep(0)
+    blocking_db_write(0.25)
+
+
+async def test_stall_is_attributed_to_running_handler():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.05, roots=(TESTS_DIR,))
+    assert monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        # как в PTB: хэндлер выполняется в своей задаче
+        await asyncio.create_task(slow_handler())
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert not monitor.running
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert stall.handler == "test_looplag.slow_handler"
+    assert stall.finished and stall.seconds >= 0.2
+    assert "blocking_db_write" in "".join(stall.stack)
+    assert LOOP_STALLS_TOTAL.get("test_looplag.slow_handler") >= 1
+    assert monitor.quantiles()[0.99] >= 0.2
+
+
+async def test_no_stalls_when_loop_is_free():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.1)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+    assert monitor.samples and not monitor.stalls
+    assert 0.5 in monitor.quantiles()
+
+
+async def test_disabled_with_zero_threshold():
+    monitor = LoopLagMonitor(threshold=0)
+    assert not monitor.start()
+    assert not monitor.running
+    await monitor.stop()
+
+
+def test_quantiles_exported_as_metrics():
+    text = registry.render()
+    assert "# TYPE taskbot_loop_lag_seconds histogram" in text
+    assert "# TYPE taskbot_loop_lag_quantile_seconds gauge" in text
@@ -0,0 +1,62 @@
+"""Тесты интроспекции памяти."""
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+
+from taskbot import memdebug
+
+
+class FakeJobQueue:
+    def __init__(self, names):
+        self._jobs = [SimpleNamespace(name=n) for n in names]
+
+    def jobs(self):
+        return tuple(self._jobs)
+
+
+class Leaky:
+    pass
+
+
+def make_app(job_names=()):
+    return SimpleNamespace(bot_data={}, chat_data={}, user_data={}, job_queue=FakeJobQueue(job_names))
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    yield
+    memdebug.stop_tracing()
+
+
+def test_rss_is_reported():
+    assert memdebug.rss_bytes() > 1024 * 1024
+
+
+def test_jobs_are_grouped_by_name_prefix():
+    app = make_app(["remind:1:2", "remind:1:3", "repeat:1:2", "delete_job", None])
+    assert memdebug.job_counts(app) == {"remind": 2, "repeat": 1, "delete_job": 1, "unnamed": 1}
+
+
+def test_snapshot_report_lists_sections():
+    app = make_app(["remind:1:2"])
+    text = memdebug.format_snapshot(memdebug.take_snapshot(app))
+    assert "RSS" in text and "remind" in text and "render_cache" in text
+    assert "/debug trace on" in text
+
+
+def test_diff_shows_growth_and_allocations():
+    app = make_app(["remind:1:2"])
+    assert memdebug.start_tracing()
+    before = memdebug.take_snapshot(app)
+    app.job_queue = FakeJobQueue(["remind:1:2", "repeat:1:2", "repeat:1:3"])
+    app.chat_data.update({i: {} for i in range(5)})
+    hoard = [Leaky() for _ in range(500)]
+    after = memdebug.take_snapshot(app)
+    text = memdebug.format_diff(before, after)
+    assert "repeat" in text and "0 → 2" in text
+    assert "ptb_chat_data" in text and "(+5)" in text
+    assert "Leaky" in text and "(+500)" in text
+    assert "test_memdebug.py:" in text
+    assert len(hoard) == 500
+    assert memdebug.stop_tracing() and not tracemalloc.is_tracing()
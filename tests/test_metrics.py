@@ -0,0 +1,108 @@
+"""Тесты метрик: формат Prometheus, инструментирование Bot API, эндпоинт /metrics."""
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+from telegram.request import BaseRequest
+
+from taskbot import metrics
+from taskbot.metrics import InstrumentedRequest, Registry, start_metrics_server, stop_metrics_server
+
+
+def test_counter_and_histogram_render():
+    reg = Registry()
+    c = reg.counter("t_calls_total", "Calls.", ("method",))
+    h = reg.histogram("t_seconds", "Latency.", ("method",), buckets=(0.1, 1.0))
+    c.inc("send")
+    c.inc("send")
+    h.observe(0.05, "send")
+    h.observe(5.0, "send")
+    text = reg.render()
+    assert "# TYPE t_calls_total counter" in text
+    assert 't_calls_total{method="send"} 2' in text
+    assert 't_seconds_bucket{method="send",le="0.1"} 1' in text
+    assert 't_seconds_bucket{method="send",le="+Inf"} 2' in text
+    assert 't_seconds_count{method="send"} 2' in text
+
+
+def test_label_values_are_escaped():
+    reg = Registry()
+    reg.counter("t_total", "x", ("v",)).inc('a"b\\c')
+    assert 't_total{v="a\\"b\\\\c"} 1' in reg.render()
+
+
+def test_collected_metric_failure_is_skipped():
+    reg = Registry()
+    reg.collected("t_bad", "x", (), lambda: 1 / 0)
+    reg.collected("t_ok", "x", (), lambda: [((), 3)])
+    text = reg.render()
+    assert "t_bad" not in text
+    assert "t_ok 3" in text
+
+
+class _StubRequest(BaseRequest):
+    def __init__(self, code):
+        self.code = code
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        if self.code is None:
+            raise OSError("network down")
+        return self.code, b'{"ok": false}'
+
+
+async def test_instrumented_request_counts_outcomes():
+    before_429 = metrics.TELEGRAM_CALLS.get("sendMessage", "429")
+    before_err = metrics.TELEGRAM_CALLS.get("sendMessage", "error")
+    await InstrumentedRequest(_StubRequest(429)).do_request("https://x/botT/sendMessage", "POST")
+    with pytest.raises(OSError):
+        await InstrumentedRequest(_StubRequest(None)).do_request("https://x/botT/sendMessage", "POST")
+    assert metrics.TELEGRAM_CALLS.get("sendMessage", "429") == before_429 + 1
+    assert metrics.TELEGRAM_CALLS.get("sendMessage", "error") == before_err + 1
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _get(port: int, path: str) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data.decode()
+
+
+async def test_metrics_endpoint_serves_prometheus_text():
+    app = SimpleNamespace(bot_data={}, chat_data={}, user_data={}, job_queue=None)
+    port = _free_port()
+    assert await start_metrics_server(app, host="127.0.0.1", port=port) is not None
+    try:
+        body = await _get(port, "/metrics")
+        assert body.startswith("HTTP/1.1 200 OK")
+        assert "taskbot_updates_total" in body
+        assert "taskbot_chat_runtime" in body
+        assert 'taskbot_cache_entries{cache="render_cache"}' in body
+        assert "taskbot_process_resident_memory_bytes" in body
+        assert (await _get(port, "/other")).startswith("HTTP/1.1 404")
+    finally:
+        await stop_metrics_server(app)
+    assert "metrics_server" not in app.bot_data
+
+
+async def test_metrics_endpoint_disabled_without_port():
+    assert await start_metrics_server(SimpleNamespace(bot_data={}), port=0) is None
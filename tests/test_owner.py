@@ -0,0 +1,101 @@
+"""Тесты служебных команд владельца."""
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+import taskbot.db as db
+import taskbot.owner as owner
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "owner.db"))
+    monkeypatch.setattr(owner, "OWNER_IDS", frozenset({42}))
+    db.db_init()
+    db.reset_query_stats()
+
+
+def make_update(user_id):
+    update = MagicMock()
+    update.effective_user.id = user_id
+    update.message.reply_text = AsyncMock()
+    return update
+
+
+def make_context(*args):
+    context = MagicMock()
+    context.args = list(args)
+    return context
+
+
+async def test_dbtop_ignored_for_non_owner():
+    update = make_update(7)
+    await owner.cmd_dbtop(update, make_context())
+    update.message.reply_text.assert_not_called()
+
+
+async def test_dbtop_lists_hottest_functions():
+    db.insert_task(1, 10, "Иван", "a")
+    db.fetch_tasks(1)
+    update = make_update(42)
+    await owner.cmd_dbtop(update, make_context("5", "calls"))
+    text = update.message.reply_text.call_args.args[0]
+    assert "топ-" in text and "calls" in text
+    assert "insert_task" in text and "fetch_tasks" in text
+
+
+async def test_dbtop_reset():
+    db.fetch_tasks(1)
+    update = make_update(42)
+    await owner.cmd_dbtop(update, make_context("reset"))
+    assert db.top_queries() == []
+
+
+async def test_profile_starts_and_reports_to_chat(tmp_path, monkeypatch):
+    import taskbot.profiling as profiling
+    from taskbot.profiling import profiler
+
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    update = make_update(42)
+    update.effective_chat.id = -100
+    context = make_context("5", "sample")
+    context.application.create_task = MagicMock(side_effect=lambda coro: coro.close())
+    await owner.cmd_profile(update, context)
+    try:
+        assert profiler.active and profiler.session.mode == "sample" and profiler.session.seconds == 5
+        assert "запущено" in update.message.reply_text.call_args.args[0]
+    finally:
+        await owner.cmd_profile(update, make_context("stop"))
+    assert not profiler.active
+    context.application.create_task.assert_called_once()
+    context.application.bot.send_message.assert_called_once()
+    assert context.application.bot.send_message.call_args.args[0] == -100
+
+
+async def test_looplag_reports_recent_stalls():
+    from taskbot.looplag import LoopLagMonitor, Stall
+    from datetime import datetime
+
+    monitor = LoopLagMonitor(threshold=0.1)
+    monitor.samples.extend([0.001, 0.002, 0.3])
+    monitor.stalls.append(Stall(datetime.now(), "handlers.on_panel_button", ['  File "db.py", line 1\n'], 0.3, True))
+    text = owner.format_looplag(monitor)
+    assert "handlers.on_panel_button" in text and "300 ms" in text and "db.py" in text
+
+
+async def test_debug_snapshot_then_diff():
+    from types import SimpleNamespace
+
+    update = make_update(42)
+    context = make_context("snap")
+    context.application = SimpleNamespace(bot_data={}, chat_data={}, user_data={}, job_queue=None)
+    await owner.cmd_debug(update, context)
+    assert "memdebug_snapshot" in context.application.bot_data
+
+    context.args = ["diff"]
+    await owner.cmd_debug(update, context)
+    text = update.message.reply_text.call_args.args[0]
+    assert "изменения" in text and "RSS" in text
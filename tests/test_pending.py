@@ -0,0 +1,177 @@
+"""Тесты in-memory хранилища pending-состояний (TTL, отложенная запись в БД)."""
+import os
+import pytest
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+import taskbot.db as db
+from taskbot.config import TZ
+from taskbot.pending import PendingStore
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "pending.db")
+    monkeypatch.setattr(db, "DB_PATH", db_file)
+    import taskbot.config as cfg
+    monkeypatch.setattr(cfg, "DB_PATH", db_file)
+    db.db_init()
+    yield
+
+
+def test_set_get_clear_in_memory():
+    store = PendingStore()
+    assert store.get(1, 10) is None
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    p = store.get(1, 10)
+    assert p.action == "ADD_WAIT_TEXT"
+    assert p.task_id is None
+    store.clear(1, 10)
+    assert store.get(1, 10) is None
+
+
+def test_writes_are_deferred_until_flush():
+    store = PendingStore()
+    store.set(1, 10, "REM_WAIT_TIME", task_id=5)
+    assert db.pending_get(1, 10) is None
+    assert store.flush() == 1
+    row = db.pending_get(1, 10)
+    assert row["action"] == "REM_WAIT_TIME"
+    assert row["task_id"] == 5
+
+
+def test_writes_coalesce_per_key():
+    store = PendingStore()
+    store.clear(1, 10)
+    assert store.dirty_count == 0
+
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    assert store.dirty_count == 1
+
+
+def test_repeated_set_extends_ttl():
+    store = PendingStore(ttl=60)
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    store.flush()
+    # пользователь начал ввод почти ttl назад и снова нажал ту же кнопку
+    old = datetime.now(TZ) - timedelta(seconds=50)
+    store._states[(1, 10)] = replace(store._states[(1, 10)], created_at=old)
+
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    state = store.get(1, 10)
+    assert state.created_at > old
+    # через 20 с по старой метке состояние бы уже истекло
+    assert not store._expired(state, old + timedelta(seconds=70))
+
+    # продление доходит до БД: после перезапуска состояние не истекает раньше времени
+    store.flush()
+    restarted = PendingStore(ttl=60)
+    assert restarted.load() == 1
+    assert restarted.get(1, 10).created_at == state.created_at
+
+
+def test_set_then_clear_before_flush_deletes_row():
+    store = PendingStore()
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    store.flush()
+    store.set(1, 10, "RECUR_ADD_TEXT")
+    store.clear(1, 10)
+    assert store.dirty_count == 1
+    store.flush()
+    assert db.pending_get(1, 10) is None
+
+
+def test_load_survives_restart():
+    store = PendingStore()
+    store.set(1, 10, "RECUR_ADD_SCHEDULE", meta="Оплата кредитов")
+    store.flush()
+
+    restarted = PendingStore()
+    assert restarted.load() == 1
+    p = restarted.get(1, 10)
+    assert p.action == "RECUR_ADD_SCHEDULE"
+    assert p.meta == "Оплата кредитов"
+
+
+def test_load_drops_expired_rows():
+    db.pending_set(1, 10, "ADD_WAIT_TEXT")
+    old = (datetime.now(TZ) - timedelta(hours=2)).isoformat()
+    with db.db_session() as conn:
+        conn.execute("UPDATE pending SET created_at=?", (old,))
+
+    store = PendingStore(ttl=60)
+    assert store.load() == 0
+    assert store.get(1, 10) is None
+    store.flush()
+    assert db.pending_get(1, 10) is None
+
+
+def test_get_expires_by_ttl(monkeypatch):
+    store = PendingStore(ttl=60)
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    store.flush()
+    monkeypatch.setattr(store, "_expired", lambda state, now=None: True)
+    assert store.get(1, 10) is None
+    assert store.has(1, 10) is False
+    store.flush()
+    assert db.pending_get(1, 10) is None
+
+
+def test_failed_flush_keeps_changes(monkeypatch):
+    store = PendingStore()
+    store.set(1, 10, "ADD_WAIT_TEXT")
+
+    def boom(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(db, "pending_apply", boom)
+    with pytest.raises(RuntimeError):
+        store.flush()
+    assert store.dirty_count == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_async():
+    store = PendingStore()
+    store.set(1, 10, "ADD_WAIT_TEXT")
+    store.set(2, 20, "RECUR_ADD_TEXT")
+    assert await store.flush_async() == 2
+    assert len(db.pending_fetch_all()) == 2
+
+
+# --- HasPendingInput filter ---
+
+def make_message(chat_id, user_id):
+    from unittest.mock import MagicMock
+    from telegram import Message
+    msg = MagicMock(spec=Message)
+    msg.chat = MagicMock(id=chat_id)
+    msg.from_user = MagicMock(id=user_id) if user_id is not None else None
+    return msg
+
+
+def test_filter_passes_only_users_in_flow(monkeypatch):
+    from taskbot.pending import HasPendingInput
+    store = PendingStore()
+    flt = HasPendingInput(store)
+    store.set(1, 10, "ADD_WAIT_TEXT")
+
+    assert flt.filter(make_message(1, 10)) is True
+    assert flt.filter(make_message(1, 11)) is False
+    assert flt.filter(make_message(2, 10)) is False
+    assert flt.filter(make_message(1, None)) is False
+
+
+def test_filter_does_not_touch_db(monkeypatch):
+    from taskbot.pending import HasPendingInput
+    store = PendingStore()
+    flt = HasPendingInput(store)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("db must not be used")
+
+    monkeypatch.setattr(db, "db_connect", fail)
+    assert flt.filter(make_message(1, 10)) is False
@@ -0,0 +1,75 @@
+"""Тесты профилирования по требованию."""
+import asyncio
+import os
+import pstats
+
+import pytest
+
+os.environ.setdefault("TZ_NAME", "Asia/Bangkok")
+
+from taskbot.profiling import Profiler, profiled, profiler
+
+
+def busy(n=20000):
+    return sum(i * i for i in range(n))
+
+
+@profiled
+async def target(n=20000):
+    await asyncio.sleep(0)
+    return busy(n)
+
+
+@pytest.fixture(autouse=True)
+def no_leftover_session():
+    yield
+    profiler.stop()
+
+
+async def test_profiled_is_transparent_without_session():
+    assert not profiler.active
+    assert await target(10) == busy(10)
+
+
+async def test_cprofile_capture_writes_pstats(tmp_path):
+    profiler.start(60, "cprofile", out_dir=tmp_path)
+    await target()
+    await target()
+    result = profiler.stop()
+
+    assert not profiler.active
+    assert result.path.suffix == ".pstats" and result.path.exists()
+    assert result.targets["target"].calls == 2
+    funcs = {name for _file, _line, name in pstats.Stats(str(result.path)).stats}
+    assert "busy" in funcs
+    assert "busy" in result.summary
+
+
+async def test_sample_capture_writes_folded(tmp_path):
+    profiler.start(60, "sample", out_dir=tmp_path)
+    await target(2_000_000)
+    result = profiler.stop()
+
+    lines = result.path.read_text(encoding="utf-8").splitlines()
+    assert result.path.suffix == ".folded" and lines
+    _stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("test_profiling.py:busy" in line for line in lines)
+
+
+async def test_capture_switches_itself_off(tmp_path):
+    done = []
+    local = Profiler()
+    local.start(1, "cprofile", out_dir=tmp_path, on_done=done.append)
+    # минимальная длительность — 1 с; таймер в loop должен сам завершить запись
+    await asyncio.sleep(1.2)
+    assert not local.active
+    assert len(done) == 1 and done[0].path.exists()
+
+
+async def test_second_start_is_rejected(tmp_path):
+    profiler.start(60, "cprofile", out_dir=tmp_path)
+    with pytest.raises(RuntimeError):
+        profiler.start(60, "cprofile", out_dir=tmp_path)
+    with pytest.raises(ValueError):
+        Profiler().start(60, "bogus", out_dir=tmp_path)
@@ -1,7 +1,19 @@
 """Тесты получения и форматирования курса USDT/THB."""
+import asyncio
+import time
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from taskbot import rates
+
+
+@pytest.fixture(autouse=True)
+async def shared_client_closed():
+    rates.rate_cache.clear()
+    yield
+    await rates.close_http_client()
+
 
 @pytest.mark.asyncio
 async def test_format_usdt_thb_success():
@@ -20,7 +32,7 @@ async def test_format_usdt_thb_success():
         "lowest_ask": "31.08",
     }
 
-    with patch("taskbot.rates.fetch_bitkub_v3", new=AsyncMock(return_value=mock_data)):
+    with patch("taskbot.rates.fetch_ticker", new=AsyncMock(return_value={"USDT_THB": mock_data})):
         result = await format_usdt_thb()
 
     assert "31.07" in result
@@ -38,7 +50,7 @@ async def test_format_usdt_thb_calculates_discounts():
 
     mock_data = {"last": "100.00"}
 
-    with patch("taskbot.rates.fetch_bitkub_v3", new=AsyncMock(return_value=mock_data)):
+    with patch("taskbot.rates.fetch_ticker", new=AsyncMock(return_value={"USDT_THB": mock_data})):
         result = await format_usdt_thb()
 
     # -1.6% от 100 = 98.4
@@ -54,7 +66,7 @@ async def test_format_usdt_thb_api_error():
     """При ошибке API возвращается сообщение об ошибке."""
     from taskbot.rates import format_usdt_thb
 
-    with patch("taskbot.rates.fetch_bitkub_v3", new=AsyncMock(return_value=None)):
+    with patch("taskbot.rates.fetch_ticker", new=AsyncMock(return_value=None)):
         result = await format_usdt_thb()
 
     assert "⚠️" in result or "Не удалось" in result
@@ -103,3 +115,172 @@ async def test_fetch_bitkub_v3_symbol_not_found():
         result = await fetch_bitkub_v3("USDT_THB")
 
     assert result is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_reuses_one_pooled_client():
+    """Повторные запросы идут через тот же клиент; после close создаётся новый."""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = [{"symbol": "USDT_THB", "last": "31.07"}]
+
+    mock_client = AsyncMock()
+    mock_client.get = AsyncMock(return_value=mock_response)
+
+    with patch("httpx.AsyncClient", return_value=mock_client) as factory:
+        await rates.fetch_bitkub_v3("USDT_THB")
+        await rates.fetch_bitkub_v3("USDT_THB")
+        assert factory.call_count == 1
+        assert mock_client.get.await_count == 2
+        assert "trace" in mock_client.get.call_args.kwargs["extensions"]
+
+        await rates.close_http_client()
+        mock_client.aclose.assert_awaited_once()
+        await rates.fetch_bitkub_v3("USDT_THB")
+        assert factory.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_connection_trace_metrics():
+    client = rates.get_http_client()
+    assert client is rates.get_http_client()
+
+    before = rates.RATES_HTTP_CONNECTIONS.get("tls")
+    await rates._trace("connection.start_tls.complete", {})
+    await rates._trace("http11.send_request_headers.started", {})
+    assert rates.RATES_HTTP_CONNECTIONS.get("tls") == before + 1
+
+
+class SlowFetch:
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+USDT = {"symbol": "USDT_THB", "last": "31.07"}
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_within_ttl():
+    fetch = SlowFetch({"USDT_THB": USDT})
+    cache = rates.RateCache(ttl=30, fetch=fetch)
+    first = await cache.get("USDT_THB")
+    second = await cache.get("USDT_THB")
+    assert first.data == second.data == USDT
+    assert not second.stale and fetch.calls == 1
+    assert cache.is_fresh()
+
+
+@pytest.mark.asyncio
+async def test_one_ticker_fetch_serves_every_symbol():
+    btc = {"symbol": "BTC_THB", "last": "2150000", "percent_change": "1.25"}
+    fetch = SlowFetch({"USDT_THB": USDT, "BTC_THB": btc}, delay=0.05)
+    cache = rates.RateCache(ttl=30, fetch=fetch)
+    usdt, btc_lookup, missing = await asyncio.gather(
+        cache.get("USDT_THB"), cache.get("BTC_THB"), cache.get("DOGE_THB"),
+    )
+    assert fetch.calls == 1
+    assert usdt.data == USDT and btc_lookup.data == btc and missing.data is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_request():
+    fetch = SlowFetch({"USDT_THB": USDT}, delay=0.05)
+    cache = rates.RateCache(ttl=30, fetch=fetch)
+    results = await asyncio.gather(*(cache.get("USDT_THB") for _ in range(20)))
+    assert fetch.calls == 1
+    assert all(r.data == USDT for r in results)
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_when_exchange_is_slow():
+    fetch = SlowFetch({"USDT_THB": {"last": "32.00"}}, delay=0.3)
+    cache = rates.RateCache(ttl=0, stale_wait=0.05, fetch=fetch)
+    cache.put({"USDT_THB": USDT})
+
+    lookup = await cache.get("USDT_THB")
+    assert lookup.stale and lookup.data == USDT
+    # обновление доигрывает в фоне и попадает в кэш
+    await asyncio.sleep(0.35)
+    assert cache.peek("USDT_THB") == {"last": "32.00"}
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_when_exchange_is_down():
+    cache = rates.RateCache(ttl=0, fetch=SlowFetch(None))
+    assert (await cache.get("USDT_THB")).data is None
+    cache.put({"USDT_THB": USDT})
+    lookup = await cache.get("USDT_THB")
+    assert lookup.stale and lookup.data == USDT
+
+
+@pytest.mark.asyncio
+async def test_format_shows_age_of_stale_rate(monkeypatch):
+    cache = rates.RateCache(ttl=0, fetch=SlowFetch(None))
+    cache.put({"USDT_THB": USDT}, fetched_at=time.monotonic() - 300)
+    monkeypatch.setattr(rates, "rate_cache", cache)
+    text = await rates.format_usdt_thb()
+    assert "31.07" in text and "5 мин назад" in text and "⚠️" in text
+
+
+@pytest.mark.asyncio
+async def test_format_shows_extra_pairs(monkeypatch):
+    cache = rates.RateCache(ttl=30, fetch=SlowFetch(None))
+    cache.put({
+        "USDT_THB": USDT,
+        "BTC_THB": {"last": "2150000", "percent_change": "1.25"},
+    })
+    monkeypatch.setattr(rates, "rate_cache", cache)
+    monkeypatch.setattr(rates, "RATES_EXTRA_SYMBOLS", ("BTC_THB", "ETH_THB"))
+    text = await rates.format_usdt_thb()
+    assert "BTC/THB   2,150,000.00 ฿  +1.25%" in text
+    # пары, которой нет в тикере, на экране нет
+    assert "ETH" not in text
+
+
+@pytest.mark.asyncio
+async def test_refresh_job_runs_only_while_rates_are_in_use(monkeypatch):
+    fetch = SlowFetch({"USDT_THB": USDT})
+    cache = rates.RateCache(ttl=30, fetch=fetch)
+    monkeypatch.setattr(rates, "rate_cache", cache)
+
+    await rates._rates_refresh_job(None)
+    assert fetch.calls == 0
+
+    await cache.get("USDT_THB")
+    await rates._rates_refresh_job(None)
+    assert fetch.calls == 2
+
+    cache.last_used -= rates.RATES_REFRESH_IDLE_SECONDS + 1
+    await rates._rates_refresh_job(None)
+    assert fetch.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_refresh_job_skips_while_refresh_in_flight(monkeypatch):
+    fetch = SlowFetch({"USDT_THB": USDT}, delay=0.2)
+    cache = rates.RateCache(ttl=30, fetch=fetch)
+    monkeypatch.setattr(rates, "rate_cache", cache)
+    cache.last_used = time.monotonic()
+
+    task = cache.refresh()
+    assert cache.refreshing
+    # не ждёт идущий запрос и не запускает второй
+    await asyncio.wait_for(rates._rates_refresh_job(None), 0.05)
+    assert fetch.calls == 1
+    assert await task is True
+    assert not cache.refreshing
+
+
+def test_refresh_job_is_scheduled():
+    app = MagicMock()
+    rates.start_rates_refresh_job(app)
+    kwargs = app.job_queue.run_repeating.call_args.kwargs
+    assert kwargs["name"] == "rates_refresh"
+    assert kwargs["interval"] == rates.RATES_REFRESH_SECONDS
@@ -0,0 +1,125 @@
+"""Тесты маршрутизатора callback-кнопок."""
+import pytest
+
+from taskbot.callbacks import (
+    CB, cb_sel, cb_apply, cb_done, cb_del, cb_rem, cb_rset, cb_rm_ack, cb_rm_snooze30,
+    cb_recur_del, cb_recur_sched, cb_page,
+)
+from taskbot.router import CallbackRouter, LatencyHistogram
+
+
+def make_router():
+    router = CallbackRouter()
+    seen = []
+
+    @router.route(CB.LIST, CB.HIST)
+    async def panel(call, parsed):
+        seen.append(("panel", parsed.action))
+
+    @router.route(CB.DONE_PICK)
+    async def pick_done(call, parsed):
+        seen.append(("pick_done", parsed.task_id))
+
+    @router.route(CB.RM)
+    async def reminder(call, parsed):
+        if parsed.action == "BOOM":
+            raise RuntimeError("boom")
+        seen.append(("reminder", parsed.action, parsed.task_id))
+
+    return router, seen
+
+
+def test_resolve_exact_and_prefix():
+    router, _ = make_router()
+    assert router.resolve(CB.LIST).name == "panel"
+    assert router.resolve("DONE:5").name == "pick_done"
+    assert router.resolve("RM:ACK:1").name == "reminder"
+    assert router.resolve("A:UNKNOWN") is None
+    assert router.resolve("DONE") is None
+
+
+def test_duplicate_route_rejected():
+    router, _ = make_router()
+    with pytest.raises(ValueError):
+        router.route(CB.LIST)(lambda call, parsed: None)
+
+
+@pytest.mark.asyncio
+async def test_dispatch_passes_parsed_callback():
+    router, seen = make_router()
+    assert await router.dispatch(CB.HIST, call=None) is True
+    assert await router.dispatch(cb_done(7), call=None) is True
+    assert await router.dispatch(cb_rm_snooze30(3), call=None) is True
+    assert seen == [("panel", CB.HIST), ("pick_done", 7), ("reminder", "S30", 3)]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_unknown_and_malformed():
+    router, seen = make_router()
+    assert await router.dispatch("garbage", call=None) is False
+    assert await router.dispatch("RM:ACK", call=None) is False  # неверное число частей
+    assert await router.dispatch("", call=None) is False
+    assert router.unmatched == 3
+    assert seen == []
+
+
+@pytest.mark.asyncio
+async def test_dispatch_parses_once_via_route(monkeypatch):
+    import taskbot.callbacks as callbacks
+    import taskbot.router as router_mod
+    router, seen = make_router()
+
+    def fail(data):
+        raise AssertionError("dispatch must not reparse via parse_callback")
+
+    # разбор берётся из найденного маршрута, повторного поиска по таблицам нет
+    monkeypatch.setattr(router_mod, "parse_callback", fail)
+    monkeypatch.setattr(callbacks, "parse_callback", fail)
+    assert await router.dispatch(CB.LIST, call=None) is True
+    assert await router.dispatch(cb_rm_ack(4), call=None) is True
+    assert seen == [("panel", CB.LIST), ("reminder", "ACK", 4)]
+
+
+def test_route_parser_matches_parse_callback():
+    from taskbot.callbacks import parse_callback
+    from taskbot.handlers import callback_router
+    for data in (CB.LIST, CB.RATES, cb_done(1), cb_rset(1, "30M"), cb_recur_sched("Y", 15, 12),
+                 cb_page(2), cb_sel("DONE", 1), cb_apply("DEL"), "RM:ACK"):
+        assert callback_router.resolve(data).parse(data) == parse_callback(data), data
+
+
+@pytest.mark.asyncio
+async def test_route_metrics():
+    router, _ = make_router()
+    await router.dispatch(CB.LIST, call=None)
+    await router.dispatch(CB.LIST, call=None)
+    with pytest.raises(RuntimeError):
+        await router.dispatch("RM:BOOM:1", call=None)
+
+    stats = router.stats()
+    assert stats[CB.LIST]["calls"] == 2
+    assert stats[CB.HIST]["calls"] == 0
+    assert stats[CB.RM]["calls"] == 1
+    assert stats[CB.RM]["errors"] == 1
+
+
+def test_latency_histogram_buckets():
+    h = LatencyHistogram(buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    assert h.count == 4
+    assert h.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+
+
+def test_every_callback_format_has_a_route():
+    from taskbot.handlers import callback_router
+    all_data = [
+        CB.LIST, CB.ADD, CB.DONE, CB.DEL, CB.REM, CB.HIST, CB.RECUR, CB.RECUR_ADD,
+        CB.RECUR_ADD_CUSTOM, CB.RECUR_DEL_PICK, CB.RATES,
+        cb_done(1), cb_del(1), cb_rem(1), cb_rset(1, "30M"),
+        cb_rm_ack(1), cb_rm_snooze30(1), cb_recur_del(1),
+        cb_recur_sched("M", 5), cb_recur_sched("Y", 15, 12), cb_page(1),
+        cb_sel("DONE", 1), cb_apply("DEL"),
+    ]
+    for data in all_data:
+        assert callback_router.resolve(data) is not None, data
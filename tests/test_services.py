@@ -120,3 +120,85 @@ def test_clear_reminder_no_log_if_nothing():
     services.clear_reminder(app=app, chat_id=1, actor_id=10, actor_name="Иван", task_id=tid)
     logs = db.audit_fetch(1)
     assert not any(r["action"] == "REM_CLEAR" for r in logs)
+
+
+# --- add_tasks ---
+
+def test_add_tasks_single_audit_entry():
+    tids = services.add_tasks(chat_id=1, owner_id=10, owner_name="Иван", texts=["a", "b", "c"])
+    assert len(tids) == 3
+    logs = db.audit_fetch(1)
+    assert len(logs) == 1
+    assert logs[0]["action"] == "ADD_BULK"
+    assert '"count": 3' in logs[0]["meta"]
+
+
+def test_add_tasks_over_limit_adds_nothing():
+    tids = services.add_tasks(chat_id=1, owner_id=10, owner_name="Иван", texts=["a", "b"], max_open=1)
+    assert tids is None
+    assert db.count_open_tasks(1) == 0
+    assert db.audit_fetch(1) == []
+
+
+# --- bulk done / delete ---
+
+def test_mark_done_many_single_audit_batch_and_bulk_cancel():
+    app = MagicMock()
+    ids = [db.insert_task(1, 10, "Иван", t) for t in ("a", "b")]
+
+    done = services.mark_done_many(app=app, chat_id=1, actor_id=10, actor_name="Иван", task_ids=ids)
+    assert done == ids
+    assert [r["task_id"] for r in db.audit_fetch(1) if r["action"] == "DONE"] == sorted(ids, reverse=True)
+    # джобы снимаются по id, без просмотра очереди
+    removed = [c.args[0] for c in app.job_queue.scheduler.remove_job.call_args_list]
+    assert removed == [f"{kind}:1:{tid}" for tid in ids for kind in ("remind", "repeat")]
+    app.job_queue.jobs.assert_not_called()
+    app.job_queue.get_jobs_by_name.assert_not_called()
+
+
+def test_delete_tasks_nothing_to_delete():
+    app = make_app()
+    assert services.delete_tasks(app=app, chat_id=1, actor_id=10, actor_name="Иван", task_ids=[99]) == []
+    assert db.audit_fetch(1) == []
+
+
+@pytest.mark.asyncio
+async def test_reminder_jobs_are_replaced_and_cancelled_by_id():
+    from datetime import datetime, timedelta
+    from telegram.ext import Application
+    from benchmarks.fakebot import RecordingRequest
+    from taskbot.config import TZ
+    from taskbot import reminders
+
+    app = Application.builder().token("123456:REMINDERS").request(RecordingRequest()).build()
+    await app.initialize()
+    await app.job_queue.start()
+    try:
+        later = datetime.now(TZ) + timedelta(hours=1)
+        for tid in (1, 2, 3):
+            reminders.schedule_reminder(app, 1, tid, later)
+        reminders.schedule_reminder(app, 1, 1, later + timedelta(hours=1))
+        reminders.start_reminder_repeat(app, 1, 2)
+        assert sorted(j.name for j in app.job_queue.jobs()) == ["remind:1:1", "remind:1:2", "remind:1:3", "repeat:1:2"]
+
+        assert reminders.cancel_reminders(app, 1, [1, 2, 99]) == 3
+        assert [j.name for j in app.job_queue.jobs()] == ["remind:1:3"]
+    finally:
+        await app.job_queue.stop(wait=False)
+        await app.shutdown()
+
+
+def test_single_and_bulk_done_leave_same_task_state():
+    app = make_app()
+    ids = [db.insert_task(1, 10, "Иван", t) for t in ("a", "b")]
+    for tid in ids:
+        db.set_task_remind(1, tid, "2026-01-01T10:00:00+07:00")
+        db.set_task_reminder_message_id(1, tid, 555)
+
+    services.mark_done(app=app, chat_id=1, actor_id=10, actor_name="Иван", task_id=ids[0])
+    services.mark_done_many(app=app, chat_id=1, actor_id=10, actor_name="Иван", task_ids=ids[1:])
+
+    single, bulk = (db.fetch_task(1, tid) for tid in ids)
+    for key in ("done", "remind_at", "reminded", "reminder_message_id"):
+        assert single[key] == bulk[key], key
+    assert single["remind_at"] is None and single["reminder_message_id"] is None
@@ -0,0 +1,38 @@
+"""Тесты startup-таймлайна и отметки первого getUpdates."""
+import time
+
+from benchmarks.fakebot import RecordingRequest
+from taskbot.startup import GetUpdatesProbe, StartupTimeline
+
+
+def test_marks_are_sequential_phases():
+    timeline = StartupTimeline()
+    time.sleep(0.01)
+    timeline.mark("imports")
+    timeline.mark("db_init")
+    assert list(timeline.phases) == ["imports", "db_init"]
+    assert timeline.phases["imports"] >= 0.01
+    assert abs(timeline.total - sum(timeline.phases.values())) < 1e-9
+    assert "imports" in timeline.summary() and "total" in timeline.summary()
+
+
+def test_first_update_is_marked_once():
+    timeline = StartupTimeline()
+    timeline.first_update()
+    first = timeline.phases["first_update"]
+    timeline.first_update()
+    assert timeline.phases["first_update"] == first
+    assert not timeline.mark_once("first_update")
+
+
+async def test_probe_marks_first_get_updates_only():
+    timeline = StartupTimeline()
+    inner = RecordingRequest()
+    probe = GetUpdatesProbe(inner, timeline)
+    await probe.do_request("https://api.telegram.org/botX/deleteWebhook", "POST")
+    assert "first_get_updates" not in timeline.phases
+    await probe.do_request("https://api.telegram.org/botX/getUpdates", "POST")
+    marked = timeline.phases["first_get_updates"]
+    await probe.do_request("https://api.telegram.org/botX/getUpdates", "POST")
+    assert timeline.phases["first_get_updates"] == marked
+    assert inner.calls == {"deleteWebhook": 1, "getUpdates": 2}
@@ -0,0 +1,30 @@
+"""Тесты разбора сообщения со списком задач."""
+from taskbot.tasks_parse import split_task_lines
+
+
+def test_single_line_kept_as_is():
+    assert split_task_lines("купить молоко") == ["купить молоко"]
+    assert split_task_lines("- купить молоко") == ["- купить молоко"]
+
+
+def test_empty():
+    assert split_task_lines("") == []
+    assert split_task_lines("  \n \n") == []
+
+
+def test_multiline_strips_markers_and_blank_lines():
+    text = "молоко\n- хлеб\n\n2) яйца\n3. сыр\n• масло\n[ ] чай\n* кофе"
+    assert split_task_lines(text) == ["молоко", "хлеб", "яйца", "сыр", "масло", "чай", "кофе"]
+
+
+def test_multiline_keeps_numbers_inside_text():
+    assert split_task_lines("оплатить 2 счёта\n10 яиц") == ["оплатить 2 счёта", "10 яиц"]
+
+
+def test_multiline_keeps_decimals_negatives_and_emphasis():
+    text = "1.5 л молока\n2.5 кг картошки\n-5 градусов проверить\n*важно* позвонить"
+    assert split_task_lines(text) == ["1.5 л молока", "2.5 кг картошки", "-5 градусов проверить", "*важно* позвонить"]
+
+
+def test_multiline_keeps_line_that_is_only_a_marker():
+    assert split_task_lines("молоко\n10)\n-") == ["молоко", "10)", "-"]
@@ -0,0 +1,68 @@
+"""Тесты укладки текста в лимиты Telegram."""
+from taskbot.textfit import PageBuilder, TELEGRAM_TEXT_LIMIT, fit_text, tg_len, truncate
+
+
+def test_tg_len_counts_utf16():
+    assert tg_len("abc") == 3
+    assert tg_len("привет") == 6
+    assert tg_len("✅") == 1
+    assert tg_len("💱") == 2
+
+
+def test_truncate_short_text_unchanged():
+    assert truncate("задача", 10) == "задача"
+
+
+def test_truncate_long_text():
+    out = truncate("а" * 50, 10)
+    assert out.endswith("…")
+    assert tg_len(out) == 10
+
+
+def test_truncate_does_not_split_surrogate_pair():
+    out = truncate("💱" * 10, 6)
+    assert tg_len(out) <= 6
+    assert out == "💱💱…"
+
+
+def test_fit_text_clamps_to_telegram_limit():
+    assert tg_len(fit_text("x" * 10000)) == TELEGRAM_TEXT_LIMIT
+
+
+def test_page_builder_single_page():
+    b = PageBuilder(header="H")
+    b.add("one")
+    b.add("two")
+    assert b.pages() == ["H\none\ntwo"]
+
+
+def test_page_builder_spills_and_repeats_header():
+    b = PageBuilder(header="H", limit=10)
+    for line in ("aaaa", "bbbb", "cccc"):
+        b.add(line)
+    pages = b.pages()
+    assert pages == ["H\naaaa", "H\nbbbb", "H\ncccc"]
+    assert all(tg_len(p) <= 10 for p in pages)
+
+
+def test_page_builder_truncates_oversized_line():
+    b = PageBuilder(header="H", limit=10)
+    b.add("x" * 50)
+    (page,) = b.pages()
+    assert tg_len(page) == 10
+    assert page.endswith("…")
+
+
+def test_page_builder_reserve_applies_to_first_page():
+    b = PageBuilder(limit=10, reserve=5)
+    b.add("aaaa")
+    b.add("bbbb")
+    assert b.pages() == ["aaaa", "bbbb"]
+
+
+def test_page_builder_page_clamps_index():
+    b = PageBuilder(limit=5)
+    b.add("aaaa")
+    b.add("bbbb")
+    assert b.page(99) == ("bbbb", 1, 2)
+    assert b.page(-1) == ("aaaa", 0, 2)
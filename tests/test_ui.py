@@ -178,3 +178,67 @@ def test_recur_schedule_keyboard_has_months():
     assert any("1-го" in l for l in all_labels)
     assert any("Ввести" in l for l in all_labels)
     assert any("Назад" in l for l in all_labels)
+
+
+# --- Telegram length budget ---
+
+def test_format_tasks_text_fits_telegram_limit():
+    from taskbot.textfit import tg_len, TELEGRAM_TEXT_LIMIT
+    for i in range(20):
+        db.insert_task(1, 10, "Иван", f"{i} " + "ж" * 498)
+    text = format_tasks_text(chat_id=1)
+    assert tg_len(text) <= TELEGRAM_TEXT_LIMIT
+
+
+def test_list_spills_into_pages_with_nav():
+    from taskbot.textfit import tg_len, TELEGRAM_TEXT_LIMIT
+    from taskbot.callbacks import cb_page
+    for i in range(20):
+        db.insert_task(1, 10, "Иван", f"{i} " + "ж" * 498)
+    text, kb = render_panel(1, Screen.LIST, {})
+    cbs = {btn.callback_data for row in kb.inline_keyboard for btn in row}
+    assert cb_page(1) in cbs
+
+    text2, kb2 = render_panel(1, Screen.LIST, {"page": 1})
+    assert text2 != text
+    assert tg_len(text2) <= TELEGRAM_TEXT_LIMIT
+    cbs2 = {btn.callback_data for row in kb2.inline_keyboard for btn in row}
+    assert cb_page(0) in cbs2
+
+
+def test_flash_screen_fits_telegram_limit():
+    from taskbot.textfit import tg_len, TELEGRAM_TEXT_LIMIT
+    for i in range(20):
+        db.insert_task(1, 10, "Иван", "ж" * 500)
+    text, _ = render_panel(1, Screen.FLASH, {"line": "✅ Готово."})
+    assert text.startswith("✅ Готово.")
+    assert tg_len(text) <= TELEGRAM_TEXT_LIMIT
+
+
+def test_single_page_has_no_nav():
+    db.insert_task(1, 10, "Иван", "задача")
+    _, kb = render_panel(1, Screen.LIST, {})
+    assert all(not (btn.callback_data or "").startswith("PAGE:") for row in kb.inline_keyboard for btn in row)
+
+
+def test_history_shows_bulk_add_count():
+    import taskbot.services as services
+    services.add_tasks(chat_id=1, owner_id=10, owner_name="Иван", texts=["a", "b", "c"])
+    text, _ = render_panel(1, Screen.HIST, {})
+    assert "добавил задачи (3 шт.)" in text
+
+
+def test_render_panel_pick_done_multi_select():
+    tasks = [make_task(id=5, text="раз"), make_task(id=6, text="два")]
+    text, kb = render_panel(chat_id=1, screen=Screen.PICK_DONE, payload={"rows": tasks, "selected": {6}})
+    rows = kb.inline_keyboard
+    assert rows[0][0].callback_data == "SEL:DONE:5"
+    assert rows[0][0].text.startswith("⬜")
+    assert rows[1][0].text.startswith("☑️")
+    assert rows[-1][0].callback_data == "APPLY:DONE"
+    assert "(1)" in rows[-1][0].text
+
+
+def test_render_panel_pick_del_no_apply_without_selection():
+    text, kb = render_panel(chat_id=1, screen=Screen.PICK_DEL, payload={"rows": [make_task(id=5)]})
+    assert [b.callback_data for b in kb.inline_keyboard[-1]] == ["A:LIST"]
@@ -0,0 +1,100 @@
+"""Тесты процессора апдейтов: порядок внутри чата и параллелизм между чатами."""
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from telegram import Update
+
+from taskbot.updates import ChatOrderedUpdateProcessor, update_chat_key
+
+
+def make_update(chat_id):
+    update = MagicMock(spec=Update)
+    update.effective_chat = MagicMock(id=chat_id)
+    return update
+
+
+def test_update_chat_key():
+    assert update_chat_key(make_update(5)) == 5
+    assert update_chat_key(object()) is None
+
+    update = MagicMock(spec=Update)
+    update.effective_chat = None
+    assert update_chat_key(update) is None
+
+
+@pytest.mark.asyncio
+async def test_same_chat_is_sequential_in_order():
+    proc = ChatOrderedUpdateProcessor(workers=4)
+    await proc.initialize()
+    log = []
+
+    async def work(i, delay):
+        log.append(("start", i))
+        await asyncio.sleep(delay)
+        log.append(("end", i))
+
+    await asyncio.gather(
+        proc.process_update(make_update(1), work(1, 0.03)),
+        proc.process_update(make_update(1), work(2, 0.01)),
+        proc.process_update(make_update(1), work(3, 0.0)),
+    )
+    assert log == [("start", 1), ("end", 1), ("start", 2), ("end", 2), ("start", 3), ("end", 3)]
+    assert proc.active_chats == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_chat_does_not_block_other_chats():
+    proc = ChatOrderedUpdateProcessor(workers=2)
+    await proc.initialize()
+    finished = []
+
+    async def work(name, delay):
+        await asyncio.sleep(delay)
+        finished.append(name)
+
+    await asyncio.gather(
+        proc.process_update(make_update(1), work("slow-1", 0.05)),
+        proc.process_update(make_update(1), work("slow-2", 0.0)),
+        proc.process_update(make_update(2), work("fast", 0.0)),
+    )
+    assert finished == ["fast", "slow-1", "slow-2"]
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_is_bounded():
+    proc = ChatOrderedUpdateProcessor(workers=2)
+    await proc.initialize()
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await asyncio.gather(*(proc.process_update(make_update(c), work()) for c in range(10)))
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_update_does_not_stall_chat():
+    proc = ChatOrderedUpdateProcessor(workers=1)
+    await proc.initialize()
+    done = []
+
+    async def boom():
+        raise RuntimeError("boom")
+
+    async def ok():
+        done.append(1)
+
+    results = await asyncio.gather(
+        proc.process_update(make_update(1), boom()),
+        proc.process_update(make_update(1), ok()),
+        return_exceptions=True,
+    )
+    assert isinstance(results[0], RuntimeError)
+    assert done == [1]
@@ -0,0 +1,58 @@
+"""Тесты настроек приёма апдейтов (webhook / allowed_updates)."""
+import pytest
+from telegram import Update
+
+import taskbot.config as cfg
+from taskbot.webhook import ALLOWED_UPDATES, webhook_enabled, webhook_options
+
+
+@pytest.fixture
+def webhook_env(monkeypatch):
+    monkeypatch.setattr(cfg, "WEBHOOK_URL", "https://bot.example.com/")
+    monkeypatch.setattr(cfg, "WEBHOOK_LISTEN", "0.0.0.0")
+    monkeypatch.setattr(cfg, "WEBHOOK_PORT", 8080)
+    monkeypatch.setattr(cfg, "WEBHOOK_PATH", "/tg/hook/")
+    monkeypatch.setattr(cfg, "WEBHOOK_SECRET", "s3cr3t_token-1")
+    monkeypatch.setattr(cfg, "WEBHOOK_MAX_CONNECTIONS", 20)
+
+
+def test_allowed_updates_cover_handlers():
+    assert set(ALLOWED_UPDATES) == {
+        Update.MESSAGE, Update.CALLBACK_QUERY, Update.CHAT_MEMBER, Update.MY_CHAT_MEMBER,
+    }
+    assert set(ALLOWED_UPDATES) < set(Update.ALL_TYPES)
+
+
+def test_webhook_disabled_without_url(monkeypatch):
+    monkeypatch.setattr(cfg, "WEBHOOK_URL", "")
+    assert webhook_enabled() is False
+
+
+def test_webhook_options(webhook_env):
+    assert webhook_enabled() is True
+    opts = webhook_options()
+    assert opts["listen"] == "0.0.0.0"
+    assert opts["port"] == 8080
+    assert opts["url_path"] == "tg/hook"
+    assert opts["webhook_url"] == "https://bot.example.com/tg/hook"
+    assert opts["secret_token"] == "s3cr3t_token-1"
+    assert opts["max_connections"] == 20
+    assert opts["allowed_updates"] == ALLOWED_UPDATES
+
+
+def test_webhook_options_without_secret(webhook_env, monkeypatch):
+    monkeypatch.setattr(cfg, "WEBHOOK_SECRET", "")
+    assert webhook_options()["secret_token"] is None
+
+
+@pytest.mark.parametrize("secret", ["has space", "x" * 257, "кириллица"])
+def test_webhook_options_rejects_bad_secret(webhook_env, monkeypatch, secret):
+    monkeypatch.setattr(cfg, "WEBHOOK_SECRET", secret)
+    with pytest.raises(ValueError):
+        webhook_options()
+
+
+def test_webhook_options_rejects_bad_max_connections(webhook_env, monkeypatch):
+    monkeypatch.setattr(cfg, "WEBHOOK_MAX_CONNECTIONS", 0)
+    with pytest.raises(ValueError):
+        webhook_options()